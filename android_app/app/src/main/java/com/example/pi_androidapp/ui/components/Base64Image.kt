@@ -17,6 +17,7 @@ import androidx.compose.ui.platform.LocalContext
 import androidx.compose.ui.unit.dp
 import coil.compose.AsyncImage
 import coil.request.ImageRequest
+import com.example.pi_androidapp.core.network.ApiConstants
 
 /**
  * Componente reutilizable que decodifica un string Base64 y lo renderiza
@@ -25,7 +26,10 @@ import coil.request.ImageRequest
  * La decodificación de Base64 a ByteArray se realiza una sola vez (memoizada con `remember`).
  * Coil recibe el ByteArray directamente, que es un formato nativo compatible.
  *
- * @param base64String String en Base64 de la imagen (sin prefijo data:image)
+ * Si el valor es una URL de `/api/v1/imagenes/...` (formato actual de la API), se carga
+ * directamente por red y Coil la cachea en disco usando la URL (que incluye el hash).
+ *
+ * @param base64String String en Base64 de la imagen (sin prefijo data:image) o URL de la imagen
  * @param contentDescription Descripción de accesibilidad
  * @param modifier Modificador de layout
  * @param contentScale Escala del contenido (por defecto Crop)
@@ -52,6 +56,25 @@ fun Base64Image(
         return
     }
 
+    // Imagen servida por URL: no hay nada que decodificar
+    if (base64String.startsWith("/") || base64String.startsWith("http")) {
+        val url = if (base64String.startsWith("/")) {
+            ApiConstants.BASE_URL.trimEnd('/') + base64String
+        } else {
+            base64String
+        }
+        AsyncImage(
+            model = ImageRequest.Builder(LocalContext.current)
+                .data(url)
+                .crossfade(true)
+                .build(),
+            contentDescription = contentDescription,
+            modifier = modifier,
+            contentScale = contentScale
+        )
+        return
+    }
+
     // Decodificar Base64 a ByteArray una sola vez
     val imageBytes = remember(base64String) {
         try {
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""Generador de carga para la API /api/v1 del marketplace
+
+Usa los datos generados por sembrar_datos.py (fichero semilla.json) y solo la
+biblioteca estándar. Cada usuario virtual es un hilo con su propia conexión
+keep-alive que inicia sesión y repite una mezcla ponderada de operaciones.
+Envía X-Debug-Queries en cada petición para contar las consultas SQL (con
+--token-metricas si el servidor tiene definido pi_api_rest.metrics_token).
+
+Ejemplos:
+    # Mezcla de operaciones durante 60 s con 16 usuarios virtuales
+    python benchmarks/carga_api.py --url http://localhost:8069 --semilla semilla.json \\
+        --concurrencia 16 --duracion 60 --salida resultados/$(git rev-parse --short HEAD).json
+
+    # 100 compradores a la vez sobre el mismo producto: debe haber exactamente un ganador
+    python benchmarks/carga_api.py --url http://localhost:8069 --semilla semilla.json \\
+        --escenario compra_concurrente --compradores 100
+
+    # Comparar dos ejecuciones (sale con código 1 si hay regresiones)
+    python benchmarks/carga_api.py --comparar resultados/base.json resultados/nuevo.json
+"""
+import argparse
+import http.client
+import json
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from urllib.parse import urlsplit
+
+# Operación -> peso en la mezcla
+MEZCLA = {
+    'login': 5,
+    'productos_listar': 40,
+    'producto_detalle': 35,
+    'mensaje_enviar': 15,
+    'compra_crear': 5,
+}
+
+
+class ClienteAPI:
+    """Cliente JSON-RPC con una conexión persistente (un cliente por hilo)"""
+
+    def __init__(self, url, db=None, token_metricas=None, timeout=60):
+        partes = urlsplit(url)
+        clase = http.client.HTTPSConnection if partes.scheme == 'https' else http.client.HTTPConnection
+        self._conexion = clase(partes.hostname, partes.port, timeout=timeout)
+        self._sufijo = f'?db={db}' if db else ''
+        self.token = None
+        self._depuracion = token_metricas or '1'
+
+    def llamar(self, ruta, params=None):
+        """Devuelve (ok, status, segundos, consultas SQL o None, resultado)"""
+        cuerpo = json.dumps({'jsonrpc': '2.0', 'method': 'call', 'params': params or {}})
+        cabeceras = {'Content-Type': 'application/json', 'X-Debug-Queries': self._depuracion}
+        if self.token:
+            cabeceras['Authorization'] = f'Bearer {self.token}'
+        inicio = time.perf_counter()
+        try:
+            self._conexion.request('POST', ruta + self._sufijo, body=cuerpo, headers=cabeceras)
+            respuesta = self._conexion.getresponse()
+            datos = respuesta.read()
+        except (OSError, http.client.HTTPException):
+            self._conexion.close()
+            return False, 599, time.perf_counter() - inicio, None, None
+        duracion = time.perf_counter() - inicio
+        consultas = respuesta.getheader('X-Debug-Queries')
+        consultas = int(consultas) if consultas and consultas.isdigit() else None
+        try:
+            resultado = json.loads(datos).get('result')
+        except ValueError:
+            resultado = None
+        if respuesta.status != 200 or not isinstance(resultado, dict):
+            return False, respuesta.status, duracion, consultas, resultado
+        if 'error' in resultado:
+            return False, resultado.get('status', 500), duracion, consultas, resultado
+        if resultado.get('nuevo_token'):
+            self.token = resultado['nuevo_token']
+        return True, 200, duracion, consultas, resultado
+
+    def login(self, email, password):
+        ok, status, duracion, consultas, resultado = self.llamar('/api/v1/auth/login', {'email': email, 'password': password})
+        if ok:
+            self.token = resultado['token']
+        return ok, status, duracion, consultas, resultado
+
+
+class Registro:
+    """Muestras por operación, compartidas entre hilos"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.muestras = defaultdict(list)  # operación -> [(ok, status, segundos, consultas)]
+
+    def anotar(self, operacion, ok, status, duracion, consultas):
+        with self._lock:
+            self.muestras[operacion].append((ok, status, duracion, consultas))
+
+
+def percentil(valores_ordenados, p):
+    if not valores_ordenados:
+        return None
+    indice = max(0, min(len(valores_ordenados) - 1, round(p / 100 * len(valores_ordenados) + 0.5) - 1))
+    return valores_ordenados[indice]
+
+
+def resumir(muestras, segundos):
+    duraciones = sorted(m[2] for m in muestras)
+    consultas = [m[3] for m in muestras if m[3] is not None]
+    estados = defaultdict(int)
+    for m in muestras:
+        estados[str(m[1])] += 1
+    return {
+        'peticiones': len(muestras),
+        'errores': sum(1 for m in muestras if not m[0]),
+        'estados': dict(estados),
+        'rps': round(len(muestras) / segundos, 2) if segundos else None,
+        'p50_ms': round(percentil(duraciones, 50) * 1000, 2) if duraciones else None,
+        'p95_ms': round(percentil(duraciones, 95) * 1000, 2) if duraciones else None,
+        'p99_ms': round(percentil(duraciones, 99) * 1000, 2) if duraciones else None,
+        'max_ms': round(duraciones[-1] * 1000, 2) if duraciones else None,
+        'consultas_por_peticion': round(sum(consultas) / len(consultas), 2) if consultas else None,
+    }
+
+
+def commit_actual():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def usuario_virtual(args, semilla, registro, fin, aleatorio):
+    cliente = ClienteAPI(args.url, args.db, args.token_metricas)
+    usuario = aleatorio.choice(semilla['usuarios'])
+    ok, *medidas = cliente.login(usuario['email'], semilla['password'])
+    registro.anotar('login', ok, *medidas[:3])
+    if not ok:
+        return
+    conversaciones = [c for c in semilla['conversaciones'] if usuario['email'] in (c['comprador_email'], c['vendedor_email'])]
+    operaciones, pesos = zip(*MEZCLA.items())
+
+    while time.monotonic() < fin:
+        operacion = aleatorio.choices(operaciones, pesos)[0]
+        if operacion == 'login':
+            resultado = cliente.login(usuario['email'], semilla['password'])
+        elif operacion == 'productos_listar':
+            params = {'limit': 20}
+            if aleatorio.random() < 0.3:
+                params['categoria_id'] = aleatorio.choice(semilla['categorias'])
+            resultado = cliente.llamar('/api/v1/productos/listar', params)
+        elif operacion == 'producto_detalle':
+            resultado = cliente.llamar(f"/api/v1/productos/{aleatorio.choice(semilla['productos'])}")
+        elif operacion == 'mensaje_enviar':
+            if not conversaciones:
+                continue
+            conversacion = aleatorio.choice(conversaciones)
+            resultado = cliente.llamar(f"/api/v1/conversaciones/{conversacion['id']}/mensajes/enviar",
+                                       {'contenido': f'Mensaje de carga {aleatorio.random():.6f}'})
+        else:
+            # Un 409 (producto ya reservado) es una respuesta válida bajo carga
+            resultado = cliente.llamar('/api/v1/compras/crear', {'producto_id': aleatorio.choice(semilla['productos'])})
+            if resultado[1] in (400, 409):
+                resultado = (True,) + resultado[1:]
+        registro.anotar(operacion, *resultado[:4])
+
+
+def escenario_mezcla(args, semilla):
+    registro = Registro()
+    aleatorio = random.Random(args.semilla_aleatoria)
+    inicio = time.monotonic()
+    fin = inicio + args.duracion
+    hilos = [
+        threading.Thread(target=usuario_virtual, args=(args, semilla, registro, fin, random.Random(aleatorio.random())))
+        for __ in range(args.concurrencia)
+    ]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    segundos = time.monotonic() - inicio
+
+    todas = [m for muestras in registro.muestras.values() for m in muestras]
+    return {
+        'escenario': 'mezcla',
+        'duracion_s': round(segundos, 2),
+        'total': resumir(todas, segundos),
+        'operaciones': {op: resumir(muestras, segundos) for op, muestras in sorted(registro.muestras.items())},
+    }, True
+
+
+def escenario_compra_concurrente(args, semilla):
+    """N compradores distintos compran a la vez el mismo producto: debe ganar exactamente uno"""
+    vendedor, *compradores = semilla['usuarios'][:args.compradores + 1]
+    if len(compradores) < args.compradores:
+        raise SystemExit(f'La semilla tiene {len(semilla["usuarios"])} usuarios; se necesitan {args.compradores + 1}')
+
+    cliente_vendedor = ClienteAPI(args.url, args.db, args.token_metricas)
+    cliente_vendedor.login(vendedor['email'], semilla['password'])
+    ok, status, __, __, resultado = cliente_vendedor.llamar('/api/v1/productos', {
+        'nombre': f'Producto concurrencia {int(time.time())}',
+        'descripcion': 'Producto para la prueba de compras simultáneas',
+        'precio': 10,
+        'categoria_id': semilla['categorias'][0],
+        'ubicacion': 'Madrid',
+    })
+    if not ok:
+        raise SystemExit(f'No se pudo crear el producto de prueba: {status} {resultado}')
+    producto_id = resultado['producto']['id']
+
+    clientes = []
+    for comprador in compradores:
+        cliente = ClienteAPI(args.url, args.db, args.token_metricas)
+        if not cliente.login(comprador['email'], semilla['password'])[0]:
+            raise SystemExit(f"No se pudo iniciar sesión con {comprador['email']}")
+        clientes.append(cliente)
+
+    barrera = threading.Barrier(len(clientes))
+    registro = Registro()
+
+    def comprar(cliente):
+        barrera.wait()
+        registro.anotar('compra_crear', *cliente.llamar('/api/v1/compras/crear', {'producto_id': producto_id})[:4])
+
+    inicio = time.monotonic()
+    hilos = [threading.Thread(target=comprar, args=(cliente,)) for cliente in clientes]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    segundos = time.monotonic() - inicio
+
+    muestras = registro.muestras['compra_crear']
+    ganadores = sum(1 for m in muestras if m[0])
+    rechazados = sum(1 for m in muestras if m[1] == 409)
+    correcto = ganadores == 1 and rechazados == len(muestras) - 1
+    return {
+        'escenario': 'compra_concurrente',
+        'producto_id': producto_id,
+        'compradores': len(muestras),
+        'ganadores': ganadores,
+        'rechazados_409': rechazados,
+        'correcto': correcto,
+        'operaciones': {'compra_crear': resumir(muestras, segundos)},
+    }, correcto
+
+
+def comparar(base, nuevo, tolerancia):
+    """Imprime las diferencias por operación; devuelve True si no hay regresiones"""
+    with open(base) as fichero:
+        base = json.load(fichero)
+    with open(nuevo) as fichero:
+        nuevo = json.load(fichero)
+    sin_regresiones = True
+    print(f"{'operación':<20} {'p95 base':>10} {'p95 nuevo':>10} {'consultas':>16}  ")
+    for operacion, datos in sorted(nuevo.get('operaciones', {}).items()):
+        anterior = base.get('operaciones', {}).get(operacion)
+        if not anterior:
+            continue
+        avisos = []
+        if anterior['p95_ms'] and datos['p95_ms'] and datos['p95_ms'] > anterior['p95_ms'] * (1 + tolerancia):
+            avisos.append('p95')
+        if (anterior['consultas_por_peticion'] is not None and datos['consultas_por_peticion'] is not None
+                and datos['consultas_por_peticion'] > anterior['consultas_por_peticion'] + 0.5):
+            avisos.append('consultas')
+        sin_regresiones &= not avisos
+        print(f"{operacion:<20} {anterior['p95_ms']:>10} {datos['p95_ms']:>10} "
+              f"{anterior['consultas_por_peticion']!s:>7} -> {datos['consultas_por_peticion']!s:<6}  "
+              f"{'REGRESIÓN: ' + ', '.join(avisos) if avisos else ''}")
+    return sin_regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://localhost:8069')
+    parser.add_argument('--db', help='base de datos (si el servidor tiene varias)')
+    parser.add_argument('--token-metricas', help='valor de pi_api_rest.metrics_token, para recibir X-Debug-Queries')
+    parser.add_argument('--semilla', default='semilla.json', help='fichero generado por sembrar_datos.py')
+    parser.add_argument('--escenario', choices=['mezcla', 'compra_concurrente'], default='mezcla')
+    parser.add_argument('--concurrencia', type=int, default=8, help='usuarios virtuales (escenario mezcla)')
+    parser.add_argument('--duracion', type=float, default=30, help='segundos (escenario mezcla)')
+    parser.add_argument('--compradores', type=int, default=100, help='compradores simultáneos (compra_concurrente)')
+    parser.add_argument('--semilla-aleatoria', type=int, default=1)
+    parser.add_argument('--salida', help='fichero JSON donde guardar los resultados')
+    parser.add_argument('--comparar', nargs=2, metavar=('BASE', 'NUEVO'), help='compara dos ficheros de resultados')
+    parser.add_argument('--tolerancia', type=float, default=0.2, help='aumento de p95 admitido al comparar (0.2 = 20%%)')
+    args = parser.parse_args()
+
+    if args.comparar:
+        sys.exit(0 if comparar(*args.comparar, args.tolerancia) else 1)
+
+    with open(args.semilla) as fichero:
+        semilla = json.load(fichero)
+    escenario = escenario_mezcla if args.escenario == 'mezcla' else escenario_compra_concurrente
+    resultados, correcto = escenario(args, semilla)
+    resultados.update({
+        'fecha': datetime.utcnow().isoformat(),
+        'commit': commit_actual(),
+        'url': args.url,
+        'concurrencia': args.concurrencia if args.escenario == 'mezcla' else args.compradores,
+        'semilla': semilla.get('config'),
+    })
+
+    print(json.dumps(resultados, indent=2, ensure_ascii=False))
+    if args.salida:
+        with open(args.salida, 'w') as fichero:
+            json.dump(resultados, fichero, indent=2, ensure_ascii=False)
+    sys.exit(0 if correcto else 1)
+
+
+if __name__ == '__main__':
+    main()
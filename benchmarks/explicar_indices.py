@@ -0,0 +1,70 @@
+# Script para ejecutar desde la consola de Odoo o shell
+# Comprueba con EXPLAIN que los listados paginados de la API usan los índices de pi_core
+# (mismo dominio y mismo orden que APIUtils.paginar) sobre los datos de sembrar_datos.py.
+# Sale con código 1 si alguna consulta no usa el índice esperado.
+
+# Para ejecutar desde el shell de Odoo:
+# python odoo-bin shell -c odoo.conf -d nombre_base_datos
+# Luego ejecutar:
+# exec(open('ruta/a/benchmarks/explicar_indices.py').read())
+
+import json
+
+from odoo.tools import SQL
+
+usuario = env['pi.producto'].search([('estado_venta', '=', 'disponible')], limit=1).propietario_id
+categoria = env['pi.categoria'].search([], limit=1)
+conversacion = env['pi.conversacion'].search([('mensaje_ids', '!=', False)], limit=1)
+producto = env['pi.producto'].search([('imagenes_ids', '!=', False)], limit=1)
+compra = env['pi.compra'].search([], limit=1)
+
+# (descripción, modelo, dominio, orden, índice esperado)
+consultas = [
+    ('productos disponibles', 'pi.producto', [('estado_venta', '=', 'disponible')],
+     'fecha_publicacion desc nulls last, id desc', 'pi_producto_disponible_fecha_idx'),
+    ('productos por categoría', 'pi.producto', [('estado_venta', '=', 'disponible'), ('categoria_id', '=', categoria.id)],
+     'fecha_publicacion desc nulls last, id desc', 'pi_producto_disponible_categoria_idx'),
+    ('productos de un usuario', 'pi.producto', [('propietario_id', '=', usuario.id), ('estado_venta', '=', 'disponible')],
+     'fecha_publicacion desc nulls last, id desc', 'pi_producto_disponible_propietario_idx'),
+    ('productos vendidos', 'pi.producto', [('estado_venta', '=', 'vendido')],
+     'fecha_publicacion desc nulls last, id desc', 'pi_producto_estado_venta_fecha_idx'),
+    ('imágenes de un producto', 'pi.producto.imagen', [('producto_id', '=', producto.id)],
+     'sequence, id', 'pi_producto_imagen_producto_seq_idx'),
+    ('compras como comprador', 'pi.compra', [('comprador_id', '=', compra.comprador_id.id)],
+     'fecha desc nulls last, id desc', 'pi_compra_comprador_fecha_idx'),
+    ('ventas como vendedor', 'pi.compra', [('vendedor_id', '=', compra.vendedor_id.id)],
+     'fecha desc nulls last, id desc', 'pi_compra_vendedor_fecha_idx'),
+    ('conversaciones como comprador', 'pi.conversacion', [('comprador_id', '=', conversacion.comprador_id.id)],
+     'last_message_date desc nulls last, id desc', 'pi_conversacion_comprador_fecha_idx'),
+    ('conversaciones como vendedor', 'pi.conversacion', [('vendedor_id', '=', conversacion.vendedor_id.id)],
+     'last_message_date desc nulls last, id desc', 'pi_conversacion_vendedor_fecha_idx'),
+    ('mensajes de una conversación', 'pi.mensaje', [('conversacion_id', '=', conversacion.id)],
+     'fecha_envio asc nulls last, id asc', 'pi_mensaje_conversacion_fecha_idx'),
+]
+
+
+def indices_del_plan(nodo):
+    """Nombres de los índices usados en cualquier nodo del plan"""
+    nombres = {nodo['Index Name']} if 'Index Name' in nodo else set()
+    for hijo in nodo.get('Plans', []):
+        nombres |= indices_del_plan(hijo)
+    return nombres
+
+
+fallos = 0
+for descripcion, modelo, dominio, orden, esperado in consultas:
+    query = env[modelo].sudo()._search(dominio, limit=21, order=orden)
+    env.cr.execute(SQL("EXPLAIN (FORMAT JSON) %s", query.select()))
+    plan = env.cr.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    plan = plan[0]['Plan']
+    usados = indices_del_plan(plan)
+    correcto = esperado in usados
+    fallos += not correcto
+    print(f"{'OK   ' if correcto else 'FALLO'} {descripcion:<32} coste {plan['Total Cost']:>10.2f}  "
+          f"índices: {', '.join(sorted(usados)) or 'ninguno (Seq Scan)'}")
+
+print(f"{len(consultas) - fallos}/{len(consultas)} consultas usan el índice esperado")
+if fallos:
+    raise SystemExit(1)
@@ -0,0 +1,143 @@
+# Script para ejecutar desde la consola de Odoo o shell
+# Mide la importación de productos con imágenes: pi.producto.create(vals_list) por lotes
+# frente a un create() por registro, en la misma transacción y con los mismos datos.
+# Informa del tiempo y de las consultas SQL de cada modo (incluido el flush de computados,
+# constraints y tareas encoladas) y guarda el resultado en JSON. Todo se deshace al terminar.
+
+# Para ejecutar desde el shell de Odoo:
+# python odoo-bin shell -c odoo.conf -d nombre_base_datos
+# Luego ejecutar:
+# exec(open('ruta/a/benchmarks/importar.py').read())
+#
+# Variables de entorno (todas opcionales):
+#   PI_BENCH_PRODUCTOS   productos importados en cada modo (100000)
+#   PI_BENCH_IMAGENES    imágenes por producto (1)
+#   PI_BENCH_LOTE        productos por create() en el modo por lotes (1000)
+#   PI_BENCH_SEMILLA     semilla del generador aleatorio (42)
+#   PI_BENCH_SALIDA      fichero JSON de salida (importacion.json)
+
+import base64
+import io
+import json
+import os
+import random
+import subprocess
+import time
+
+from PIL import Image
+
+config = {
+    'productos': int(os.environ.get('PI_BENCH_PRODUCTOS', 100000)),
+    'imagenes': int(os.environ.get('PI_BENCH_IMAGENES', 1)),
+    'lote': int(os.environ.get('PI_BENCH_LOTE', 1000)),
+    'semilla': int(os.environ.get('PI_BENCH_SEMILLA', 42)),
+}
+salida = os.environ.get('PI_BENCH_SALIDA', 'importacion.json')
+aleatorio = random.Random(config['semilla'])
+# El mismo contexto que pi.importacion.producto
+Producto = env['pi.producto'].with_context(tracking_disable=True, mail_create_nolog=True)
+
+
+def commit_actual():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def imagen_png(color):
+    buffer = io.BytesIO()
+    Image.new('RGB', (640, 480), color).save(buffer, format='PNG')
+    return base64.b64encode(buffer.getvalue())
+
+
+def filas(prefijo):
+    """vals de config['productos'] productos; misma semilla, mismos datos en cada modo"""
+    generador = random.Random(config['semilla'])
+    for i in range(config['productos']):
+        yield {
+            'nombre_producto': f'{prefijo} producto {i}',
+            'descripcion': f'Producto importado {i}',
+            'precio': generador.randrange(5, 500),
+            'categoria_id': categoria.id,
+            'ubicacion': 'Madrid',
+            'propietario_id': vendedor.id,
+            'etiquetas_ids': [(6, 0, generador.sample(etiquetas.ids, min(3, len(etiquetas))))],
+            'imagenes_ids': [
+                (0, 0, {'imagen': generador.choice(imagenes), 'nombre': f'{prefijo}_{i}_{j}.png'})
+                for j in range(config['imagenes'])
+            ],
+        }
+
+
+def por_lotes(prefijo):
+    # En los dos modos se vacía la caché cada config['lote'] productos (invalidate_all hace
+    # flush), para no acumular en memoria todos los registros creados
+    lote = []
+    for vals in filas(prefijo):
+        lote.append(vals)
+        if len(lote) == config['lote']:
+            Producto.create(lote)
+            env.invalidate_all()
+            lote = []
+    if lote:
+        Producto.create(lote)
+
+
+def por_registro(prefijo):
+    for i, vals in enumerate(filas(prefijo), 1):
+        Producto.create(vals)
+        if i % config['lote'] == 0:
+            env.invalidate_all()
+
+
+def medir(funcion, prefijo):
+    """Ejecuta funcion(prefijo) con el flush y devuelve segundos y consultas SQL"""
+    env.flush_all()
+    env.invalidate_all()
+    consultas = env.cr.sql_log_count
+    inicio = time.perf_counter()
+    funcion(prefijo)
+    env.flush_all()
+    segundos = time.perf_counter() - inicio
+    # Los productos ya creados no deben ocupar la caché durante el siguiente modo
+    env.invalidate_all()
+    return {
+        'segundos': round(segundos, 2),
+        'consultas': env.cr.sql_log_count - consultas,
+        'productos_por_segundo': round(config['productos'] / segundos, 1) if segundos else None,
+    }
+
+
+# Imágenes distintas, codificadas una sola vez (el campo Binary espera base64)
+imagenes = [imagen_png((aleatorio.randrange(256), aleatorio.randrange(256), aleatorio.randrange(256)))
+            for __ in range(8)]
+prefijo = f'benchimport_{int(time.time())}'
+resultados = {}
+try:
+    categoria = env['pi.categoria'].create({'nombre': f'{prefijo} categoría'})
+    vendedor = env['pi.usuario'].create({'name': f'{prefijo} vendedor', 'email': f'{prefijo}@bench.local'})
+    etiquetas = env['pi.etiqueta'].create([{'nombre': f'{prefijo} etiqueta {i}'} for i in range(10)])
+
+    for modo, funcion in (('create_multi', por_lotes), ('create_por_registro', por_registro)):
+        resultados[modo] = medir(funcion, f'{prefijo}_{modo}')
+        print(f"{modo:<20} {config['productos']} productos: {resultados[modo]['segundos']:>9.2f} s, "
+              f"{resultados[modo]['consultas']:>9} consultas, {resultados[modo]['productos_por_segundo']} productos/s")
+finally:
+    env.cr.rollback()
+    env.invalidate_all()
+
+aceleracion = round(resultados['create_por_registro']['segundos'] / resultados['create_multi']['segundos'], 2) \
+    if resultados.get('create_multi', {}).get('segundos') else None
+print(f"create(vals_list) es {aceleracion}x más rápido que un create() por registro")
+
+with open(salida, 'w') as fichero:
+    json.dump({
+        'commit': commit_actual(),
+        'fecha': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'base_datos': env.cr.dbname,
+        'config': config,
+        'resultados': resultados,
+        'aceleracion': aceleracion,
+    }, fichero, indent=2, ensure_ascii=False)
+print(f"Resultados guardados en {salida}")
@@ -0,0 +1,79 @@
+# Script para ejecutar desde la consola de Odoo o shell
+# Mide el coste del hash de contraseñas de pi.usuario (PBKDF2-SHA512) para elegir el valor
+# de pi_core.password_rounds: milisegundos por login y logins por segundo en un núcleo, y el
+# rendimiento con varios hilos a la vez a través del límite de cálculos simultáneos.
+
+# Para ejecutar desde el shell de Odoo:
+# python odoo-bin shell -c odoo.conf -d nombre_base_datos
+# Luego ejecutar:
+# exec(open('ruta/a/benchmarks/kdf.py').read())
+#
+# Variables de entorno (todas opcionales):
+#   PI_BENCH_RONDAS     rondas a comparar, separadas por comas (100000,300000,600000)
+#   PI_BENCH_HILOS      hilos que hacen login a la vez en la prueba de ráfaga (4 x núcleos)
+#   PI_BENCH_LOGINS     logins por hilo en la prueba de ráfaga (5)
+
+import os
+import threading
+import time
+
+import passlib.context
+
+rondas_a_medir = [int(r) for r in os.environ.get('PI_BENCH_RONDAS', '100000,300000,600000').split(',')]
+hilos = int(os.environ.get('PI_BENCH_HILOS', 4 * (os.cpu_count() or 1)))
+logins = int(os.environ.get('PI_BENCH_LOGINS', 5))
+password = 'bench-password'
+
+Usuario = env['pi.usuario']
+print(f"Configurado: {Usuario._crypt_context().to_dict().get('pbkdf2_sha512__rounds')} rondas; "
+      f"{os.cpu_count()} núcleos")
+
+# Un núcleo: coste de verificar una contraseña con cada número de rondas
+for rondas in rondas_a_medir:
+    contexto = passlib.context.CryptContext(['pbkdf2_sha512'], pbkdf2_sha512__rounds=rondas)
+    guardado = contexto.hash(password)
+    inicio = time.perf_counter()
+    repeticiones = 0
+    while time.perf_counter() - inicio < 2 or repeticiones < 3:
+        contexto.verify(password, guardado)
+        repeticiones += 1
+    ms = (time.perf_counter() - inicio) * 1000 / repeticiones
+    print(f"{rondas:>9} rondas: {ms:8.1f} ms por login, {1000 / ms:6.1f} logins/s por núcleo")
+
+# Ráfaga: muchos hilos haciendo login a la vez con la configuración real (semáforo incluido)
+contexto = Usuario._crypt_context()
+guardado = contexto.hash(password)
+latencias = []
+rechazados = []
+lock = threading.Lock()
+
+
+def hacer_logins():
+    for __ in range(logins):
+        inicio = time.perf_counter()
+        try:
+            Usuario._calcular_hash(contexto.verify, password, guardado)
+        except Exception:
+            with lock:
+                rechazados.append(1)
+            continue
+        with lock:
+            latencias.append(time.perf_counter() - inicio)
+
+
+inicio = time.perf_counter()
+trabajadores = [threading.Thread(target=hacer_logins) for __ in range(hilos)]
+for trabajador in trabajadores:
+    trabajador.start()
+for trabajador in trabajadores:
+    trabajador.join()
+segundos = time.perf_counter() - inicio
+
+latencias.sort()
+if latencias:
+    print(f"Ráfaga de {hilos} hilos x {logins} logins: {len(latencias) / segundos:.1f} logins/s, "
+          f"p50 {latencias[len(latencias) // 2] * 1000:.0f} ms, "
+          f"p95 {latencias[int(len(latencias) * 0.95)] * 1000:.0f} ms, "
+          f"rechazados {len(rechazados)}")
+else:
+    print(f"Ráfaga de {hilos} hilos x {logins} logins: todos rechazados ({len(rechazados)})")
@@ -0,0 +1,129 @@
+# Script para ejecutar desde la consola de Odoo o shell
+# Micro-benchmarks de la capa de modelos: mide create y write de cada modelo pi.* con
+# 1, 100 y 10000 registros (tiempo y consultas SQL, incluido el flush de computados y
+# constraints) y compara el resultado con los presupuestos de
+# custom_addons/pi_core/tests/presupuestos_modelos.json.
+# Todo se hace en una transacción que se deshace al terminar cada tamaño.
+# Sale con código 1 si alguna operación supera su presupuesto o si los presupuestos no se
+# han medido todavía (sin "_medido_en").
+#
+# Con PI_BENCH_ACTUALIZAR=1, sobre la base de datos de referencia de sembrar_datos.py,
+# reescribe los presupuestos que comprueba la suite de tests (odoo-bin --test-tags pi_bench).
+# Las operaciones medidas son las mismas en los dos sitios (pi_core/tests/bench_modelos.py).
+
+# Para ejecutar desde el shell de Odoo:
+# python odoo-bin shell -c odoo.conf -d nombre_base_datos
+# Luego ejecutar:
+# exec(open('ruta/a/benchmarks/modelos.py').read())
+#
+# Variables de entorno (todas opcionales):
+#   PI_BENCH_TAMANOS        tamaños separados por comas (1,100,10000)
+#   PI_BENCH_MODELOS        solo estos modelos, separados por comas (todos)
+#   PI_BENCH_PRESUPUESTOS   fichero de presupuestos (custom_addons/pi_core/tests/presupuestos_modelos.json)
+#   PI_BENCH_SOLO_CONSULTAS 1 para no comprobar los tiempos (máquinas lentas o compartidas)
+#   PI_BENCH_ACTUALIZAR     1 para reescribir los presupuestos con lo medido más un margen
+#   PI_BENCH_SALIDA         fichero JSON donde guardar las mediciones
+
+import json
+import math
+import os
+import subprocess
+import time
+
+from odoo.addons.pi_core.tests.bench_modelos import RUTA_PRESUPUESTOS, cargar_presupuestos, medir, operaciones
+
+tamanos = [int(t) for t in os.environ.get('PI_BENCH_TAMANOS', '1,100,10000').split(',')]
+solo_modelos = set(filter(None, os.environ.get('PI_BENCH_MODELOS', '').split(',')))
+ruta_presupuestos = os.environ.get('PI_BENCH_PRESUPUESTOS', RUTA_PRESUPUESTOS)
+solo_consultas = os.environ.get('PI_BENCH_SOLO_CONSULTAS') == '1'
+actualizar = os.environ.get('PI_BENCH_ACTUALIZAR') == '1'
+salida = os.environ.get('PI_BENCH_SALIDA')
+
+presupuestos = cargar_presupuestos(ruta_presupuestos)
+margen = presupuestos.get('_margen', 1.25)
+if not actualizar and not presupuestos.get('_medido_en'):
+    print(f"{ruta_presupuestos} no tiene presupuestos medidos. Genéralos con PI_BENCH_ACTUALIZAR=1 "
+          "sobre la base de datos de referencia (ver benchmarks/README.md)")
+    raise SystemExit(1)
+
+# Tamaño de la base de datos sobre la que se mide (se guarda con los presupuestos)
+MODELOS_CONTADOS = ['pi.usuario', 'pi.producto', 'pi.producto.imagen', 'pi.conversacion',
+                    'pi.mensaje', 'pi.compra', 'pi.valoracion', 'pi.comentario']
+
+
+def commit_actual():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def datos_medicion():
+    """Commit, base de datos y registros existentes sobre los que se han tomado las medidas"""
+    env.cr.execute("SELECT pg_size_pretty(pg_database_size(current_database()))")
+    return {
+        'commit': commit_actual(),
+        'fecha': time.strftime('%Y-%m-%d'),
+        'base_datos': env.cr.dbname,
+        'tamano_base_datos': env.cr.fetchone()[0],
+        'registros': {
+            modelo: env[modelo].sudo().with_context(active_test=False).search_count([])
+            for modelo in MODELOS_CONTADOS
+        },
+    }
+
+
+medicion = datos_medicion()
+resultados = {}
+fallos = []
+for n in tamanos:
+    prefijo = f'benchmodelos{n}_{int(time.time())}'
+    print(f"--- {n} registros")
+    try:
+        for modelo, operacion, funcion in operaciones(env, n, prefijo):
+            if solo_modelos and modelo not in solo_modelos:
+                # Los datos se crean igualmente porque los usan los modelos siguientes
+                funcion()
+                continue
+            __, consultas, ms = medir(env, funcion)
+            clave = f'{modelo} {operacion}'
+            resultados.setdefault(clave, {})[str(n)] = {'consultas': consultas, 'ms': round(ms, 1)}
+
+            limite = presupuestos.get(clave, {}).get(str(n))
+            avisos = []
+            if limite and consultas > limite['consultas']:
+                avisos.append(f"consultas {consultas} > {limite['consultas']}")
+            if limite and not solo_consultas and ms > limite['ms']:
+                avisos.append(f"tiempo {ms:.0f}ms > {limite['ms']}ms")
+            if avisos:
+                fallos.append(f"{clave} ({n}): {', '.join(avisos)}")
+            print(f"{'FALLO' if avisos else 'OK   '} {clave:<32} {consultas:>7} consultas {ms:>10.1f}ms"
+                  f"{'  (sin presupuesto)' if not limite else ''}")
+    finally:
+        env.cr.rollback()
+        env.invalidate_all()
+
+if salida:
+    with open(salida, 'w') as fichero:
+        json.dump(dict(resultados, _medido_en=medicion), fichero, indent=2, ensure_ascii=False)
+
+if actualizar:
+    for clave, por_tamano in resultados.items():
+        for n, medida in por_tamano.items():
+            presupuestos.setdefault(clave, {})[n] = {
+                'consultas': math.ceil(medida['consultas'] * margen),
+                'ms': math.ceil(medida['ms'] * margen),
+            }
+    presupuestos['_medido_en'] = medicion
+    with open(ruta_presupuestos, 'w') as fichero:
+        json.dump(presupuestos, fichero, indent=2, ensure_ascii=False, sort_keys=True)
+        fichero.write('\n')
+    print(f"Presupuestos actualizados en {ruta_presupuestos} (margen {margen})")
+    # Fila para la tabla de la medición de referencia de benchmarks/README.md
+    registros = medicion['registros']
+    print(f"| {(medicion['commit'] or '?')[:10]} | {medicion['fecha']} | {medicion['tamano_base_datos']} "
+          f"| {registros['pi.usuario']} | {registros['pi.producto']} | {registros['pi.mensaje']} "
+          f"| {registros['pi.compra']} |")
+elif fallos:
+    print('\n'.join(['Operaciones fuera de presupuesto:'] + fallos))
+    raise SystemExit(1)
@@ -0,0 +1,174 @@
+# Script para ejecutar desde la consola de Odoo o shell
+# Genera un marketplace sintético para las pruebas de carga (usuarios, productos con imágenes,
+# conversaciones con mensajes, compras y valoraciones) a través de los modelos de pi_core,
+# y guarda en un JSON los datos que necesita carga_api.py (emails, ids de productos, etc.)
+
+# Para ejecutar desde el shell de Odoo:
+# PI_BENCH_PRODUCTOS=5000 python odoo-bin shell -c odoo.conf -d nombre_base_datos
+# Luego ejecutar:
+# exec(open('ruta/a/benchmarks/sembrar_datos.py').read())
+#
+# Variables de entorno (todas opcionales):
+#   PI_BENCH_PREFIJO          prefijo de los emails generados (bench)
+#   PI_BENCH_USUARIOS         usuarios (200; al menos 101 para el escenario compra_concurrente)
+#   PI_BENCH_PRODUCTOS        productos (2000)
+#   PI_BENCH_IMAGENES         imágenes por producto (1)
+#   PI_BENCH_CONVERSACIONES   conversaciones (500)
+#   PI_BENCH_MENSAJES         mensajes por conversación (20)
+#   PI_BENCH_COMPRAS          compras confirmadas y valoradas (300)
+#   PI_BENCH_SEMILLA          semilla del generador aleatorio (42), para repetir el mismo conjunto
+#   PI_BENCH_SALIDA           fichero JSON de salida (semilla.json)
+
+import base64
+import io
+import json
+import os
+import random
+import time
+
+from PIL import Image
+
+config = {
+    'prefijo': os.environ.get('PI_BENCH_PREFIJO', 'bench'),
+    'usuarios': int(os.environ.get('PI_BENCH_USUARIOS', 200)),
+    'productos': int(os.environ.get('PI_BENCH_PRODUCTOS', 2000)),
+    'imagenes': int(os.environ.get('PI_BENCH_IMAGENES', 1)),
+    'conversaciones': int(os.environ.get('PI_BENCH_CONVERSACIONES', 500)),
+    'mensajes': int(os.environ.get('PI_BENCH_MENSAJES', 20)),
+    'compras': int(os.environ.get('PI_BENCH_COMPRAS', 300)),
+    'semilla': int(os.environ.get('PI_BENCH_SEMILLA', 42)),
+}
+salida = os.environ.get('PI_BENCH_SALIDA', 'semilla.json')
+password = 'bench-password'
+lote = 500
+aleatorio = random.Random(config['semilla'])
+inicio = time.monotonic()
+# Sin chatter ni tracking: solo interesa el volumen de datos
+ctx = dict(tracking_disable=True, mail_create_nolog=True, mail_notrack=True)
+
+if env['pi.usuario'].search_count([('email', '=like', f"{config['prefijo']}_%@bench.local")]):
+    raise SystemExit(f"Ya hay usuarios con el prefijo '{config['prefijo']}': usa otro PI_BENCH_PREFIJO")
+
+
+def imagen_png(color):
+    buffer = io.BytesIO()
+    Image.new('RGB', (640, 480), color).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def crear_por_lotes(modelo, vals_list):
+    registros = env[modelo].with_context(**ctx).browse()
+    for i in range(0, len(vals_list), lote):
+        registros |= env[modelo].with_context(**ctx).create(vals_list[i:i + lote])
+        env.cr.commit()
+    return registros
+
+
+# Categorías y etiquetas (se reutilizan las existentes)
+categorias = env['pi.categoria'].search([])
+if len(categorias) < 5:
+    categorias |= crear_por_lotes('pi.categoria', [
+        {'nombre': f"{config['prefijo']} categoría {i}"} for i in range(10)
+    ])
+etiquetas = env['pi.etiqueta'].search([])
+
+usuarios = crear_por_lotes('pi.usuario', [{
+    'name': f"{config['prefijo'].capitalize()} Usuario {i}",
+    'email': f"{config['prefijo']}_{i}@bench.local",
+    'es_usuario_marketplace': True,
+} for i in range(config['usuarios'])])
+# Un solo cálculo del KDF para todos: la contraseña es la misma
+env.cr.execute("UPDATE pi_usuario SET password = %s WHERE id IN %s",
+               (env['pi.usuario']._hash_password(password), tuple(usuarios.ids)))
+env.cr.commit()
+print(f"{len(usuarios)} usuarios")
+
+palabras = ('bicicleta', 'mesa', 'silla', 'lámpara', 'móvil', 'portátil', 'chaqueta', 'libro', 'cámara',
+            'sofá', 'guitarra', 'consola', 'reloj', 'zapatillas', 'mochila', 'televisor', 'patinete')
+ciudades = ('Madrid', 'Barcelona', 'Valencia', 'Sevilla', 'Bilbao', 'Zaragoza', 'Málaga', 'Murcia')
+# Base64 una sola vez por imagen (el campo Binary espera base64)
+imagenes = [base64.b64encode(imagen_png((aleatorio.randrange(256), aleatorio.randrange(256), aleatorio.randrange(256))))
+            for __ in range(8)]
+
+vals_productos = []
+for i in range(config['productos']):
+    nombre = f"{aleatorio.choice(palabras).capitalize()} {aleatorio.choice(palabras)} {i}"
+    vals_productos.append({
+        'nombre_producto': nombre,
+        'descripcion': f"{nombre} en buen estado. " + ' '.join(aleatorio.choices(palabras, k=12)),
+        'precio': round(aleatorio.uniform(5, 900), 2),
+        'categoria_id': aleatorio.choice(categorias).id,
+        'estado': aleatorio.choice(['nuevo', 'segunda_mano']),
+        'ubicacion': aleatorio.choice(ciudades),
+        'propietario_id': aleatorio.choice(usuarios).id,
+        'etiquetas_ids': [(6, 0, aleatorio.sample(etiquetas.ids, min(len(etiquetas), 3)))] if etiquetas else [],
+        'imagenes_ids': [(0, 0, {'imagen': aleatorio.choice(imagenes), 'nombre': f'bench_{i}_{j}.png'})
+                         for j in range(config['imagenes'])],
+    })
+productos = crear_por_lotes('pi.producto', vals_productos)
+print(f"{len(productos)} productos")
+
+# Conversaciones entre un comprador y el propietario de un producto
+vals_conversaciones = []
+for __ in range(config['conversaciones']):
+    producto = aleatorio.choice(productos)
+    comprador = aleatorio.choice(usuarios - producto.propietario_id)
+    vals_conversaciones.append({
+        'name': f'Interés en {producto.nombre_producto}',
+        'comprador_id': comprador.id,
+        'vendedor_id': producto.propietario_id.id,
+        'producto_id': producto.id,
+    })
+conversaciones = crear_por_lotes('pi.conversacion', vals_conversaciones)
+
+vals_mensajes = []
+for conversacion in conversaciones:
+    for j in range(config['mensajes']):
+        remitente = conversacion.comprador_id if j % 2 == 0 else conversacion.vendedor_id
+        vals_mensajes.append({
+            'conversacion_id': conversacion.id,
+            'remitente_id': remitente.id,
+            'contenido': ' '.join(aleatorio.choices(palabras, k=8)),
+            'tipo_contenido': 'texto',
+        })
+crear_por_lotes('pi.mensaje', vals_mensajes)
+print(f"{len(conversaciones)} conversaciones, {len(vals_mensajes)} mensajes")
+
+# Compras confirmadas y valoradas por ambas partes, sobre productos distintos
+vendidos = productos[:config['compras']]
+vals_compras = [{
+    'comprador_id': aleatorio.choice(usuarios - producto.propietario_id).id,
+    'producto_id': producto.id,
+} for producto in vendidos]
+compras = crear_por_lotes('pi.compra', vals_compras)
+vendidos.with_context(**ctx).write({'estado_venta': 'vendido'})
+compras.with_context(**ctx).write({'estado': 'confirmada'})
+crear_por_lotes('pi.valoracion', [vals for compra in compras for vals in (
+    {'compra_id': compra.id, 'tipo_valoracion': 'vendedor', 'valoracion': str(aleatorio.randint(1, 5)),
+     'usuario_valorado_id': compra.vendedor_id.id, 'usuario_valorador_id': compra.comprador_id.id},
+    {'compra_id': compra.id, 'tipo_valoracion': 'comprador', 'valoracion': str(aleatorio.randint(1, 5)),
+     'usuario_valorado_id': compra.comprador_id.id, 'usuario_valorador_id': compra.vendedor_id.id},
+)])
+print(f"{len(compras)} compras valoradas")
+
+# Estadísticas al día para que el planificador use los índices
+for tabla in ('pi_usuario', 'pi_producto', 'pi_producto_imagen', 'pi_conversacion', 'pi_mensaje', 'pi_compra', 'pi_valoracion'):
+    env.cr.execute(f'ANALYZE "{tabla}"')
+env.cr.commit()
+
+disponibles = productos - vendidos
+semilla = {
+    'config': config,
+    'password': password,
+    'usuarios': [{'id': u.id, 'email': u.email} for u in usuarios],
+    'productos': disponibles.ids,
+    'categorias': categorias.ids,
+    'conversaciones': [{
+        'id': c.id,
+        'comprador_email': c.comprador_id.email,
+        'vendedor_email': c.vendedor_id.email,
+    } for c in conversaciones],
+}
+with open(salida, 'w') as fichero:
+    json.dump(semilla, fichero)
+print(f"Datos generados en {time.monotonic() - inicio:.1f}s; semilla guardada en {salida}")
@@ -16,7 +16,11 @@
         - Categorías
     ''',
     'depends': ['base', 'web', 'mail', 'pi_core'],
-    'data': [],
+    'data': [
+        'security/ir.model.access.csv',
+        'data/ir_config_parameter.xml',
+        'data/ir_cron.xml',
+    ],
     'installable': True,
     'application': False,
     'author': 'Tu Nombre',
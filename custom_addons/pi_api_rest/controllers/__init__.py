@@ -10,3 +10,6 @@ from . import valoraciones_controller
 from . import usuarios_controller
 from . import categorias_controller
 from . import etiquetas_controller
+from . import imagenes_controller
+from . import catalogo_controller
+from . import metricas_controller
@@ -1,9 +1,55 @@
 import jwt
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from functools import wraps
 from odoo import http
 from odoo.http import request
 
+
+class UsuarioCache:
+    """Caché LRU con TTL, local a cada worker: (db, id_usuario) -> (id de pi.usuario, activo)
+
+    Evita buscar el pi.usuario en cada petición autenticada. PiUsuario.write/unlink
+    invalidan las entradas afectadas en este worker, al escribir y de nuevo tras el
+    commit; en los demás workers la entrada caduca como mucho tras TTL segundos.
+    """
+
+    def __init__(self, max_size=2048, ttl=300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, clave):
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return None
+            valor, caduca = entrada
+            if caduca < time.monotonic():
+                del self._datos[clave]
+                return None
+            self._datos.move_to_end(clave)
+            return valor
+
+    def guardar(self, clave, valor):
+        with self._lock:
+            self._datos[clave] = (valor, time.monotonic() + self.ttl)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_size:
+                self._datos.popitem(last=False)
+
+    def invalidar(self, dbname, ids_usuario):
+        with self._lock:
+            for id_usuario in ids_usuario:
+                self._datos.pop((dbname, id_usuario), None)
+
+
+usuario_cache = UsuarioCache()
+
+
 class JWTAuth:
     """Gestión de autenticación JWT con Bearer tokens"""
     
@@ -11,6 +57,14 @@ class JWTAuth:
     ALGORITHM = 'HS256'
     TOKEN_EXPIRY = 24  # horas
     
+    # Fracción de TOKEN_EXPIRY a partir de la cual se emite un nuevo token (ir.config_parameter)
+    PARAM_RATIO_RENOVACION = 'pi_api_rest.jwt_ratio_renovacion'
+    RATIO_RENOVACION_DEFECTO = 0.5
+    
+    # Contadores por worker de tokens renovados y de renovaciones evitadas
+    contadores = {'emitidos': 0, 'omitidos': 0}
+    _contadores_lock = threading.Lock()
+    
     @staticmethod
     def generar_token(usuario_id, email):
         """Genera un token JWT"""
@@ -48,6 +102,50 @@ class JWTAuth:
             return None
         
         return partes[1]
+    
+    @staticmethod
+    def debe_renovar(payload):
+        """Indica si el token ya ha consumido la fracción configurada de su vida útil
+        
+        Con ratio 0 se renueva en cada respuesta (comportamiento anterior).
+        """
+        try:
+            ratio = float(request.env['ir.config_parameter'].sudo().get_param(
+                JWTAuth.PARAM_RATIO_RENOVACION, JWTAuth.RATIO_RENOVACION_DEFECTO))
+        except (TypeError, ValueError):
+            ratio = JWTAuth.RATIO_RENOVACION_DEFECTO
+        
+        emitido = payload.get('iat')
+        if not emitido or ratio <= 0:
+            return True
+        
+        transcurrido = time.time() - emitido
+        return transcurrido >= ratio * JWTAuth.TOKEN_EXPIRY * 3600
+    
+    @staticmethod
+    def contar(clave):
+        with JWTAuth._contadores_lock:
+            JWTAuth.contadores[clave] += 1
+    
+    @staticmethod
+    def obtener_usuario(id_usuario):
+        """Devuelve el pi.usuario (sudo) correspondiente al id_usuario del token, o None si no existe o está inactivo"""
+        clave = (request.db, id_usuario)
+        datos = usuario_cache.obtener(clave)
+        
+        if datos is None:
+            usuario = request.env['pi.usuario'].sudo().with_context(active_test=False).search([
+                ('id_usuario', '=', id_usuario)
+            ], limit=1)
+            if not usuario:
+                return None
+            datos = (usuario.id, usuario.active)
+            usuario_cache.guardar(clave, datos)
+        
+        usuario_db_id, activo = datos
+        if not activo:
+            return None
+        return request.env['pi.usuario'].sudo().browse(usuario_db_id)
 
 
 def jwt_required(f):
@@ -70,7 +168,6 @@ def jwt_required(f):
                 'status': 401
             }
         
-        # Obtener usuario directamente del payload sin búsqueda en BD
         usuario_id = payload.get('usuario_id')
         usuario_email = payload.get('email')
         
@@ -80,21 +177,35 @@ def jwt_required(f):
                 'status': 401
             }
         
-        # Guardar datos del usuario en request sin hacer búsqueda
+        # Resolver el pi.usuario una sola vez (con caché por worker)
+        usuario = JWTAuth.obtener_usuario(usuario_id)
+        if not usuario:
+            return {
+                'error': 'Usuario no encontrado',
+                'status': 401
+            }
+        
+        # Guardar datos del usuario en request para los controladores
         request.usuario_actual = {
             'id': usuario_id,
             'email': usuario_email
         }
+        request.usuario = usuario
+        
+        # Se decide antes de ejecutar la ruta: /conversaciones/stream cierra el cursor de la petición
+        renovar = JWTAuth.debe_renovar(payload)
         
         # Ejecutar la función original
         resultado = f(*args, **kwargs)
         
-        # Generar nuevo token
-        nuevo_token = JWTAuth.generar_token(usuario_id, usuario_email)
-        
-        # Si el resultado es un diccionario, agregar el nuevo token
-        if isinstance(resultado, dict):
-            resultado['nuevo_token'] = nuevo_token
+        # Si el resultado es un diccionario y el token está cerca de caducar, agregar uno nuevo
+        # (salvo que la ruta ya haya emitido uno, p. ej. tras un cambio de email)
+        if isinstance(resultado, dict) and 'nuevo_token' not in resultado:
+            if renovar:
+                resultado['nuevo_token'] = JWTAuth.generar_token(usuario_id, usuario_email)
+                JWTAuth.contar('emitidos')
+            else:
+                JWTAuth.contar('omitidos')
         
         return resultado
     
@@ -1,13 +1,17 @@
 from odoo import http, fields
+from odoo.addons.pi_core.models.pi_usuarios import HashOcupado
+from odoo.exceptions import UserError
 from odoo.http import request
-import hashlib
+from psycopg2 import IntegrityError
 import json
 from .auth import JWTAuth
+from .limitador import limitar_acceso
 from .utils import APIUtils
 
 class AuthController(http.Controller):
     
     @http.route('/api/v1/auth/registro', type='json', auth='public', methods=['POST'], csrf=False)
+    @limitar_acceso('registro')
     def registro(self, **kwargs):
         """Registra un nuevo usuario"""
         try:
@@ -23,22 +27,25 @@ class AuthController(http.Controller):
             if not all([nombre, email, password]):
                 return APIUtils.error_response('Nombre, email y contraseña son requeridos', 400)
             
-            # Verificar que el email sea único
-            usuario_existente = request.env['pi.usuario'].sudo().search([
-                ('email', '=', email)
-            ], limit=1)
-            if usuario_existente:
+            # Verificar que el email sea único (sin distinguir mayúsculas)
+            Usuario = request.env['pi.usuario'].sudo()
+            if Usuario.search_count([('email_normalizado', '=', Usuario.normalizar_email(email))], limit=1):
                 return APIUtils.error_response('El email ya está registrado', 400)
             
-            # Crear usuario
-            usuario = request.env['pi.usuario'].sudo().create({
-                'name': nombre,
-                'email': email,
-                'password': password,
-                'phone': telefono or '',
-                'street': ubicacion or '',
-                'es_usuario_marketplace': True,
-            })
+            # Crear usuario; el índice único resuelve dos registros simultáneos con el mismo email
+            try:
+                with request.env.cr.savepoint():
+                    usuario = Usuario.create({
+                        'name': nombre,
+                        'email': email.strip(),
+                        'password': password,
+                        'phone': telefono or '',
+                        'street': ubicacion or '',
+                        'es_usuario_marketplace': True,
+                    })
+                    usuario.flush_recordset()
+            except IntegrityError:
+                return APIUtils.error_response('El email ya está registrado', 400)
             
             # Generar token
             token = JWTAuth.generar_token(usuario.id_usuario, email)
@@ -49,10 +56,16 @@ class AuthController(http.Controller):
                 'usuario': APIUtils.usuario_to_dict(usuario)
             }, 201)
             
+        except HashOcupado as e:
+            return APIUtils.error_response(str(e), 503)
+        except UserError as e:
+            # Incluye ValidationError de res.partner / pi.usuario
+            return APIUtils.error_response(str(e), 400)
         except Exception as e:
             return APIUtils.error_response(str(e), 500)
     
     @http.route('/api/v1/auth/login', type='json', auth='public', methods=['POST'], csrf=False)
+    @limitar_acceso('login')
     def login(self, **kwargs):
         """Login de usuario"""
         try:
@@ -65,16 +78,13 @@ class AuthController(http.Controller):
             if not email or not password:
                 return APIUtils.error_response('Email y contraseña son requeridos', 400)
             
-            usuario = request.env['pi.usuario'].sudo().search([
-                ('email', '=', email)
+            Usuario = request.env['pi.usuario'].sudo()
+            usuario = Usuario.search([
+                ('email_normalizado', '=', Usuario.normalizar_email(email))
             ], limit=1)
             
-            if not usuario:
-                return APIUtils.error_response('Credenciales inválidas', 401)
-            
-            # Verificar contraseña (sin hash por ahora)
-            password_hash = hashlib.sha256(password.encode()).hexdigest()
-            if usuario.password != password_hash:
+            # Comparación en tiempo constante, también cuando el email no existe
+            if not usuario.verificar_password(password):
                 return APIUtils.error_response('Credenciales inválidas', 401)
         
             # Generar token
@@ -86,6 +96,9 @@ class AuthController(http.Controller):
                 'usuario': APIUtils.usuario_to_dict(usuario)
             })
             
+        except HashOcupado as e:
+            # Demasiados cálculos de hash simultáneos en este proceso
+            return APIUtils.error_response(str(e), 503)
         except Exception as e:
             return APIUtils.error_response(str(e), 500)
     
@@ -111,6 +124,10 @@ class AuthController(http.Controller):
             if not usuario:
                 return APIUtils.error_response('Usuario no encontrado', 401)
             
+            # Un token emitido antes de un cambio de email no se renueva
+            if usuario.email_normalizado != usuario.normalizar_email(payload.get('email')):
+                return APIUtils.error_response('El email de la cuenta ha cambiado, inicia sesión de nuevo', 401)
+            
             nuevo_token = JWTAuth.generar_token(usuario.id_usuario, usuario.email)
             
             return APIUtils.json_response({
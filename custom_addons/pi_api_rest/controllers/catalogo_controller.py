@@ -0,0 +1,117 @@
+from odoo import http
+from odoo.http import request
+from .utils import APIUtils
+import hashlib
+import json
+import threading
+import time
+
+
+class CatalogoCache:
+    """Respuesta serializada de /api/v1/catalogo por base de datos, local a cada worker
+
+    pi.categoria y pi.etiqueta la invalidan al escribir en este worker; en los demás
+    workers, pasado TTL segundos se vuelve a calcular la versión y solo se reconstruye
+    la respuesta si ha cambiado.
+    """
+
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self._datos = {}  # db -> (version, cuerpo, comprobado)
+        self._lock = threading.Lock()
+
+    def obtener(self, dbname):
+        """Devuelve (version, cuerpo, vigente) o None"""
+        with self._lock:
+            entrada = self._datos.get(dbname)
+        if entrada is None:
+            return None
+        version, cuerpo, comprobado = entrada
+        return version, cuerpo, comprobado + self.ttl > time.monotonic()
+
+    def guardar(self, dbname, version, cuerpo):
+        with self._lock:
+            self._datos[dbname] = (version, cuerpo, time.monotonic())
+
+    def invalidar(self, dbname):
+        with self._lock:
+            self._datos.pop(dbname, None)
+
+
+catalogo_cache = CatalogoCache()
+
+
+class CatalogoController(http.Controller):
+
+    @http.route('/api/v1/catalogo', type='http', auth='none', methods=['GET'], csrf=False)
+    def obtener_catalogo(self, **kwargs):
+        """Categorías y etiquetas activas en una sola respuesta versionada
+
+        Responde con ETag (la versión del catálogo) y devuelve 304 si coincide con If-None-Match.
+        Las imágenes de las categorías se sirven por URL.
+        """
+        entrada = catalogo_cache.obtener(request.db)
+        if entrada is not None and entrada[2]:
+            version, cuerpo = entrada[0], entrada[1]
+        else:
+            version = self._version_catalogo()
+            if entrada is not None and entrada[0] == version:
+                cuerpo = entrada[1]
+            else:
+                cuerpo = json.dumps(self._construir_catalogo(version)).encode()
+            catalogo_cache.guardar(request.db, version, cuerpo)
+
+        cabeceras = [('ETag', f'"{version}"'), ('Cache-Control', 'no-cache')]
+        if request.httprequest.if_none_match.contains(version):
+            return request.make_response(b'', headers=cabeceras, status=304)
+        return request.make_response(cuerpo, headers=cabeceras + [('Content-Type', 'application/json; charset=utf-8')])
+
+    def _version_catalogo(self):
+        """Hash de los campos que devuelve la respuesta (detecta también altas y borrados)
+
+        No se usa write_date: los contadores almacenados de pi.categoria lo cambian cada
+        vez que se publica o se vende un producto, sin que cambie el catálogo.
+        """
+        cr = request.env.cr
+        cr.execute("""
+            SELECT md5(coalesce(string_agg(
+                json_build_array(c.id, c.id_categoria, c.nombre, c.descripcion, a.checksum)::text, ',' ORDER BY c.id
+            ), ''))
+            FROM pi_categoria c
+            LEFT JOIN ir_attachment a ON a.res_model = 'pi.categoria' AND a.res_field = 'imagen' AND a.res_id = c.id
+        """)
+        categorias = cr.fetchone()[0]
+        cr.execute("""
+            SELECT md5(coalesce(string_agg(
+                json_build_array(id, nombre, descripcion, color)::text, ',' ORDER BY id
+            ), ''))
+            FROM pi_etiqueta WHERE activo
+        """)
+        etiquetas = cr.fetchone()[0]
+        return hashlib.sha1(f'{categorias}:{etiquetas}'.encode()).hexdigest()[:16]
+
+    def _construir_catalogo(self, version):
+        categorias = request.env['pi.categoria'].sudo().search_read(
+            [], ['id_categoria', 'nombre', 'descripcion']
+        )
+        # Checksum de las imágenes, sin leer el binario
+        checksums = APIUtils.categoria_imagen_checksums([cat['id'] for cat in categorias])
+        etiquetas = request.env['pi.etiqueta'].sudo().search_read(
+            [('activo', '=', True)], ['nombre', 'descripcion', 'color']
+        )
+        return {
+            'version': version,
+            'categorias': [{
+                'id': cat['id'],
+                'id_categoria': cat['id_categoria'],
+                'nombre': cat['nombre'],
+                'descripcion': cat['descripcion'],
+                'imagen': APIUtils.categoria_imagen_url(cat['id'], checksums[cat['id']]) if cat['id'] in checksums else None,
+            } for cat in categorias],
+            'etiquetas': [{
+                'id': etq['id'],
+                'nombre': etq['nombre'],
+                'descripcion': etq['descripcion'],
+                'color': etq['color'],
+            } for etq in etiquetas],
+        }
@@ -36,6 +36,7 @@ class CategoriasController(http.Controller):
                     'nombre': cat.nombre,
                     'descripcion': cat.descripcion,
                     'total_productos': cat.total_productos,
+                    'productos_activos': cat.productos_activos,
                     'imagen': imagen_b64,
                 })
             
@@ -68,6 +69,7 @@ class CategoriasController(http.Controller):
                 'nombre': categoria.nombre,
                 'descripcion': categoria.descripcion,
                 'total_productos': categoria.total_productos,
+                'productos_activos': categoria.productos_activos,
                 'imagen': imagen_b64,
             })
             
@@ -11,12 +11,7 @@ class ComentariosController(http.Controller):
     def listar_comentarios_usuario(self, **kwargs):
         """Lista todos los comentarios del usuario autenticado"""
         try:
-            usuario_data = request.usuario_actual
-            
-            # Buscar el usuario por id_usuario para obtener su ID numérico de Odoo
-            usuario = request.env['pi.usuario'].sudo().search([('id_usuario', '=', usuario_data['id'])], limit=1)
-            if not usuario:
-                return APIUtils.error_response('Usuario no encontrado', 404)
+            usuario = request.usuario
             
             offset = request.httprequest.args.get('offset', 0, type=int)
             limit = request.httprequest.args.get('limit', 20, type=int)
@@ -92,14 +87,8 @@ class ComentariosController(http.Controller):
         import logging
         _logger = logging.getLogger(__name__)
         try:
-            usuario_data = request.usuario_actual
-            _logger.info(f"[crear_comentario] usuario_data={usuario_data}, producto_id={producto_id}, kwargs={kwargs}")
-
-            # Buscar el usuario por id_usuario para obtener su ID numérico de Odoo
-            usuario = request.env['pi.usuario'].sudo().search([('id_usuario', '=', usuario_data['id'])], limit=1)
-            if not usuario:
-                _logger.warning(f"[crear_comentario] Usuario no encontrado: {usuario_data['id']}")
-                return {'error': 'Usuario no encontrado', 'status': 404}
+            usuario = request.usuario
+            _logger.info(f"[crear_comentario] usuario={usuario.id_usuario}, producto_id={producto_id}, kwargs={kwargs}")
 
             producto = request.env['pi.producto'].sudo().browse(producto_id)
             if not producto.exists():
@@ -1,9 +1,14 @@
 from odoo import http
 from odoo.http import request
+from odoo.exceptions import UserError
+from psycopg2 import errors
 from .auth import jwt_required, JWTAuth
 from .utils import APIUtils
 import json
 
+# Errores de bloqueo que Odoo resuelve reintentando la petición (ver pi.producto._bloquear_para_venta)
+ERRORES_CONCURRENCIA = (errors.LockNotAvailable, errors.SerializationFailure)
+
 class ComprasController(http.Controller):
     
     @http.route('/api/v1/compras', type='json', auth='none', methods=['GET', 'POST'])
@@ -11,16 +16,9 @@ class ComprasController(http.Controller):
     def listar_compras(self, **kwargs):
         """Lista todas las compras del usuario autenticado (como comprador o vendedor)"""
         try:
-            usuario_data = request.usuario_actual
-            
-            # Buscar el usuario por id_usuario para obtener su ID numérico de Odoo
-            usuario = request.env['pi.usuario'].sudo().search([('id_usuario', '=', usuario_data['id'])], limit=1)
-            if not usuario:
-                return APIUtils.error_response('Usuario no encontrado', 404)
+            usuario = request.usuario
             
             # Obtener parámetros de kwargs (JSON-RPC body) o query string
-            offset = kwargs.get('offset', 0) if 'offset' in kwargs else request.httprequest.args.get('offset', 0, type=int)
-            limit = kwargs.get('limit', 50) if 'limit' in kwargs else request.httprequest.args.get('limit', 50, type=int)
             tipo = kwargs.get('tipo') or request.httprequest.args.get('tipo')
             estado = kwargs.get('estado') or request.httprequest.args.get('estado')
             
@@ -34,8 +32,7 @@ class ComprasController(http.Controller):
             if estado:
                 domain.append(('estado', '=', estado))
             
-            compras = request.env['pi.compra'].sudo().search(domain, offset=offset, limit=limit, order='fecha desc')
-            total = request.env['pi.compra'].sudo().search_count(domain)
+            compras, paginacion = APIUtils.paginar(request.env['pi.compra'].sudo(), domain, 'fecha', kwargs, limit=50)
             
             resultado = []
             for compra in compras:
@@ -60,13 +57,10 @@ class ComprasController(http.Controller):
                     } if compra.producto_id else None,
                 })
             
-            return APIUtils.json_response({
-                'total': total,
-                'offset': offset,
-                'limit': limit,
-                'compras': resultado
-            })
+            return APIUtils.json_response(dict(paginacion, compras=resultado))
             
+        except ValueError as e:
+            return APIUtils.error_response(str(e), 400)
         except Exception as e:
             return APIUtils.error_response(str(e), 500)
     
@@ -75,12 +69,7 @@ class ComprasController(http.Controller):
     def crear_compra(self, **kwargs):
         """Crea una nueva compra"""
         try:
-            usuario_data = request.usuario_actual
-            
-            # Buscar el usuario por id_usuario para obtener su ID numérico de Odoo
-            usuario = request.env['pi.usuario'].sudo().search([('id_usuario', '=', usuario_data['id'])], limit=1)
-            if not usuario:
-                return APIUtils.error_response('Usuario no encontrado', 404)
+            usuario = request.usuario
             
             # Obtener datos JSON correctamente
             data = kwargs if kwargs else (request.jsonrequest if hasattr(request, 'jsonrequest') else json.loads(request.httprequest.data))
@@ -93,16 +82,21 @@ class ComprasController(http.Controller):
             if not producto.exists():
                 return APIUtils.error_response('Producto no encontrado', 404)
             
-            if producto.estado_venta != 'disponible':
-                return APIUtils.error_response('El producto no está disponible', 400)
-            
             if producto.propietario_id.id == usuario.id:
                 return APIUtils.error_response('No puedes comprar tu propio producto', 400)
             
-            compra = request.env['pi.compra'].sudo().create({
-                'comprador_id': usuario.id,
-                'producto_id': producto_id,
-            })
+            if producto.estado_venta != 'disponible':
+                return APIUtils.error_response('El producto no está disponible', 409)
+            
+            # Reserva atómica: de varias compras simultáneas solo una reserva el producto.
+            # Reserva y compra van juntas: si el create falla, el producto no queda reservado
+            with request.env.cr.savepoint():
+                if not producto.reservar():
+                    return APIUtils.error_response('El producto no está disponible', 409)
+                compra = request.env['pi.compra'].sudo().create({
+                    'comprador_id': usuario.id,
+                    'producto_id': producto_id,
+                })
             
             return APIUtils.json_response({
                 'mensaje': 'Compra creada exitosamente',
@@ -110,6 +104,9 @@ class ComprasController(http.Controller):
                 'estado': compra.estado
             }, 201)
             
+        except ERRORES_CONCURRENCIA:
+            # Odoo reintenta la petición completa con una transacción nueva
+            raise
         except Exception as e:
             return APIUtils.error_response(str(e), 500)
     
@@ -118,12 +115,7 @@ class ComprasController(http.Controller):
     def obtener_compra(self, compra_id, **kwargs):
         """Obtiene los detalles de una compra"""
         try:
-            usuario_data = request.usuario_actual
-            
-            # Buscar el usuario por id_usuario para obtener su ID numérico de Odoo
-            usuario = request.env['pi.usuario'].sudo().search([('id_usuario', '=', usuario_data['id'])], limit=1)
-            if not usuario:
-                return APIUtils.error_response('Usuario no encontrado', 404)
+            usuario = request.usuario
             
             compra = request.env['pi.compra'].sudo().browse(compra_id)
             
@@ -153,12 +145,7 @@ class ComprasController(http.Controller):
     def actualizar_compra(self, compra_id, **kwargs):
         """Actualiza una compra (solo ciertos campos según estado)"""
         try:
-            usuario_data = request.usuario_actual
-            
-            # Buscar el usuario por id_usuario para obtener su ID numérico de Odoo
-            usuario = request.env['pi.usuario'].sudo().search([('id_usuario', '=', usuario_data['id'])], limit=1)
-            if not usuario:
-                return APIUtils.error_response('Usuario no encontrado', 404)
+            usuario = request.usuario
             
             compra = request.env['pi.compra'].sudo().browse(compra_id)
             
@@ -196,12 +183,7 @@ class ComprasController(http.Controller):
     def cancelar_compra(self, compra_id, **kwargs):
         """Cancela una compra (solo si está en estado pendiente)"""
         try:
-            usuario_data = request.usuario_actual
-            
-            # Buscar el usuario por id_usuario para obtener su ID numérico de Odoo
-            usuario = request.env['pi.usuario'].sudo().search([('id_usuario', '=', usuario_data['id'])], limit=1)
-            if not usuario:
-                return APIUtils.error_response('Usuario no encontrado', 404)
+            usuario = request.usuario
             
             compra = request.env['pi.compra'].sudo().browse(compra_id)
             
@@ -234,12 +216,7 @@ class ComprasController(http.Controller):
     def confirmar_compra(self, compra_id, **kwargs):
         """Confirma una compra"""
         try:
-            usuario_data = request.usuario_actual
-            
-            # Buscar el usuario por id_usuario para obtener su ID numérico de Odoo
-            usuario = request.env['pi.usuario'].sudo().search([('id_usuario', '=', usuario_data['id'])], limit=1)
-            if not usuario:
-                return APIUtils.error_response('Usuario no encontrado', 404)
+            usuario = request.usuario
             
             compra = request.env['pi.compra'].sudo().browse(compra_id)
             
@@ -256,6 +233,10 @@ class ComprasController(http.Controller):
                 'estado': compra.estado
             })
             
+        except ERRORES_CONCURRENCIA:
+            raise
+        except UserError as e:
+            return APIUtils.error_response(str(e), 409)
         except Exception as e:
             return APIUtils.error_response(str(e), 500)
 
@@ -266,13 +247,8 @@ class ComprasController(http.Controller):
         import logging
         _logger = logging.getLogger(__name__)
         try:
-            usuario_data = request.usuario_actual
-            _logger.info(f"Rechazar compra {compra_id} por usuario {usuario_data.get('id')}")
-            
-            # Buscar el usuario por id_usuario para obtener su ID numérico de Odoo
-            usuario = request.env['pi.usuario'].sudo().search([('id_usuario', '=', usuario_data['id'])], limit=1)
-            if not usuario:
-                return APIUtils.error_response('Usuario no encontrado', 404)
+            usuario = request.usuario
+            _logger.info(f"Rechazar compra {compra_id} por usuario {usuario.id_usuario}")
             
             compra = request.env['pi.compra'].sudo().browse(compra_id)
             
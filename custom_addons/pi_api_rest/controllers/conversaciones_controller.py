@@ -1,6 +1,7 @@
 from odoo import http
 from odoo.http import request
 from .auth import jwt_required, JWTAuth
+from .notificaciones import despachador_mensajes
 from .utils import APIUtils
 import json
 
@@ -11,27 +12,13 @@ class ConversacionesController(http.Controller):
     def listar_conversaciones(self, **kwargs):
         """Lista las conversaciones del usuario"""
         try:
-            usuario_data = request.usuario_actual
+            usuario = request.usuario
             
-            # Buscar el usuario por id_usuario para obtener su ID numérico de Odoo
-            usuario = request.env['pi.usuario'].sudo().search([('id_usuario', '=', usuario_data['id'])], limit=1)
-            if not usuario:
-                return APIUtils.error_response('Usuario no encontrado', 404)
-            
-            offset = request.httprequest.args.get('offset', 0, type=int)
-            limit = request.httprequest.args.get('limit', 20, type=int)
-            
-            conversaciones = request.env['pi.conversacion'].sudo().search([
+            conversaciones, paginacion = APIUtils.paginar(request.env['pi.conversacion'].sudo(), [
                 '|',
                 ('comprador_id', '=', usuario.id),
                 ('vendedor_id', '=', usuario.id)
-            ], offset=offset, limit=limit, order='last_message_date desc')
-            
-            total = request.env['pi.conversacion'].sudo().search_count([
-                '|',
-                ('comprador_id', '=', usuario.id),
-                ('vendedor_id', '=', usuario.id)
-            ])
+            ], 'last_message_date', kwargs, limit=20)
             
             resultado = []
             for conv in conversaciones:
@@ -50,28 +37,92 @@ class ConversacionesController(http.Controller):
                     'producto_id': conv.producto_id.id if conv.producto_id else None,
                 })
             
-            return APIUtils.json_response({
-                'total': total,
-                'offset': offset,
-                'limit': limit,
-                'conversaciones': resultado
-            })
+            return APIUtils.json_response(dict(paginacion, conversaciones=resultado))
+            
+        except ValueError as e:
+            return APIUtils.error_response(str(e), 400)
+        except Exception as e:
+            return APIUtils.error_response(str(e), 500)
+    
+    
+    # Espera máxima (segundos) de /api/v1/conversaciones/stream
+    STREAM_TIMEOUT = 25
+    STREAM_TIMEOUT_MAX = 55
+    
+    @http.route('/api/v1/conversaciones/stream', type='json', auth='public', methods=['POST'], csrf=False)
+    @jwt_required
+    def stream_mensajes(self, **kwargs):
+        """Long-polling de mensajes nuevos en las conversaciones del usuario
+        
+        Sin after_id responde al momento con el último id y los no leídos. Con after_id
+        mantiene la petición abierta hasta que llega algún mensaje o vence el timeout.
+        
+        Durante la espera no se retiene ninguna conexión a la base de datos: el cursor de la
+        petición se cierra y, al despertar, se consulta con un cursor nuevo y breve. Aun así
+        la petición ocupa su worker, así que en modo prefork esta ruta debe servirse desde el
+        worker gevent (gevent_port), como /websocket.
+        """
+        try:
+            after_id = APIUtils.entero(kwargs.get('after_id'), 'after_id')
+            timeout = APIUtils.entero(kwargs.get('timeout'), 'timeout', self.STREAM_TIMEOUT)
+        except ValueError as e:
+            return APIUtils.error_response(str(e), 400)
+        timeout = min(max(timeout, 0), self.STREAM_TIMEOUT_MAX)
+        
+        try:
+            usuario_id = request.usuario.id
+            
+            with despachador_mensajes.suscripcion(request.db, usuario_id) as evento:
+                novedades = self._novedades(request.env, usuario_id, after_id)
+                if after_id is not None and not novedades['mensajes'] and timeout:
+                    # Devolver la conexión al pool mientras se espera (Odoo no hace commit de un cursor cerrado)
+                    registry = request.env.registry
+                    request.env.cr.close()
+                    if evento.wait(timeout):
+                        with registry.cursor() as cr:
+                            novedades = self._novedades(request.env(cr=cr), usuario_id, after_id)
+            
+            return APIUtils.json_response(novedades)
             
         except Exception as e:
             return APIUtils.error_response(str(e), 500)
     
+    def _novedades(self, env, usuario_id, after_id, limit=100):
+        """Mensajes con id > after_id de las conversaciones del usuario y no leídos por conversación"""
+        Mensaje = env['pi.mensaje'].sudo()
+        domain = [
+            '|',
+            ('conversacion_id.comprador_id', '=', usuario_id),
+            ('conversacion_id.vendedor_id', '=', usuario_id),
+        ]
+        
+        if after_id is None:
+            mensajes = Mensaje.browse()
+            ultimo = Mensaje.search(domain, limit=1, order='id desc')
+            ultimo_id = ultimo.id or 0
+        else:
+            mensajes = Mensaje.search(domain + [('id', '>', after_id)], limit=limit, order='id asc')
+            ultimo_id = mensajes[-1].id if mensajes else after_id
+        
+        no_leidos = Mensaje._read_group(
+            domain + [('leido', '=', False), ('remitente_id', '!=', usuario_id)],
+            ['conversacion_id'], ['__count'],
+        )
+        
+        return {
+            'ultimo_id': ultimo_id,
+            'mensajes': [
+                dict(APIUtils.mensaje_to_dict(m), conversacion_id=m.conversacion_id.id) for m in mensajes
+            ],
+            'no_leidos': {str(conversacion.id): total for conversacion, total in no_leidos},
+        }
     
     @http.route('/api/v1/conversaciones/<int:conversacion_id>', type='json', auth='public', methods=['GET', 'POST'], csrf=False)
     @jwt_required
     def obtener_conversacion(self, conversacion_id, **kwargs):
         """Obtiene los detalles de una conversación específica"""
         try:
-            usuario_data = request.usuario_actual
-            
-            # Buscar el usuario por id_usuario para obtener su ID numérico de Odoo
-            usuario = request.env['pi.usuario'].sudo().search([('id_usuario', '=', usuario_data['id'])], limit=1)
-            if not usuario:
-                return APIUtils.error_response('Usuario no encontrado', 404)
+            usuario = request.usuario
             
             conversacion = request.env['pi.conversacion'].sudo().browse(conversacion_id)
             
@@ -105,12 +156,7 @@ class ConversacionesController(http.Controller):
     def actualizar_conversacion(self, conversacion_id, **kwargs):
         """Actualiza el estado de una conversación (archivar, etc.)"""
         try:
-            usuario_data = request.usuario_actual
-            
-            # Buscar el usuario por id_usuario para obtener su ID numérico de Odoo
-            usuario = request.env['pi.usuario'].sudo().search([('id_usuario', '=', usuario_data['id'])], limit=1)
-            if not usuario:
-                return APIUtils.error_response('Usuario no encontrado', 404)
+            usuario = request.usuario
             
             conversacion = request.env['pi.conversacion'].sudo().browse(conversacion_id)
             
@@ -142,12 +188,7 @@ class ConversacionesController(http.Controller):
     def obtener_mensajes(self, conversacion_id, **kwargs):
         """Obtiene los mensajes de una conversación"""
         try:
-            usuario_data = request.usuario_actual
-            
-            # Buscar el usuario por id_usuario para obtener su ID numérico de Odoo
-            usuario = request.env['pi.usuario'].sudo().search([('id_usuario', '=', usuario_data['id'])], limit=1)
-            if not usuario:
-                return APIUtils.error_response('Usuario no encontrado', 404)
+            usuario = request.usuario
             
             conversacion = request.env['pi.conversacion'].sudo().browse(conversacion_id)
             
@@ -157,24 +198,48 @@ class ConversacionesController(http.Controller):
             if conversacion.comprador_id.id != usuario.id and conversacion.vendedor_id.id != usuario.id:
                 return APIUtils.error_response('No tienes acceso a esta conversación', 403)
             
-            offset = request.httprequest.args.get('offset', 0, type=int)
-            limit = request.httprequest.args.get('limit', 50, type=int)
-            
-            mensajes = conversacion.mensaje_ids.sorted('fecha_envio')[offset:offset+limit]
-            
-            # Marcar mensajes como leídos
-            for mensaje in mensajes:
-                if mensaje.remitente_id.id != usuario.id and not mensaje.leido:
-                    mensaje.leido = True
+            params = request.httprequest.args
+            before_id = APIUtils.entero(kwargs.get('before_id') or params.get('before_id'), 'before_id')
+            after_id = APIUtils.entero(kwargs.get('after_id') or params.get('after_id'), 'after_id')
+            domain = [('conversacion_id', '=', conversacion.id)]
+            Mensaje = request.env['pi.mensaje'].sudo()
+            
+            if before_id or after_id:
+                # Ventana relativa a un mensaje: historial anterior (before_id) o mensajes nuevos (after_id).
+                # Keyset sobre (fecha_envio, id), el mismo orden que la paginación normal, partiendo del mensaje indicado
+                limit = kwargs.get('limit', 50) if 'limit' in kwargs else params.get('limit', 50, type=int)
+                ancla = Mensaje.search(domain + [('id', '=', before_id or after_id)])
+                if not ancla:
+                    return APIUtils.error_response('Mensaje no encontrado en esta conversación', 404)
+                descendente = bool(before_id)
+                mensajes = Mensaje.search(
+                    domain + APIUtils.dominio_cursor('fecha_envio', ancla.fecha_envio, ancla.id, descendente),
+                    limit=limit,
+                    order='fecha_envio desc, id desc' if descendente else 'fecha_envio asc, id asc',
+                )
+                if descendente:
+                    mensajes = mensajes.sorted(lambda m: (m.fecha_envio, m.id))
+                paginacion = {'offset': None, 'limit': limit, 'siguiente_cursor': None}
+            else:
+                # Orden cronológico; el total ya está en la conversación, no hace falta contar
+                mensajes, paginacion = APIUtils.paginar(
+                    Mensaje, domain, 'fecha_envio', kwargs, limit=50, descendente=False, contar=False
+                )
+            
+            # Marcar como leídos los mensajes recibidos de la página en un único UPDATE
+            mensajes.filtered(lambda m: not m.leido and m.remitente_id.id != usuario.id).write({'leido': True})
             
             return APIUtils.json_response({
                 'conversacion_id': conversacion_id,
                 'total_mensajes': conversacion.total_mensajes,
-                'offset': offset,
-                'limit': limit,
+                'offset': paginacion['offset'],
+                'limit': paginacion['limit'],
+                'siguiente_cursor': paginacion['siguiente_cursor'],
                 'mensajes': [APIUtils.mensaje_to_dict(m) for m in mensajes]
             })
             
+        except ValueError as e:
+            return APIUtils.error_response(str(e), 400)
         except Exception as e:
             return APIUtils.error_response(str(e), 500)
     
@@ -184,12 +249,7 @@ class ConversacionesController(http.Controller):
     def enviar_mensaje(self, conversacion_id, **kwargs):
         """Envía un mensaje en una conversación"""
         try:
-            usuario_data = request.usuario_actual
-            
-            # Buscar el usuario por id_usuario para obtener su ID numérico de Odoo
-            usuario = request.env['pi.usuario'].sudo().search([('id_usuario', '=', usuario_data['id'])], limit=1)
-            if not usuario:
-                return APIUtils.error_response('Usuario no encontrado', 404)
+            usuario = request.usuario
             
             conversacion = request.env['pi.conversacion'].sudo().browse(conversacion_id)
             
@@ -226,12 +286,7 @@ class ConversacionesController(http.Controller):
     def iniciar_chat_producto(self, producto_id, **kwargs):
         """Inicia un chat sobre un producto"""
         try:
-            usuario_data = request.usuario_actual
-            
-            # Buscar el usuario por id_usuario para obtener su ID numérico de Odoo
-            usuario = request.env['pi.usuario'].sudo().search([('id_usuario', '=', usuario_data['id'])], limit=1)
-            if not usuario:
-                return APIUtils.error_response('Usuario no encontrado', 404)
+            usuario = request.usuario
             
             producto = request.env['pi.producto'].sudo().browse(producto_id)
             
@@ -0,0 +1,53 @@
+from odoo import http
+from odoo.http import request
+from .utils import APIUtils
+
+class ImagenesController(http.Controller):
+
+    # Tamaño solicitado (px) -> campo con la variante precalculada
+    TAMANOS = {
+        128: 'imagen_128',
+        512: 'imagen_512',
+        1024: 'imagen_1024',
+    }
+
+    @http.route([
+        '/api/v1/imagenes/<int:imagen_id>',
+        '/api/v1/imagenes/<int:imagen_id>/<int:size>',
+    ], type='http', auth='none', methods=['GET'])
+    def obtener_imagen(self, imagen_id, size=None, **kwargs):
+        """Devuelve el binario de una imagen de producto (original o una variante)
+
+        Responde con ETag/Last-Modified y devuelve 304 si el cliente ya la tiene.
+        Si la URL incluye el hash actual (?h=...) la respuesta se marca como inmutable.
+        """
+        campo = self.TAMANOS.get(size) if size else 'imagen'
+        if not campo:
+            return request.not_found()
+
+        imagen = request.env['pi.producto.imagen'].sudo().browse(imagen_id)
+        if not imagen.exists():
+            return request.not_found()
+
+        stream = request.env['ir.binary']._get_image_stream_from(
+            imagen, campo, filename_field='nombre'
+        )
+        hash_actual = kwargs.get('h')
+        return stream.get_response(immutable=bool(hash_actual) and hash_actual == imagen.imagen_hash)
+
+    @http.route('/api/v1/imagenes/categorias/<int:categoria_id>', type='http', auth='none', methods=['GET'])
+    def obtener_imagen_categoria(self, categoria_id, **kwargs):
+        """Devuelve la imagen de una categoría
+
+        Si la URL incluye la versión actual (?v=..., ver /api/v1/catalogo) la respuesta se marca como inmutable.
+        """
+        categoria = request.env['pi.categoria'].sudo().browse(categoria_id)
+        if not categoria.exists() or not categoria.imagen:
+            return request.not_found()
+
+        stream = request.env['ir.binary']._get_image_stream_from(categoria, 'imagen')
+        version = kwargs.get('v')
+        checksum = APIUtils.categoria_imagen_checksums([categoria.id]).get(categoria.id)
+        return stream.get_response(
+            immutable=bool(version) and version == APIUtils.categoria_imagen_version(checksum)
+        )
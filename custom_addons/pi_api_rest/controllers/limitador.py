@@ -0,0 +1,144 @@
+import hashlib
+import ipaddress
+import json
+import logging
+import math
+import threading
+import time
+from collections import defaultdict
+from functools import wraps
+from odoo.http import request
+from odoo.tools import config
+
+from .utils import APIUtils
+
+_logger = logging.getLogger(__name__)
+
+
+class LimitadorAcceso:
+    """Limitador de intentos por IP y por email (token bucket) compartido entre workers
+
+    Cada bucket es una fila de pi_api_limite con los intentos disponibles y la fecha de
+    la última actualización. Un INSERT ... ON CONFLICT por bucket repone los intentos según el
+    tiempo transcurrido y consume uno, con SQL directo y antes de cualquier acceso al ORM.
+    Un intento rechazado también consume (hasta quedar en -1), así que un cliente que
+    insiste sin pausa no recupera intentos.
+    """
+
+    # acción -> ámbito -> (capacidad, segundos en reponer la capacidad completa)
+    LIMITES = {
+        'login': {'ip': (20, 60), 'email': (5, 300)},
+        'registro': {'ip': (5, 3600), 'email': (3, 3600)},
+    }
+    # JSON con el mismo formato que LIMITES que sustituye sus valores (null desactiva un ámbito)
+    PARAM_LIMITES = 'pi_api_rest.limites_acceso'
+    # Segundos que se reutiliza el parámetro leído en cada worker
+    CACHE_CONFIG = 60
+    _config = {}  # nombre de la base de datos -> (caduca, límites)
+
+    # Contadores por worker: (acción, ámbito, resultado) -> total
+    contadores = defaultdict(int)
+    _contadores_lock = threading.Lock()
+    # IPs internas de las que ya se ha avisado en este worker
+    _ips_avisadas = set()
+
+    @classmethod
+    def avisar_ip_interna(cls, ip):
+        """Avisa una vez por worker si, sin proxy_mode, la petición llega desde una IP privada o local
+
+        Suele indicar un proxy inverso sin proxy_mode: todos los clientes comparten su IP
+        y, con ella, los límites por IP.
+        """
+        if config.get('proxy_mode') or ip in cls._ips_avisadas:
+            return
+        try:
+            direccion = ipaddress.ip_address(ip)
+        except ValueError:
+            return
+        if direccion.is_private or direccion.is_loopback:
+            cls._ips_avisadas.add(ip)
+            _logger.warning(
+                "Intentos de acceso desde %s, una IP interna, sin proxy_mode. Si Odoo está detrás de un proxy "
+                "inverso hay que arrancarlo con --proxy-mode: si no, todos los clientes comparten los límites por IP",
+                ip,
+            )
+
+    @classmethod
+    def limites(cls, cr):
+        """LIMITES con los cambios del parámetro de sistema, leído con SQL directo"""
+        caduca, limites = cls._config.get(cr.dbname, (0, None))
+        if caduca > time.monotonic():
+            return limites
+        limites = {accion: dict(ambitos) for accion, ambitos in cls.LIMITES.items()}
+        cr.execute("SELECT value FROM ir_config_parameter WHERE key = %s", (cls.PARAM_LIMITES,))
+        fila = cr.fetchone()
+        try:
+            for accion, ambitos in (json.loads(fila[0]) if fila else {}).items():
+                for ambito, limite in ambitos.items():
+                    limites.setdefault(accion, {})[ambito] = (int(limite[0]), float(limite[1])) if limite else None
+        except (ValueError, TypeError, AttributeError, IndexError):
+            _logger.warning("Valor no válido en %s; se usan los límites por defecto", cls.PARAM_LIMITES)
+            limites = cls.LIMITES
+        cls._config[cr.dbname] = (time.monotonic() + cls.CACHE_CONFIG, limites)
+        return limites
+
+    @classmethod
+    def consumir(cls, cr, accion, ip, email=None):
+        """Consume un intento de cada bucket; devuelve 0 si se admite o los segundos de espera
+
+        Los buckets se actualizan siempre en el mismo orden (ip, email), y se hace commit en
+        cuanto se actualizan para no mantener bloqueadas sus filas mientras se atiende la
+        petición (el hash de la contraseña es lento).
+        """
+        buckets = [('ip', f'{accion}:ip:{ip}')]
+        if email:
+            # Sin guardar en claro los emails probados
+            digest = hashlib.sha256(email.strip().lower().encode()).hexdigest()[:32]
+            buckets.append(('email', f'{accion}:email:{digest}'))
+
+        limites = cls.limites(cr).get(accion, {})
+        espera = 0
+        for ambito, clave in buckets:
+            if not limites.get(ambito):
+                continue
+            capacidad, periodo = limites[ambito]
+            ritmo = capacidad / periodo
+            cr.execute("""
+                INSERT INTO pi_api_limite AS l (clave, tokens, fecha)
+                VALUES (%(clave)s, %(capacidad)s - 1, now() at time zone 'UTC')
+                ON CONFLICT (clave) DO UPDATE SET
+                    tokens = GREATEST(LEAST(
+                        %(capacidad)s,
+                        l.tokens + GREATEST(EXTRACT(EPOCH FROM EXCLUDED.fecha - l.fecha), 0) * %(ritmo)s
+                    ) - 1, -1),
+                    fecha = EXCLUDED.fecha
+                RETURNING tokens
+            """, {'clave': clave, 'capacidad': float(capacidad), 'ritmo': ritmo})
+            tokens = cr.fetchone()[0]
+            admitido = tokens >= 0
+            if not admitido:
+                # Para admitir el siguiente intento hay que reponer desde tokens hasta 1
+                espera = max(espera, math.ceil((1 - tokens) / ritmo))
+            with cls._contadores_lock:
+                cls.contadores[(accion, ambito, 'admitidos' if admitido else 'rechazados')] += 1
+        cr.commit()
+        return espera
+
+
+def limitar_acceso(accion):
+    """Decorador para rutas públicas: 429 si la IP o el email han agotado sus intentos"""
+    def decorador(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            email = kwargs.get('email')
+            ip = request.httprequest.remote_addr
+            LimitadorAcceso.avisar_ip_interna(ip)
+            espera = LimitadorAcceso.consumir(
+                request.env.cr, accion, ip, email if isinstance(email, str) else None,
+            )
+            if espera:
+                request.future_response.headers['Retry-After'] = str(espera)
+                return APIUtils.error_response('Demasiados intentos, inténtalo de nuevo más tarde', 429)
+            return func(*args, **kwargs)
+        return wrapper
+    return decorador
@@ -0,0 +1,178 @@
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import defaultdict, deque
+from datetime import datetime
+
+_logger = logging.getLogger(__name__)
+
+
+class MetricasAPI:
+    """Métricas de las peticiones /api/v1/*, locales a cada worker
+
+    ir.http (ver models/ir_http.py) registra cada petición al empezar y al terminar:
+    tiempo, consultas SQL y su tiempo (contadores del cursor en el hilo), bytes de la
+    respuesta y código de estado (el 'status' del diccionario en las rutas type='json').
+    Un hilo muestrea la pila de las peticiones que superan el umbral de lentitud.
+    """
+
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+    # Muestras de pila por petición lenta y separación entre muestras (segundos)
+    MAX_MUESTRAS = 5
+    INTERVALO_MUESTREO = 0.25
+
+    def __init__(self, max_lentas=50):
+        self._lock = threading.Lock()
+        self._peticiones = defaultdict(int)  # (ruta, método, status) -> total
+        self._rutas = defaultdict(lambda: {
+            'buckets': [0] * len(self.BUCKETS), 'suma': 0.0, 'total': 0,
+            'consultas': 0, 'tiempo_sql': 0.0, 'bytes': 0,
+        })
+        self._en_curso = {}  # id del hilo -> petición en curso
+        self.lentas = deque(maxlen=max_lentas)
+        self._hilo = None
+
+    def iniciar(self, ruta, metodo, umbral_lento):
+        """Registra el inicio de una petición en el hilo actual"""
+        hilo = threading.current_thread()
+        peticion = {
+            'ruta': ruta,
+            'metodo': metodo,
+            'umbral': umbral_lento,
+            'inicio': time.monotonic(),
+            'consultas': getattr(hilo, 'query_count', 0),
+            'tiempo_sql': getattr(hilo, 'query_time', 0.0),
+            'status': 200,
+            'muestras': [],
+        }
+        with self._lock:
+            self._en_curso[hilo.ident] = peticion
+        if umbral_lento:
+            self._arrancar_muestreo()
+        return peticion
+
+    def actual(self):
+        with self._lock:
+            return self._en_curso.get(threading.get_ident())
+
+    def finalizar(self, url, bytes_respuesta):
+        """Cierra la petición del hilo actual; devuelve (consultas, tiempo_sql, duración) o None"""
+        hilo = threading.current_thread()
+        with self._lock:
+            peticion = self._en_curso.pop(hilo.ident, None)
+        if peticion is None:
+            return None
+        duracion = time.monotonic() - peticion['inicio']
+        consultas = getattr(hilo, 'query_count', 0) - peticion['consultas']
+        tiempo_sql = getattr(hilo, 'query_time', 0.0) - peticion['tiempo_sql']
+
+        with self._lock:
+            self._peticiones[(peticion['ruta'], peticion['metodo'], peticion['status'])] += 1
+            datos = self._rutas[peticion['ruta']]
+            for i, limite in enumerate(self.BUCKETS):
+                if duracion <= limite:
+                    datos['buckets'][i] += 1
+            datos['suma'] += duracion
+            datos['total'] += 1
+            datos['consultas'] += consultas
+            datos['tiempo_sql'] += tiempo_sql
+            datos['bytes'] += bytes_respuesta
+
+        if peticion['umbral'] and duracion >= peticion['umbral']:
+            lenta = {
+                'fecha': datetime.utcnow().isoformat(),
+                'ruta': peticion['ruta'],
+                'url': url,
+                'metodo': peticion['metodo'],
+                'status': peticion['status'],
+                'duracion': round(duracion, 3),
+                'consultas': consultas,
+                'tiempo_sql': round(tiempo_sql, 3),
+                'muestras': peticion['muestras'],
+            }
+            self.lentas.append(lenta)
+            _logger.warning(
+                "Petición lenta %s %s: %.3fs, %s consultas (%.3fs SQL)%s",
+                peticion['metodo'], url, duracion, consultas, tiempo_sql,
+                f"\n{peticion['muestras'][-1]}" if peticion['muestras'] else '',
+            )
+        return consultas, tiempo_sql, duracion
+
+    def _arrancar_muestreo(self):
+        with self._lock:
+            if self._hilo and self._hilo.is_alive():
+                return
+            self._hilo = threading.Thread(target=self._muestrear, name=f'{__name__}.MetricasAPI', daemon=True)
+            self._hilo.start()
+
+    def _muestrear(self):
+        while True:
+            time.sleep(self.INTERVALO_MUESTREO)
+            try:
+                ahora = time.monotonic()
+                with self._lock:
+                    candidatas = [
+                        (ident, peticion) for ident, peticion in self._en_curso.items()
+                        if peticion['umbral'] and ahora - peticion['inicio'] >= peticion['umbral']
+                        and len(peticion['muestras']) < self.MAX_MUESTRAS
+                    ]
+                if not candidatas:
+                    continue
+                marcos = sys._current_frames()
+                for ident, peticion in candidatas:
+                    marco = marcos.get(ident)
+                    if marco is not None:
+                        pila = ''.join(traceback.format_stack(marco, limit=30))
+                        peticion['muestras'].append(f"[{ahora - peticion['inicio']:.2f}s]\n{pila}")
+            except Exception:
+                _logger.exception("Error muestreando peticiones lentas")
+
+    def exportar(self, extra=()):
+        """Texto en formato de exposición de Prometheus (solo este worker, etiqueta pid)"""
+        pid = os.getpid()
+        with self._lock:
+            peticiones = dict(self._peticiones)
+            rutas = {ruta: dict(datos, buckets=list(datos['buckets'])) for ruta, datos in self._rutas.items()}
+
+        def etiquetas(**valores):
+            valores['pid'] = pid
+            return '{' + ','.join(f'{clave}="{valor}"' for clave, valor in valores.items()) + '}'
+
+        lineas = [
+            '# HELP pi_api_peticiones_total Peticiones atendidas por ruta, método y estado',
+            '# TYPE pi_api_peticiones_total counter',
+        ]
+        for (ruta, metodo, status), total in sorted(peticiones.items()):
+            lineas.append(f'pi_api_peticiones_total{etiquetas(ruta=ruta, metodo=metodo, status=status)} {total}')
+
+        lineas += [
+            '# HELP pi_api_duracion_segundos Duración de las peticiones por ruta',
+            '# TYPE pi_api_duracion_segundos histogram',
+        ]
+        for ruta, datos in sorted(rutas.items()):
+            for limite, acumulado in zip(self.BUCKETS, datos['buckets']):
+                lineas.append(f'pi_api_duracion_segundos_bucket{etiquetas(ruta=ruta, le=limite)} {acumulado}')
+            lineas.append(f'pi_api_duracion_segundos_bucket{etiquetas(ruta=ruta, le="+Inf")} {datos["total"]}')
+            lineas.append(f'pi_api_duracion_segundos_sum{etiquetas(ruta=ruta)} {datos["suma"]:.6f}')
+            lineas.append(f'pi_api_duracion_segundos_count{etiquetas(ruta=ruta)} {datos["total"]}')
+
+        for nombre, clave, ayuda in (
+            ('pi_api_consultas_sql_total', 'consultas', 'Consultas SQL ejecutadas por ruta'),
+            ('pi_api_tiempo_sql_segundos_total', 'tiempo_sql', 'Tiempo en consultas SQL por ruta'),
+            ('pi_api_bytes_respuesta_total', 'bytes', 'Bytes enviados en las respuestas por ruta'),
+        ):
+            lineas += [f'# HELP {nombre} {ayuda}', f'# TYPE {nombre} counter']
+            for ruta, datos in sorted(rutas.items()):
+                lineas.append(f'{nombre}{etiquetas(ruta=ruta)} {datos[clave]}')
+
+        for nombre, tipo, ayuda, valores in extra:
+            lineas += [f'# HELP {nombre} {ayuda}', f'# TYPE {nombre} {tipo}']
+            for valor_etiquetas, valor in valores:
+                lineas.append(f'{nombre}{etiquetas(**valor_etiquetas)} {valor}')
+        return '\n'.join(lineas) + '\n'
+
+
+metricas_api = MetricasAPI()
@@ -0,0 +1,63 @@
+from odoo import http
+from odoo.http import request
+from .auth import JWTAuth
+from .limitador import LimitadorAcceso
+from .metricas import metricas_api
+import hmac
+
+
+# Si se define, se exige el token; si no, solo se atiende desde localhost
+PARAM_TOKEN = 'pi_api_rest.metrics_token'
+
+
+def metricas_autorizadas(*tokens):
+    """Indica si la petición puede ver métricas: alguno de `tokens` coincide con el
+    metrics_token o, si no está definido, la petición llega desde localhost"""
+    token = request.env['ir.config_parameter'].sudo().get_param(PARAM_TOKEN)
+    if token:
+        return any(hmac.compare_digest(presentado or '', token) for presentado in tokens)
+    return request.httprequest.remote_addr in ('127.0.0.1', '::1')
+
+
+class MetricasController(http.Controller):
+    """Exportación de las métricas de la API (de cada worker, identificado por la etiqueta pid)"""
+    
+    @http.route('/api/v1/_metrics', type='http', auth='none', methods=['GET'], csrf=False)
+    def exportar_metricas(self, **kwargs):
+        """Métricas en formato de texto de Prometheus"""
+        if not self._autorizado():
+            return request.make_response('Forbidden', status=403)
+        
+        colas = request.env['pi.job'].sudo().metricas()
+        hashes = request.env['pi.usuario'].metricas_hash()
+        extra = [
+            ('pi_jwt_renovaciones_total', 'counter', 'Respuestas con nuevo_token emitido u omitido',
+             [({'resultado': clave}, valor) for clave, valor in sorted(JWTAuth.contadores.items())]),
+            ('pi_jobs', 'gauge', 'Tareas de pi.job por estado',
+             [({'estado': estado}, colas[estado]) for estado in ('pendientes', 'hechos', 'fallidos')]),
+            ('pi_jobs_antiguedad_pendiente_segundos', 'gauge', 'Antigüedad de la tarea pendiente más antigua',
+             [({}, colas['antiguedad_pendiente'])]),
+            ('pi_api_intentos_acceso_total', 'counter', 'Intentos de login y registro admitidos y rechazados por el limitador',
+             [({'accion': accion, 'ambito': ambito, 'resultado': resultado}, valor)
+              for (accion, ambito, resultado), valor in sorted(LimitadorAcceso.contadores.items())]),
+            ('pi_password_hash_total', 'counter', 'Cálculos de hash de contraseñas: hechos, hashes antiguos actualizados y rechazados por concurrencia',
+             [({'resultado': clave}, hashes[clave]) for clave in ('calculados', 'actualizados', 'rechazados')]),
+            ('pi_password_hash_segundos_total', 'counter', 'Tiempo dedicado a calcular hashes de contraseñas',
+             [({}, f"{hashes['segundos']:.6f}")]),
+            ('pi_api_peticiones_lentas', 'gauge', 'Peticiones lentas guardadas en el registro de este worker',
+             [({}, len(metricas_api.lentas))]),
+        ]
+        return request.make_response(
+            metricas_api.exportar(extra),
+            headers=[('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')],
+        )
+    
+    @http.route('/api/v1/_metrics/lentas', type='http', auth='none', methods=['GET'], csrf=False)
+    def peticiones_lentas(self, **kwargs):
+        """Últimas peticiones lentas de este worker, con muestras de la pila"""
+        if not self._autorizado():
+            return request.make_response('Forbidden', status=403)
+        return request.make_json_response(list(metricas_api.lentas))
+    
+    def _autorizado(self):
+        return metricas_autorizadas(JWTAuth.obtener_token_desde_header())
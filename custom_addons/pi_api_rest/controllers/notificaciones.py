@@ -0,0 +1,93 @@
+import json
+import logging
+import select
+import threading
+import time
+from contextlib import contextmanager
+
+import odoo
+
+_logger = logging.getLogger(__name__)
+
+
+class DespachadorMensajes:
+    """Despierta las peticiones de long-polling cuando llegan mensajes nuevos
+
+    Igual que el bus de Odoo: un hilo por worker escucha (LISTEN) un canal de
+    PostgreSQL en la base de datos 'postgres' y, por cada NOTIFY enviado tras el
+    commit de un pi.mensaje, despierta a las peticiones que esperan por alguno de
+    los usuarios afectados. La espera no consulta la base de datos.
+    """
+
+    CANAL = 'pi_mensajes'
+
+    def __init__(self):
+        self._esperas = {}  # (db, id de pi.usuario) -> set(threading.Event)
+        self._lock = threading.Lock()
+        self._hilo = None
+
+    @contextmanager
+    def suscripcion(self, dbname, usuario_id):
+        """Registra una espera antes de consultar, para no perder mensajes entre la consulta y la espera"""
+        self._arrancar()
+        clave = (dbname, usuario_id)
+        evento = threading.Event()
+        with self._lock:
+            self._esperas.setdefault(clave, set()).add(evento)
+        try:
+            yield evento
+        finally:
+            with self._lock:
+                eventos = self._esperas.get(clave)
+                if eventos is not None:
+                    eventos.discard(evento)
+                    if not eventos:
+                        del self._esperas[clave]
+
+    @classmethod
+    def notificar(cls, dbname, usuario_ids):
+        """Envía el NOTIFY (llamar después del commit)"""
+        payload = json.dumps({'db': dbname, 'usuarios': sorted(usuario_ids)})
+        with odoo.sql_db.db_connect('postgres').cursor() as cr:
+            cr.execute("SELECT pg_notify(%s, %s)", (cls.CANAL, payload))
+
+    def _despertar(self, dbname, usuario_ids):
+        with self._lock:
+            for usuario_id in usuario_ids:
+                for evento in self._esperas.get((dbname, usuario_id), ()):
+                    evento.set()
+
+    def _arrancar(self):
+        with self._lock:
+            if self._hilo and self._hilo.is_alive():
+                return
+            self._hilo = threading.Thread(target=self._bucle, name=f'{__name__}.DespachadorMensajes', daemon=True)
+            self._hilo.start()
+
+    def _bucle(self):
+        while True:
+            try:
+                self._escuchar()
+            except Exception:
+                _logger.exception("Error en la escucha de %s, reintentando", self.CANAL)
+                time.sleep(5)
+
+    def _escuchar(self):
+        with odoo.sql_db.db_connect('postgres').cursor() as cr:
+            conexion = cr._cnx
+            cr.execute(f"LISTEN {self.CANAL}")
+            cr.commit()
+            while True:
+                if select.select([conexion], [], [], 50) == ([], [], []):
+                    continue
+                conexion.poll()
+                while conexion.notifies:
+                    notificacion = conexion.notifies.pop(0)
+                    try:
+                        datos = json.loads(notificacion.payload)
+                    except ValueError:
+                        continue
+                    self._despertar(datos.get('db'), datos.get('usuarios', []))
+
+
+despachador_mensajes = DespachadorMensajes()
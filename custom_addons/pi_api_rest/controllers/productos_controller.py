@@ -1,11 +1,22 @@
 from odoo import http
 from odoo.http import request
 from .auth import jwt_required, JWTAuth
-from .utils import APIUtils
+from .utils import APIUtils, respuesta_json
 import json
 
 class ProductosController(http.Controller):
     
+    # Filas admitidas por petición en /api/v1/productos/bulk (para más, usar el script de importación)
+    MAX_FILAS_BULK = 10000
+    
+    # Campos de la API que se pueden editar con PUT -> campo de pi.producto
+    CAMPOS_EDITABLES = {
+        'nombre': 'nombre_producto',
+        'descripcion': 'descripcion',
+        'precio': 'precio',
+        'ubicacion': 'ubicacion',
+    }
+    
     @http.route('/api/v1/productos/listar', type='json', auth='none', methods=['GET', 'POST'])
     @jwt_required
     def listar_productos(self, **kwargs):
@@ -15,12 +26,11 @@ class ProductosController(http.Controller):
             categoria_id = kwargs.get('categoria_id') or request.httprequest.args.get('categoria_id', type=int)
             etiqueta_id = kwargs.get('etiqueta_id') or request.httprequest.args.get('etiqueta_id', type=int)
             nombre = kwargs.get('nombre') or request.httprequest.args.get('nombre')
+            q = kwargs.get('q') or request.httprequest.args.get('q')
             precio_min = kwargs.get('precio_min') or request.httprequest.args.get('precio_min', type=float)
             precio_max = kwargs.get('precio_max') or request.httprequest.args.get('precio_max', type=float)
             ubicacion = kwargs.get('ubicacion') or request.httprequest.args.get('ubicacion')
             estado_venta = kwargs.get('estado_venta') or request.httprequest.args.get('estado_venta')
-            offset = kwargs.get('offset', 0) if 'offset' in kwargs else request.httprequest.args.get('offset', 0, type=int)
-            limit = kwargs.get('limit', 20) if 'limit' in kwargs else request.httprequest.args.get('limit', 20, type=int)
             
             # Por defecto solo mostrar productos disponibles, a menos que se especifique otro estado_venta
             domain = []
@@ -42,16 +52,21 @@ class ProductosController(http.Controller):
             if ubicacion:
                 domain.append(('ubicacion', 'ilike', ubicacion))
             
-            productos = request.env['pi.producto'].sudo().search(domain, offset=offset, limit=limit)
-            total = request.env['pi.producto'].sudo().search_count(domain)
+            if q:
+                # Búsqueda de texto completo: ordenada por relevancia, solo admite offset/limit
+                offset = kwargs.get('offset', 0) if 'offset' in kwargs else request.httprequest.args.get('offset', 0, type=int)
+                limit = kwargs.get('limit', 20) if 'limit' in kwargs else request.httprequest.args.get('limit', 20, type=int)
+                productos, total = request.env['pi.producto'].sudo().buscar_texto(q, domain, offset=offset, limit=limit)
+                paginacion = {'total': total, 'offset': offset, 'limit': limit, 'siguiente_cursor': None}
+            else:
+                productos, paginacion = APIUtils.paginar(
+                    request.env['pi.producto'].sudo(), domain, 'fecha_publicacion', kwargs, limit=20
+                )
             
-            return APIUtils.json_response({
-                'total': total,
-                'offset': offset,
-                'limit': limit,
-                'productos': [APIUtils.producto_to_dict(p) for p in productos]
-            })
+            return APIUtils.json_response(dict(paginacion, productos=APIUtils.productos_to_dicts(productos)))
             
+        except ValueError as e:
+            return APIUtils.error_response(str(e), 400)
         except Exception as e:
             return APIUtils.error_response(str(e), 500)
     
@@ -65,7 +80,9 @@ class ProductosController(http.Controller):
             if not producto.exists():
                 return APIUtils.error_response('Producto no encontrado', 404)
             
-            return APIUtils.json_response(APIUtils.producto_to_dict(producto, include_all_images=True))
+            resultado = APIUtils.producto_to_dict(producto, include_all_images=True)
+            request.future_response.headers['ETag'] = f'"{resultado["version"]}"'
+            return APIUtils.json_response(resultado)
             
         except Exception as e:
             return APIUtils.error_response(str(e), 500)
@@ -75,12 +92,7 @@ class ProductosController(http.Controller):
     def crear_producto(self, **kwargs):
         """Crea un nuevo producto"""
         try:
-            usuario_data = request.usuario_actual
-            
-            # Buscar el usuario por id_usuario para obtener su ID numérico de Odoo
-            usuario = request.env['pi.usuario'].sudo().search([('id_usuario', '=', usuario_data['id'])], limit=1)
-            if not usuario:
-                return APIUtils.error_response('Usuario no encontrado', 404)
+            usuario = request.usuario
             
             # Obtener datos JSON correctamente
             data = kwargs if kwargs else (request.jsonrequest if hasattr(request, 'jsonrequest') else json.loads(request.httprequest.data))
@@ -141,17 +153,72 @@ class ProductosController(http.Controller):
         except Exception as e:
             return APIUtils.error_response(str(e), 500)
     
+    @http.route('/api/v1/productos/bulk', type='http', auth='none', methods=['POST'], csrf=False)
+    @respuesta_json
+    @jwt_required
+    def importar_productos(self, **kwargs):
+        """Crea productos en bloque a partir de un fichero NDJSON o CSV
+        
+        Acepta multipart/form-data (parte 'archivo' con las filas, imágenes en partes 'imagenes'
+        o un zip en 'imagenes_zip') o directamente el fichero como cuerpo de la petición.
+        Devuelve el resultado de cada fila; con solo_validar=true no se crea nada.
+        """
+        try:
+            importacion = request.env['pi.importacion.producto'].sudo()
+            archivos = request.httprequest.files
+            
+            if 'archivo' in archivos:
+                nombre_archivo = archivos['archivo'].filename or ''
+                contenido = archivos['archivo'].read()
+            else:
+                nombre_archivo = ''
+                contenido = request.httprequest.get_data()
+            
+            formato = kwargs.get('formato') or request.httprequest.args.get('formato')
+            if not formato:
+                es_csv = nombre_archivo.lower().endswith('.csv') or request.httprequest.mimetype == 'text/csv'
+                formato = 'csv' if es_csv else 'ndjson'
+            
+            imagenes = {}
+            for clave, fichero in archivos.items(multi=True):
+                if clave == 'imagenes_zip':
+                    imagenes.update(importacion.leer_imagenes(fichero.read()))
+                elif clave == 'imagenes' and fichero.filename:
+                    imagenes[fichero.filename] = fichero.read()
+            
+            filas = importacion.leer_filas(contenido, formato)
+            if not filas:
+                return APIUtils.error_response('El fichero no contiene filas', 400)
+            if len(filas) > self.MAX_FILAS_BULK:
+                return APIUtils.error_response(f'Máximo {self.MAX_FILAS_BULK} filas por petición', 413)
+            
+            solo_validar = str(kwargs.get('solo_validar') or request.httprequest.args.get('solo_validar', '')).lower() in ('1', 'true')
+            resultados = importacion.importar(filas, request.usuario, imagenes, solo_validar=solo_validar)
+            
+            return APIUtils.json_response({
+                'total': len(resultados),
+                'creados': sum(1 for r in resultados if r['estado'] == 'creado'),
+                'validos': sum(1 for r in resultados if r['estado'] == 'valido'),
+                'errores': sum(1 for r in resultados if r['estado'] == 'error'),
+                'resultados': resultados,
+            })
+            
+        except ValueError as e:
+            return APIUtils.error_response(str(e), 400)
+        except Exception as e:
+            return APIUtils.error_response(str(e), 500)
+    
     @http.route('/api/v1/productos/<int:producto_id>', type='json', auth='none', methods=['PUT'])
     @jwt_required
     def actualizar_producto(self, producto_id, **kwargs):
-        """Actualiza un producto existente"""
+        """Actualiza un producto existente
+        
+        Solo escribe los campos cuyo valor cambia y devuelve las diferencias (cambios) y la
+        nueva versión del producto. Con la cabecera If-Match (versión obtenida al leer el
+        producto) se rechaza con 412 si otra petición lo ha modificado entretanto.
+        """
         try:
-            usuario_data = request.usuario_actual
-            
-            # Buscar el usuario por id_usuario para obtener su ID numérico de Odoo
-            usuario = request.env['pi.usuario'].sudo().search([('id_usuario', '=', usuario_data['id'])], limit=1)
-            if not usuario:
-                return APIUtils.error_response('Usuario no encontrado', 404)
+            usuario = request.usuario
             
             producto = request.env['pi.producto'].sudo().browse(producto_id)
             
@@ -165,37 +232,53 @@ class ProductosController(http.Controller):
             raw = kwargs if kwargs else (request.jsonrequest if hasattr(request, 'jsonrequest') else json.loads(request.httprequest.data))
             data = raw.get('params', raw) if isinstance(raw, dict) else raw
             
-            vals = {}
-            if 'nombre' in data:
-                vals['nombre_producto'] = data['nombre']
-            if 'descripcion' in data:
-                vals['descripcion'] = data['descripcion']
-            if 'precio' in data:
-                vals['precio'] = float(data['precio'])
-            if 'ubicacion' in data:
-                vals['ubicacion'] = data['ubicacion']
-            if 'etiquetas_ids' in data:
-                vals['etiquetas_ids'] = [(6, 0, data['etiquetas_ids'])]
-            
             # Verificar que hay datos para actualizar
-            if not vals:
+            if not any(campo in data for campo in list(self.CAMPOS_EDITABLES) + ['etiquetas_ids']):
                 return APIUtils.error_response('No hay datos para actualizar', 400)
             
-            # Actualizar el producto
-            producto.sudo().write(vals)
-            
-            # Invalidar caché y hacer commit para asegurar persistencia
-            producto.invalidate_recordset()
-            request.env.cr.commit()
-            
-            # Refrescar el producto desde la base de datos
-            producto = request.env['pi.producto'].sudo().browse(producto_id)
-            
-            return APIUtils.json_response({
-                'mensaje': 'Producto actualizado exitosamente',
-                'producto': APIUtils.producto_to_dict(producto)
-            })
-            
+            if_match = request.httprequest.if_match
+            if if_match:
+                # Bloquear la fila para que la comprobación de versión y la escritura sean atómicas
+                request.env.cr.execute("SELECT write_date FROM pi_producto WHERE id = %s FOR NO KEY UPDATE", (producto.id,))
+                version_actual = APIUtils.version_registro(request.env.cr.fetchone()[0])
+                if not if_match.contains(version_actual):
+                    error = APIUtils.error_response('El producto ha sido modificado por otra petición', 412)
+                    error['version'] = version_actual
+                    return error
+            
+            # Solo los campos que realmente cambian
+            vals = {}
+            cambios = {}
+            for campo_api, campo in self.CAMPOS_EDITABLES.items():
+                if campo_api in data:
+                    valor = float(data[campo_api]) if campo == 'precio' else data[campo_api]
+                    if producto[campo] != valor:
+                        cambios[campo_api] = {'antes': producto[campo], 'despues': valor}
+                        vals[campo] = valor
+            if 'etiquetas_ids' in data:
+                etiquetas_ids = [int(etiqueta_id) for etiqueta_id in data['etiquetas_ids']]
+                if set(etiquetas_ids) != set(producto.etiquetas_ids.ids):
+                    cambios['etiquetas_ids'] = {'antes': producto.etiquetas_ids.ids, 'despues': etiquetas_ids}
+                    vals['etiquetas_ids'] = [(6, 0, etiquetas_ids)]
+            
+            if vals:
+                producto.write(vals)
+            
+            version = APIUtils.version_registro(producto.write_date)
+            request.future_response.headers['ETag'] = f'"{version}"'
+            
+            resultado = {
+                'mensaje': 'Producto actualizado exitosamente' if cambios else 'Sin cambios',
+                'id': producto.id,
+                'version': version,
+                'cambios': cambios,
+            }
+            if data.get('incluir_producto'):
+                resultado['producto'] = APIUtils.producto_to_dict(producto)
+            return APIUtils.json_response(resultado)
+            
+        except ValueError as e:
+            return APIUtils.error_response(str(e), 400)
         except Exception as e:
             return APIUtils.error_response(str(e), 500)
     
@@ -204,12 +287,7 @@ class ProductosController(http.Controller):
     def eliminar_producto(self, producto_id, **kwargs):
         """Elimina un producto"""
         try:
-            usuario_data = request.usuario_actual
-            
-            # Buscar el usuario por id_usuario para obtener su ID numérico de Odoo
-            usuario = request.env['pi.usuario'].sudo().search([('id_usuario', '=', usuario_data['id'])], limit=1)
-            if not usuario:
-                return APIUtils.error_response('Usuario no encontrado', 404)
+            usuario = request.usuario
             
             producto = request.env['pi.producto'].sudo().browse(producto_id)
             
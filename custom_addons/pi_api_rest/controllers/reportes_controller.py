@@ -11,12 +11,7 @@ class ReportesController(http.Controller):
     def listar_reportes(self, **kwargs):
         """Lista todos los reportes del usuario autenticado"""
         try:
-            usuario_data = request.usuario_actual
-            
-            # Buscar el usuario por id_usuario para obtener su ID numérico de Odoo
-            usuario = request.env['pi.usuario'].sudo().search([('id_usuario', '=', usuario_data['id'])], limit=1)
-            if not usuario:
-                return APIUtils.error_response('Usuario no encontrado', 404)
+            usuario = request.usuario
             
             offset = request.httprequest.args.get('offset', 0, type=int)
             limit = request.httprequest.args.get('limit', 20, type=int)
@@ -60,12 +55,7 @@ class ReportesController(http.Controller):
     def obtener_reporte(self, reporte_id, **kwargs):
         """Obtiene un reporte específico"""
         try:
-            usuario_data = request.usuario_actual
-            
-            # Buscar el usuario por id_usuario para obtener su ID numérico de Odoo
-            usuario = request.env['pi.usuario'].sudo().search([('id_usuario', '=', usuario_data['id'])], limit=1)
-            if not usuario:
-                return APIUtils.error_response('Usuario no encontrado', 404)
+            usuario = request.usuario
             
             reporte = request.env['pi.reporte'].sudo().browse(reporte_id)
             
@@ -100,12 +90,7 @@ class ReportesController(http.Controller):
     def crear_reporte(self, **kwargs):
         """Crea un reporte de producto, usuario o comentario"""
         try:
-            usuario_data = request.usuario_actual
-            
-            # Buscar el usuario por id_usuario para obtener su ID numérico de Odoo
-            usuario = request.env['pi.usuario'].sudo().search([('id_usuario', '=', usuario_data['id'])], limit=1)
-            if not usuario:
-                return APIUtils.error_response('Usuario no encontrado', 404)
+            usuario = request.usuario
             
             # Obtener datos JSON correctamente
             data = kwargs if kwargs else (request.jsonrequest if hasattr(request, 'jsonrequest') else json.loads(request.httprequest.data))
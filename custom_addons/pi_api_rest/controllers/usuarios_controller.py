@@ -1,5 +1,6 @@
 from odoo import http
 from odoo.http import request
+from psycopg2 import IntegrityError
 from .auth import jwt_required, JWTAuth
 from .utils import APIUtils
 import json
@@ -60,25 +61,16 @@ class UsuariosController(http.Controller):
             if not usuario.exists():
                 return APIUtils.error_response('Usuario no encontrado', 404)
             
-            offset = request.httprequest.args.get('offset', 0, type=int)
-            limit = request.httprequest.args.get('limit', 20, type=int)
-            
-            productos = request.env['pi.producto'].sudo().search(
+            productos, paginacion = APIUtils.paginar(
+                request.env['pi.producto'].sudo(),
                 [('propietario_id', '=', usuario_id), ('estado_venta', '=', 'disponible')],
-                offset=offset,
-                limit=limit
-            )
-            total = request.env['pi.producto'].sudo().search_count(
-                [('propietario_id', '=', usuario_id), ('estado_venta', '=', 'disponible')]
+                'fecha_publicacion', kwargs, limit=20
             )
             
-            return APIUtils.json_response({
-                'total': total,
-                'offset': offset,
-                'limit': limit,
-                'productos': [APIUtils.producto_to_dict(p) for p in productos]
-            })
+            return APIUtils.json_response(dict(paginacion, productos=APIUtils.productos_to_dicts(productos)))
             
+        except ValueError as e:
+            return APIUtils.error_response(str(e), 400)
         except Exception as e:
             return APIUtils.error_response(str(e), 500)
     
@@ -134,12 +126,7 @@ class UsuariosController(http.Controller):
     def obtener_perfil_actual(self, **kwargs):
         """Obtiene el perfil del usuario autenticado"""
         try:
-            usuario_data = request.usuario_actual
-            
-            # Buscar el usuario por id_usuario para obtener su ID numérico de Odoo
-            usuario = request.env['pi.usuario'].sudo().search([('id_usuario', '=', usuario_data['id'])], limit=1)
-            if not usuario:
-                return APIUtils.error_response('Usuario no encontrado', 404)
+            usuario = request.usuario
             
             return APIUtils.json_response(APIUtils.usuario_to_dict(usuario))
             
@@ -151,29 +138,39 @@ class UsuariosController(http.Controller):
     def actualizar_perfil(self, **kwargs):
         """Actualiza el perfil del usuario"""
         try:
-            usuario_data = request.usuario_actual
-            
-            # Buscar el usuario por id_usuario para obtener su ID numérico de Odoo
-            usuario = request.env['pi.usuario'].sudo().search([('id_usuario', '=', usuario_data['id'])], limit=1)
-            if not usuario:
-                return APIUtils.error_response('Usuario no encontrado', 404)
+            usuario = request.usuario
             
             vals = {}
             if 'nombre' in kwargs:
                 vals['name'] = kwargs['nombre']
-            if 'email' in kwargs:
-                vals['email'] = kwargs['email']
             if 'telefono' in kwargs:
                 vals['phone'] = kwargs['telefono']
             if 'ubicacion' in kwargs:
                 vals['street'] = kwargs['ubicacion']
             
-            usuario.sudo().write(vals)
-            
-            return APIUtils.json_response({
+            cambia_email = False
+            if kwargs.get('email'):
+                email_normalizado = usuario.normalizar_email(kwargs['email'])
+                cambia_email = email_normalizado != usuario.email_normalizado
+                if cambia_email and usuario.sudo().search_count([('email_normalizado', '=', email_normalizado)], limit=1):
+                    return APIUtils.error_response('El email ya está registrado', 400)
+                vals['email'] = kwargs['email'].strip()
+            
+            try:
+                with request.env.cr.savepoint():
+                    usuario.sudo().write(vals)
+                    usuario.flush_recordset()
+            except IntegrityError:
+                return APIUtils.error_response('El email ya está registrado', 400)
+            
+            resultado = {
                 'mensaje': 'Perfil actualizado exitosamente',
                 'usuario': APIUtils.usuario_to_dict(usuario)
-            })
+            }
+            if cambia_email:
+                # El token actual lleva el email anterior y ya no se podría renovar
+                resultado['nuevo_token'] = JWTAuth.generar_token(usuario.id_usuario, usuario.email)
+            return APIUtils.json_response(resultado)
             
         except Exception as e:
             return APIUtils.error_response(str(e), 500)
@@ -183,12 +180,7 @@ class UsuariosController(http.Controller):
     def eliminar_cuenta(self, **kwargs):
         """Elimina/desactiva la cuenta del usuario autenticado"""
         try:
-            usuario_data = request.usuario_actual
-            
-            # Buscar el usuario por id_usuario para obtener su ID numérico de Odoo
-            usuario = request.env['pi.usuario'].sudo().search([('id_usuario', '=', usuario_data['id'])], limit=1)
-            if not usuario:
-                return APIUtils.error_response('Usuario no encontrado', 404)
+            usuario = request.usuario
             
             # Desactivar en lugar de eliminar completamente
             usuario.sudo().write({'active': False})
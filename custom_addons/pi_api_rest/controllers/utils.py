@@ -1,7 +1,26 @@
 import base64
 import json
+from collections import defaultdict
+from functools import wraps
+from odoo import fields
 from odoo.http import request
 
+
+def respuesta_json(f):
+    """Decorador para rutas type='http' que devuelven diccionarios como las rutas type='json'
+
+    Serializa el resultado (incluidos los errores de jwt_required) y usa su 'status' como código HTTP.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        resultado = f(*args, **kwargs)
+        if isinstance(resultado, dict):
+            status = resultado.get('status', 200) if 'error' in resultado else 200
+            return request.make_json_response(resultado, status=status)
+        return resultado
+    return decorated_function
+
+
 class APIUtils:
     """Utilidades para la API"""
     
@@ -21,6 +40,98 @@ class APIUtils:
             'status': status
         }
     
+    @staticmethod
+    def entero(valor, nombre, defecto=None):
+        """Convierte un parámetro a int; lanza ValueError si no es un número entero"""
+        if valor is None or valor == '':
+            return defecto
+        try:
+            return int(valor)
+        except (TypeError, ValueError):
+            raise ValueError(f'{nombre} debe ser un número entero')
+    
+    @staticmethod
+    def codificar_cursor(fecha, registro_id):
+        """Genera un cursor opaco a partir de la clave de ordenación (fecha, id)"""
+        datos = [fields.Datetime.to_string(fecha) if fecha else None, registro_id]
+        return base64.urlsafe_b64encode(json.dumps(datos).encode()).decode()
+    
+    @staticmethod
+    def decodificar_cursor(cursor):
+        """Devuelve (fecha, id) a partir de un cursor; lanza ValueError si no es válido"""
+        try:
+            fecha, registro_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            return (fields.Datetime.to_datetime(fecha) if fecha else None), int(registro_id)
+        except Exception:
+            raise ValueError('Cursor inválido')
+    
+    @staticmethod
+    def dominio_cursor(campo_fecha, fecha, registro_id, descendente=True):
+        """Dominio equivalente a (campo_fecha, id) < (fecha, registro_id) (o > si es ascendente)
+        
+        Los registros sin fecha van siempre al final (NULLS LAST).
+        """
+        op = '<' if descendente else '>'
+        if not fecha:
+            return [(campo_fecha, '=', False), ('id', op, registro_id)]
+        return [
+            '|', '|',
+            (campo_fecha, op, fecha),
+            (campo_fecha, '=', False),
+            '&', (campo_fecha, '=', fecha), ('id', op, registro_id),
+        ]
+    
+    @staticmethod
+    def version_registro(write_date):
+        """Versión de un registro para ETag/If-Match: su write_date con microsegundos"""
+        return write_date.strftime('%Y%m%d%H%M%S%f') if write_date else '0'
+    
+    @staticmethod
+    def paginar(modelo, domain, campo_fecha, kwargs, limit=20, descendente=True, contar=True):
+        """Búsqueda paginada por offset/limit o por cursor (keyset sobre (campo_fecha, id))
+        
+        Parámetros aceptados (JSON-RPC body o query string):
+            offset, limit: paginación clásica (se mantiene para versiones antiguas de la app)
+            cursor: valor de siguiente_cursor de la página anterior; si se indica, se ignora offset
+            include_total: 'false' evita el search_count adicional
+        
+        Returns:
+            (registros, meta) donde meta contiene total, offset, limit y siguiente_cursor
+        """
+        params = request.httprequest.args
+        offset = kwargs.get('offset', 0) if 'offset' in kwargs else params.get('offset', 0, type=int)
+        limit = kwargs.get('limit', limit) if 'limit' in kwargs else params.get('limit', limit, type=int)
+        cursor = kwargs.get('cursor') or params.get('cursor')
+        include_total = kwargs.get('include_total', params.get('include_total', True))
+        if isinstance(include_total, str):
+            include_total = include_total.lower() not in ('0', 'false', 'no')
+        
+        direccion = 'desc nulls last' if descendente else 'asc nulls last'
+        order = f'{campo_fecha} {direccion}, id {"desc" if descendente else "asc"}'
+        
+        busqueda = list(domain)
+        if cursor:
+            fecha, ultimo_id = APIUtils.decodificar_cursor(cursor)
+            busqueda += APIUtils.dominio_cursor(campo_fecha, fecha, ultimo_id, descendente)
+            offset = 0
+        
+        # Se pide un registro de más para saber si hay página siguiente sin contar
+        registros = modelo.search(busqueda, offset=offset, limit=limit + 1, order=order)
+        siguiente_cursor = None
+        if len(registros) > limit:
+            registros = registros[:limit]
+            ultimo = registros[-1]
+            siguiente_cursor = APIUtils.codificar_cursor(ultimo[campo_fecha], ultimo.id)
+        
+        total = modelo.search_count(domain) if (contar and include_total) else None
+        
+        return registros, {
+            'total': total,
+            'offset': None if cursor else offset,
+            'limit': limit,
+            'siguiente_cursor': siguiente_cursor,
+        }
+    
     @staticmethod
     def usuario_to_dict(usuario):
         """Convierte un usuario a diccionario"""
@@ -53,6 +164,39 @@ class APIUtils:
             'imagen': imagen_b64,
         }
     
+    @staticmethod
+    def imagen_url(imagen, size=None):
+        """URL de una imagen de producto servida por /api/v1/imagenes
+        
+        Incluye el hash del contenido para que el cliente pueda cachearla
+        indefinidamente: si la imagen cambia, cambia la URL.
+        """
+        url = f'/api/v1/imagenes/{imagen.id}'
+        if size:
+            url += f'/{size}'
+        return f'{url}?h={imagen.imagen_hash}' if imagen.imagen_hash else url
+    
+    @staticmethod
+    def categoria_imagen_checksums(categoria_ids):
+        """{id de categoría: checksum de su imagen} para las categorías que tienen imagen"""
+        if not categoria_ids:
+            return {}
+        request.env.cr.execute("""
+            SELECT res_id, checksum FROM ir_attachment
+            WHERE res_model = 'pi.categoria' AND res_field = 'imagen' AND res_id IN %s
+        """, (tuple(categoria_ids),))
+        return dict(request.env.cr.fetchall())
+    
+    @staticmethod
+    def categoria_imagen_version(checksum):
+        """Token de versión de la imagen de una categoría (cambia solo si cambia la imagen)"""
+        return checksum[:12] if checksum else ''
+    
+    @staticmethod
+    def categoria_imagen_url(categoria_id, checksum):
+        """URL de la imagen de una categoría servida por /api/v1/imagenes/categorias"""
+        return f'/api/v1/imagenes/categorias/{categoria_id}?v={APIUtils.categoria_imagen_version(checksum)}'
+
     @staticmethod
     def producto_to_dict(producto, include_all_images=False):
         """Convierte un producto a diccionario
@@ -62,62 +206,85 @@ class APIUtils:
             include_all_images: Si True, incluye todas las imágenes (para detalle).
                               Si False, solo incluye imagen_principal (para listados).
         """
-        import logging
-        _logger = logging.getLogger(__name__)
+        return APIUtils.productos_to_dicts(producto, include_all_images=include_all_images)[0]
+
+    @staticmethod
+    def productos_to_dicts(productos, include_all_images=False):
+        """Convierte un recordset de productos a una lista de diccionarios
         
-        imagen_principal = None
-        imagenes = []
-        try:
-            if producto.imagenes_ids:
-                imagenes_ordenadas = producto.imagenes_ids.sorted('sequence')
-                for img in imagenes_ordenadas:
-                    img_data = img.imagen
-                    if img_data:
-                        if isinstance(img_data, str):
-                            img_str = img_data
-                        elif isinstance(img_data, (bytes, memoryview)):
-                            img_str = bytes(img_data).decode('utf-8')
-                        else:
-                            continue
-                        if include_all_images:
-                            imagenes.append(img_str)
-                        if imagen_principal is None:
-                            imagen_principal = img_str
-                            if not include_all_images:
-                                break
-        except Exception as e:
-            _logger.warning(f"Error getting product image for id={producto.id}: {e}")
-        
-        result = {
-            'id': producto.id,
-            'id_producto': producto.id_producto,
-            'nombre': producto.nombre_producto,
-            'descripcion': producto.descripcion,
-            'precio': producto.precio,
-            'estado': producto.estado,
-            'antiguedad_meses': producto.antiguedad_producto,
-            'ubicacion': producto.ubicacion,
-            'estado_venta': producto.estado_venta,
-            'categoria': {
-                'id': producto.categoria_id.id,
-                'nombre': producto.categoria_id.nombre,
-            } if producto.categoria_id else None,
-            'propietario': {
-                'id': producto.propietario_id.id,
-                'nombre': producto.propietario_id.name,
-                'valoracion': round(producto.propietario_id.valoracion_promedio, 2),
-            } if producto.propietario_id else None,
-            'etiquetas': [{'id': e.id, 'nombre': e.nombre} for e in producto.etiquetas_ids],
-            'total_comentarios': producto.total_comentarios,
-            'total_imagenes': producto.total_imagenes,
-            'imagen_principal': imagen_principal,
-            'fecha_publicacion': producto.fecha_publicacion.isoformat() if producto.fecha_publicacion else None,
+        Carga los datos relacionados de toda la página de una vez (conteos de
+        comentarios e imágenes, primera imagen, etiquetas, categoría y
+        propietario) en lugar de recorrer cada producto por separado, de modo
+        que el número de consultas no depende del tamaño de la página.
+        Las imágenes se devuelven como URLs (ver imagen_url), no en base64.
+        
+        Args:
+            productos: Recordset de pi.producto
+            include_all_images: Si True, incluye las URLs de todas las imágenes de cada producto.
+        """
+        if not productos:
+            return []
+        
+        env = productos.env
+        ids = productos.ids
+        
+        # Conteo de comentarios por producto (una sola consulta agrupada)
+        total_comentarios = {
+            producto.id: count
+            for producto, count in env['pi.comentario']._read_group(
+                [('producto_id', 'in', ids)], ['producto_id'], ['__count'])
         }
         
-        if include_all_images:
-            result['imagenes'] = imagenes
+        # Imágenes de todos los productos, ya ordenadas por (sequence, id).
+        # Solo se leen id y hash: el binario se sirve aparte por URL.
+        imagenes_por_producto = defaultdict(list)
+        for img in env['pi.producto.imagen'].search([('producto_id', 'in', ids)]):
+            imagenes_por_producto[img.producto_id.id].append(img)
+        
+        # Precarga de etiquetas, categorías y propietarios de toda la página
+        productos.mapped('etiquetas_ids.nombre')
+        productos.mapped('categoria_id.nombre')
+        productos.mapped('propietario_id').read(['name', 'valoracion_promedio'])
+        
+        resultado = []
+        for producto in productos:
+            imagenes = imagenes_por_producto.get(producto.id, [])
+            principal = imagenes[0] if imagenes else None
+            
+            result = {
+                'id': producto.id,
+                'id_producto': producto.id_producto,
+                'nombre': producto.nombre_producto,
+                'descripcion': producto.descripcion,
+                'precio': producto.precio,
+                'estado': producto.estado,
+                'antiguedad_meses': producto.antiguedad_producto,
+                'ubicacion': producto.ubicacion,
+                'estado_venta': producto.estado_venta,
+                'categoria': {
+                    'id': producto.categoria_id.id,
+                    'nombre': producto.categoria_id.nombre,
+                } if producto.categoria_id else None,
+                'propietario': {
+                    'id': producto.propietario_id.id,
+                    'nombre': producto.propietario_id.name,
+                    'valoracion': round(producto.propietario_id.valoracion_promedio, 2),
+                } if producto.propietario_id else None,
+                'etiquetas': [{'id': e.id, 'nombre': e.nombre} for e in producto.etiquetas_ids],
+                'total_comentarios': total_comentarios.get(producto.id, 0),
+                'total_imagenes': len(imagenes),
+                'imagen_principal': APIUtils.imagen_url(principal, 512) if principal else None,
+                'imagen_principal_hash': principal.imagen_hash if principal else None,
+                'fecha_publicacion': producto.fecha_publicacion.isoformat() if producto.fecha_publicacion else None,
+                'version': APIUtils.version_registro(producto.write_date),
+            }
+            
+            if include_all_images:
+                result['imagenes'] = [APIUtils.imagen_url(img, 1024) for img in imagenes]
+            
+            resultado.append(result)
         
-        return result
+        return resultado
     
     @staticmethod
     def comentario_to_dict(comentario):
@@ -11,12 +11,7 @@ class ValoracionesController(http.Controller):
     def listar_valoraciones(self, **kwargs):
         """Lista todas las valoraciones del usuario autenticado (dadas y recibidas)"""
         try:
-            usuario_data = request.usuario_actual
-            
-            # Buscar el usuario por id_usuario para obtener su ID numérico de Odoo
-            usuario = request.env['pi.usuario'].sudo().search([('id_usuario', '=', usuario_data['id'])], limit=1)
-            if not usuario:
-                return APIUtils.error_response('Usuario no encontrado', 404)
+            usuario = request.usuario
             
             offset = request.httprequest.args.get('offset', 0, type=int)
             limit = request.httprequest.args.get('limit', 20, type=int)
@@ -68,12 +63,7 @@ class ValoracionesController(http.Controller):
     def obtener_valoracion(self, valoracion_id, **kwargs):
         """Obtiene una valoración específica"""
         try:
-            usuario_data = request.usuario_actual
-            
-            # Buscar el usuario por id_usuario para obtener su ID numérico de Odoo
-            usuario = request.env['pi.usuario'].sudo().search([('id_usuario', '=', usuario_data['id'])], limit=1)
-            if not usuario:
-                return APIUtils.error_response('Usuario no encontrado', 404)
+            usuario = request.usuario
             
             valoracion = request.env['pi.valoracion'].sudo().browse(valoracion_id)
             
@@ -109,12 +99,7 @@ class ValoracionesController(http.Controller):
     def crear_valoracion(self, **kwargs):
         """Crea una valoración de usuario"""
         try:
-            usuario_data = request.usuario_actual
-            
-            # Buscar el usuario por id_usuario para obtener su ID numérico de Odoo
-            usuario = request.env['pi.usuario'].sudo().search([('id_usuario', '=', usuario_data['id'])], limit=1)
-            if not usuario:
-                return APIUtils.error_response('Usuario no encontrado', 404)
+            usuario = request.usuario
             
             # Obtener datos JSON correctamente
             data = kwargs if kwargs else (request.jsonrequest if hasattr(request, 'jsonrequest') else json.loads(request.httprequest.data))
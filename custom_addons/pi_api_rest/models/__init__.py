@@ -1,3 +1,9 @@
 # -*- coding: utf-8 -*-
 
 from . import models
+from . import pi_usuario
+from . import pi_mensaje
+from . import pi_categoria
+from . import pi_etiqueta
+from . import ir_http
+from . import pi_api_limite
@@ -0,0 +1,68 @@
+from odoo import models
+from odoo.http import request
+
+from ..controllers.auth import JWTAuth
+from ..controllers.metricas import metricas_api
+from ..controllers.metricas_controller import metricas_autorizadas
+
+
+class IrHttp(models.AbstractModel):
+    _inherit = 'ir.http'
+
+    # Rutas medidas: todas las de la API salvo la propia exportación de métricas
+    PREFIJO_API = '/api/v1/'
+    RUTAS_EXCLUIDAS = ('/api/v1/_metrics',)
+    # Rutas que esperan a propósito (long-polling): se miden, pero no cuentan como lentas
+    RUTAS_SIN_UMBRAL = ('/api/v1/conversaciones/stream',)
+    PARAM_UMBRAL_LENTO = 'pi_api_rest.umbral_lento_ms'
+    UMBRAL_LENTO_DEFECTO = 1000
+
+    @classmethod
+    def _pre_dispatch(cls, rule, args):
+        super(IrHttp, cls)._pre_dispatch(rule, args)
+        ruta = rule.rule
+        if ruta.startswith(cls.PREFIJO_API) and not ruta.startswith(cls.RUTAS_EXCLUIDAS):
+            umbral = 0 if ruta in cls.RUTAS_SIN_UMBRAL else cls._umbral_lento()
+            metricas_api.iniciar(ruta, request.httprequest.method, umbral)
+
+    @classmethod
+    def _umbral_lento(cls):
+        """Umbral de petición lenta en segundos (ir.config_parameter en milisegundos; 0 lo desactiva)"""
+        try:
+            return float(request.env['ir.config_parameter'].sudo().get_param(
+                cls.PARAM_UMBRAL_LENTO, cls.UMBRAL_LENTO_DEFECTO)) / 1000
+        except (TypeError, ValueError):
+            return cls.UMBRAL_LENTO_DEFECTO / 1000
+
+    @classmethod
+    def _dispatch(cls, endpoint):
+        peticion = metricas_api.actual()
+        try:
+            resultado = super(IrHttp, cls)._dispatch(endpoint)
+        except Exception:
+            if peticion is not None:
+                peticion['status'] = 500
+                metricas_api.finalizar(request.httprequest.path, 0)
+            raise
+        if peticion is not None:
+            # Las rutas type='json' devuelven el código en el diccionario de error
+            if isinstance(resultado, dict) and 'error' in resultado:
+                peticion['status'] = resultado.get('status', 500)
+            elif hasattr(resultado, 'status_code'):
+                peticion['status'] = resultado.status_code
+        return resultado
+
+    @classmethod
+    def _post_dispatch(cls, response):
+        super(IrHttp, cls)._post_dispatch(response)
+        if metricas_api.actual() is None:
+            return
+        medidas = metricas_api.finalizar(request.httprequest.path, response.calculate_content_length() or 0)
+        # Cabeceras de depuración solo si el cliente las pide y puede ver métricas: el
+        # metrics_token va en X-Debug-Queries (Authorization lleva el JWT) o como Bearer
+        depuracion = request.httprequest.headers.get('X-Debug-Queries')
+        if medidas and depuracion and metricas_autorizadas(depuracion, JWTAuth.obtener_token_desde_header()):
+            consultas, tiempo_sql, duracion = medidas
+            response.headers['X-Debug-Queries'] = str(consultas)
+            response.headers['X-Debug-Query-Time'] = f'{tiempo_sql * 1000:.1f}ms'
+            response.headers['X-Debug-Duration'] = f'{duracion * 1000:.1f}ms'
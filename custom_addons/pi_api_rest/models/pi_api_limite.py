@@ -0,0 +1,21 @@
+from odoo import models, fields, api
+
+
+class PiApiLimite(models.Model):
+    _name = 'pi.api.limite'
+    _description = 'Intentos de Acceso a la API'
+    _log_access = False
+
+    # Solo se lee y escribe con SQL directo desde controllers/limitador.py
+    clave = fields.Char(string='Clave', required=True, readonly=True)
+    tokens = fields.Float(string='Intentos Disponibles', readonly=True)
+    fecha = fields.Datetime(string='Última Actualización', readonly=True)
+
+    _sql_constraints = [
+        ('clave_unique', 'unique(clave)', 'La clave del limitador debe ser única.'),
+    ]
+
+    @api.model
+    def _cron_limpiar(self):
+        """Borra los contadores sin actividad en el último día (ya estarían llenos)"""
+        self.env.cr.execute("DELETE FROM pi_api_limite WHERE fecha < (now() at time zone 'UTC') - interval '1 day'")
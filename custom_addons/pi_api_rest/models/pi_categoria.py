@@ -0,0 +1,25 @@
+from odoo import api, models
+
+from ..controllers.catalogo_controller import catalogo_cache
+
+
+class PiCategoria(models.Model):
+    _inherit = 'pi.categoria'
+
+    def _invalidar_catalogo(self):
+        """Invalida la caché de /api/v1/catalogo de este worker cuando se confirme la transacción"""
+        dbname = self.env.cr.dbname
+        self.env.cr.postcommit.add(lambda: catalogo_cache.invalidar(dbname))
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        self._invalidar_catalogo()
+        return super(PiCategoria, self).create(vals_list)
+
+    def write(self, vals):
+        self._invalidar_catalogo()
+        return super(PiCategoria, self).write(vals)
+
+    def unlink(self):
+        self._invalidar_catalogo()
+        return super(PiCategoria, self).unlink()
@@ -0,0 +1,22 @@
+from odoo import api, models
+
+from ..controllers.notificaciones import DespachadorMensajes
+
+
+class PiMensaje(models.Model):
+    _inherit = 'pi.mensaje'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        mensajes = super(PiMensaje, self).create(vals_list)
+        # Participantes a avisar tras el commit (un único NOTIFY por transacción)
+        pendientes = self.env.cr.postcommit.data.setdefault('pi.mensaje.notificar', set())
+        if not pendientes:
+            dbname = self.env.cr.dbname
+
+            @self.env.cr.postcommit.add
+            def notificar():
+                DespachadorMensajes.notificar(dbname, pendientes)
+
+        pendientes.update((mensajes.conversacion_id.comprador_id | mensajes.conversacion_id.vendedor_id).ids)
+        return mensajes
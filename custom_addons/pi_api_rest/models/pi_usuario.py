@@ -0,0 +1,28 @@
+from odoo import models
+
+from ..controllers.auth import usuario_cache
+
+
+class PiUsuario(models.Model):
+    _inherit = 'pi.usuario'
+
+    def _invalidar_cache_jwt(self):
+        """Elimina de la caché de jwt_required las entradas de estos usuarios
+
+        Se elimina ya y otra vez cuando se confirme la transacción: hasta entonces, otra
+        petición de este worker puede volver a guardar la fila anterior (p. ej. un usuario
+        todavía activo) y mantenerla durante todo el TTL.
+        """
+        dbname = self.env.cr.dbname
+        ids_usuario = [u for u in self.mapped('id_usuario') if u]
+        usuario_cache.invalidar(dbname, ids_usuario)
+        self.env.cr.postcommit.add(lambda: usuario_cache.invalidar(dbname, ids_usuario))
+
+    def write(self, vals):
+        # Invalidar con los id_usuario previos a la escritura (por si cambian)
+        self._invalidar_cache_jwt()
+        return super(PiUsuario, self).write(vals)
+
+    def unlink(self):
+        self._invalidar_cache_jwt()
+        return super(PiUsuario, self).unlink()
@@ -15,7 +15,7 @@ Long description of module's purpose
     # Check https://github.com/odoo/odoo/blob/15.0/odoo/addons/base/data/ir_module_category_data.xml
     # for the full list
     'category': 'Uncategorized',
-    'version': '0.1',
+    'version': '0.5',
 
     # any module necessary for this one to work correctly
     'depends': ['base','mail'],
@@ -23,7 +23,7 @@ Long description of module's purpose
     # always loaded
     'data': [
         'security/ir.model.access.csv',
-        'data/ir_sequence.xml',  # Secuencias para IDs automáticos
+        'data/ir_cron.xml',
         'reports/report_producto.xml',
         'reports/report_compra.xml',
         'views/pi_usuario_views.xml',
@@ -36,6 +36,7 @@ Long description of module's purpose
         'views/pi_reporte_views.xml',
         'views/pi_conversacion_views.xml',
         'views/pi_mensaje_views.xml',
+        'views/pi_job_views.xml',
     ],
     # only loaded in demonstration mode
     'demo': [
@@ -0,0 +1,45 @@
+# Script para ejecutar desde la consola de Odoo o shell
+# Importa productos de un vendedor desde un fichero NDJSON o CSV
+# (columnas: referencia, nombre, descripcion, precio, categoria_id, estado, ubicacion,
+#  etiquetas_ids e imagenes; en CSV las listas se separan con '|')
+
+# Para ejecutar desde el shell de Odoo:
+# PI_IMPORT_ARCHIVO=productos.csv PI_IMPORT_PROPIETARIO=USR-00042 PI_IMPORT_IMAGENES=fotos.zip \
+#     python odoo-bin shell -c odoo.conf -d nombre_base_datos
+# Luego ejecutar:
+# exec(open('ruta/a/este/archivo.py').read())
+#
+# PI_IMPORT_IMAGENES (opcional) puede ser un zip o un directorio con las imágenes.
+# PI_IMPORT_SOLO_VALIDAR=1 valida el fichero sin crear nada.
+# Se hace commit tras cada bloque de filas, así que una interrupción no pierde lo ya importado.
+
+import json
+import os
+
+archivo = os.environ['PI_IMPORT_ARCHIVO']
+formato = 'csv' if archivo.lower().endswith('.csv') else 'ndjson'
+solo_validar = os.environ.get('PI_IMPORT_SOLO_VALIDAR') == '1'
+bloque = 2000
+
+propietario = env['pi.usuario'].search([('id_usuario', '=', os.environ['PI_IMPORT_PROPIETARIO'])], limit=1)
+if not propietario:
+    raise SystemExit('Propietario no encontrado')
+
+importacion = env['pi.importacion.producto']
+with open(archivo, 'rb') as fichero:
+    filas = importacion.leer_filas(fichero.read(), formato)
+imagenes = importacion.leer_imagenes(os.environ['PI_IMPORT_IMAGENES']) if os.environ.get('PI_IMPORT_IMAGENES') else {}
+
+resultados = []
+for inicio in range(0, len(filas), bloque):
+    resultados += importacion.importar(filas[inicio:inicio + bloque], propietario, imagenes, solo_validar=solo_validar)
+    if not solo_validar:
+        env.cr.commit()
+    print(f"{min(inicio + bloque, len(filas))}/{len(filas)} filas procesadas")
+
+for resultado in resultados:
+    if resultado['estado'] == 'error':
+        print(json.dumps(resultado, ensure_ascii=False))
+print(f"Creados: {sum(r['estado'] == 'creado' for r in resultados)}, "
+      f"válidos: {sum(r['estado'] == 'valido' for r in resultados)}, "
+      f"errores: {sum(r['estado'] == 'error' for r in resultados)}")
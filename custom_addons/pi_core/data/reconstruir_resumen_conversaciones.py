@@ -0,0 +1,12 @@
+# Script para ejecutar desde la consola de Odoo o shell
+# Reconstruye total_mensajes, last_message_date y last_message_preview de todas las conversaciones
+# (se mantienen de forma incremental al crear/borrar mensajes; esto repara posibles desajustes)
+
+# Para ejecutar desde el shell de Odoo:
+# python odoo-bin shell -c odoo.conf -d nombre_base_datos
+# Luego ejecutar:
+# exec(open('ruta/a/este/archivo.py').read())
+
+total = env['pi.conversacion']._reconstruir_resumenes()
+env.cr.commit()
+print(f"Resumen reconstruido en {total} conversaciones")
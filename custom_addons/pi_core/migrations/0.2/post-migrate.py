@@ -0,0 +1,23 @@
+import logging
+
+_logger = logging.getLogger(__name__)
+
+# Tablas que reciben índices compuestos/parciales en la 0.2 (creados en los init() de cada modelo)
+TABLAS = [
+    'pi_producto',
+    'pi_producto_imagen',
+    'pi_compra',
+    'pi_conversacion',
+    'pi_mensaje',
+    'pi_comentario',
+    'pi_valoracion',
+]
+
+
+def migrate(cr, version):
+    """Actualiza las estadísticas para que el planificador use los índices nuevos desde el primer momento"""
+    if not version:
+        return
+    for tabla in TABLAS:
+        cr.execute(f'ANALYZE "{tabla}"')
+    _logger.info("pi_core 0.2: estadísticas recalculadas en %s", ', '.join(TABLAS))
@@ -0,0 +1,9 @@
+from odoo import api, SUPERUSER_ID
+
+
+def migrate(cr, version):
+    """Inicializa suma_valoraciones y sincroniza los contadores de pi.usuario, ahora incrementales"""
+    if not version:
+        return
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    env['pi.usuario']._cron_verificar_estadisticas()
@@ -0,0 +1,29 @@
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+def migrate(cr, version):
+    """Deja un único pi.usuario por email (sin distinguir mayúsculas) antes de crear email_normalizado
+
+    Se conserva el email del usuario más antiguo, que es el que encontraba el login hasta
+    ahora; a los demás se les añade '+duplicado<id>' a la parte local para que sigan
+    existiendo (con sus productos y compras) y un administrador pueda revisarlos.
+    """
+    if not version:
+        return
+    cr.execute("""
+        SELECT id, partner_id, email FROM (
+            SELECT u.id, u.partner_id, p.email,
+                   row_number() OVER (PARTITION BY lower(trim(p.email)) ORDER BY u.id) AS orden
+            FROM pi_usuario u
+            JOIN res_partner p ON p.id = u.partner_id
+            WHERE coalesce(trim(p.email), '') != ''
+        ) emails
+        WHERE orden > 1
+    """)
+    for usuario_id, partner_id, email in cr.fetchall():
+        local, arroba, dominio = email.strip().rpartition('@')
+        nuevo = f'{local}+duplicado{usuario_id}@{dominio}' if arroba else f'{dominio}+duplicado{usuario_id}'
+        cr.execute("UPDATE res_partner SET email = %s WHERE id = %s", (nuevo, partner_id))
+        _logger.warning("pi_core 0.4: email duplicado del pi.usuario %s cambiado de %s a %s", usuario_id, email, nuevo)
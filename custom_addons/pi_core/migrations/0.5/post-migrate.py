@@ -0,0 +1,19 @@
+from odoo import api, SUPERUSER_ID
+
+# Secuencias que creaba data/ir_sequence.xml
+SECUENCIAS = [
+    'seq_pi_producto', 'seq_pi_comentario', 'seq_pi_usuario', 'seq_pi_categoria',
+    'seq_pi_etiqueta', 'seq_pi_valoracion', 'seq_pi_reporte', 'seq_pi_compra',
+]
+
+
+def migrate(cr, version):
+    """Elimina las ir.sequence de pi_core: los id_* los asigna pi.generador.id por bloques"""
+    if not version:
+        return
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    for xmlid in SECUENCIAS:
+        secuencia = env.ref(f'pi_core.{xmlid}', raise_if_not_found=False)
+        if secuencia:
+            # unlink borra también la secuencia de PostgreSQL y su ir.model.data
+            secuencia.unlink()
@@ -1,5 +1,7 @@
 # -*- coding: utf-8 -*-
 
+from . import pi_generador_id
+from . import pi_job
 from . import pi_categoria
 from . import pi_comentario
 from . import pi_compra
@@ -8,6 +10,7 @@ from . import pi_reporte
 from . import pi_usuarios
 from . import pi_valoracion
 from . import pi_producto_imagen
+from . import pi_importacion_producto
 from . import pi_etiqueta
 from . import pi_conversacion
 from . import pi_mensaje
\ No newline at end of file
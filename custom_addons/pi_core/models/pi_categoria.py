@@ -1,4 +1,5 @@
 from odoo import models, fields, api
+from collections import Counter
 
 class piCategoria(models.Model):
     _name = 'pi.categoria'
@@ -15,24 +16,28 @@ class piCategoria(models.Model):
     productos_ids = fields.One2many('pi.producto', 'categoria_id', string='Productos')
     
     # Campos computados
-    total_productos = fields.Integer(string='Total de Productos', compute='_compute_total_productos', store=True)
-    productos_activos = fields.Integer(string='Productos Activos', compute='_compute_productos_activos', store=True)
-    
-    @api.model
-    def create(self, vals):
-        if vals.get('id_categoria', 'Nuevo') == 'Nuevo':
-            vals['id_categoria'] = self.env['ir.sequence'].next_by_code('pi.categoria') or 'CAT-NEW'
-        return super(piCategoria, self).create(vals)
-    
-    @api.depends('productos_ids')
-    def _compute_total_productos(self):
-        for record in self:
-            record.total_productos = len(record.productos_ids)
-    
-    @api.depends('productos_ids.estado_venta')
-    def _compute_productos_activos(self):
+    total_productos = fields.Integer(string='Total de Productos', compute='_compute_contadores_productos', store=True)
+    productos_activos = fields.Integer(string='Productos Activos', compute='_compute_contadores_productos', store=True)
+    
+    @api.model_create_multi
+    def create(self, vals_list):
+        self.env['pi.generador.id'].asignar('pi.categoria', vals_list, 'id_categoria')
+        return super(piCategoria, self).create(vals_list)
+    
+    @api.depends('productos_ids', 'productos_ids.estado_venta')
+    def _compute_contadores_productos(self):
+        # Un único GROUP BY para todas las categorías afectadas, sin cargar los productos
+        totales = Counter()
+        activos = Counter()
+        if self._origin.ids:
+            for categoria, estado_venta, total in self.env['pi.producto']._read_group(
+                    [('categoria_id', 'in', self._origin.ids)], ['categoria_id', 'estado_venta'], ['__count']):
+                totales[categoria.id] += total
+                if estado_venta == 'disponible':
+                    activos[categoria.id] += total
         for record in self:
-            record.productos_activos = len(record.productos_ids.filtered(lambda p: p.estado_venta == 'disponible'))
+            record.total_productos = totales[record._origin.id]
+            record.productos_activos = activos[record._origin.id]
     
     def action_listar_productos(self):
         return {
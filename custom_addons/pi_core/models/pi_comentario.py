@@ -15,7 +15,7 @@ class piComentario(models.Model):
     activo = fields.Boolean(string='Activo', default=True)
     
     # Relaciones
-    producto_id = fields.Many2one('pi.producto', string='Producto', required=True, ondelete='cascade')
+    producto_id = fields.Many2one('pi.producto', string='Producto', required=True, ondelete='cascade', index=True)
     usuario_id = fields.Many2one('pi.usuario', string='Usuario', required=True, ondelete='cascade')
     reportes_ids = fields.One2many('pi.reporte', 'comentario_reportado_id', string='Reportes')
     
@@ -23,19 +23,14 @@ class piComentario(models.Model):
     nombre_usuario = fields.Char(string='Usuario', related='usuario_id.name', readonly=True)
     total_reportes = fields.Integer(string='Total Reportes', compute='_compute_total_reportes', store=True)
     
-    @api.model
-    def create(self, vals):
-        if vals.get('id_comentario', 'Nuevo') == 'Nuevo':
-            seq = self.env['ir.sequence'].next_by_code('pi.comentario')
-            if not seq:
-                import uuid
-                seq = 'COM-' + str(uuid.uuid4())[:8].upper()
-            vals['id_comentario'] = seq
+    @api.model_create_multi
+    def create(self, vals_list):
+        self.env['pi.generador.id'].asignar('pi.comentario', vals_list, 'id_comentario')
         
-        result = super(piComentario, self).create(vals)
+        result = super(piComentario, self).create(vals_list)
         
-        # Enviar notificación al propietario del producto
-        result._enviar_notificacion_propietario()
+        # Enviar notificación al propietario del producto (en segundo plano)
+        self.env['pi.job'].encolar(result, '_enviar_notificacion_propietario')
         
         return result
     
@@ -77,23 +72,20 @@ class piComentario(models.Model):
         }
     
     def _enviar_notificacion_propietario(self):
-        """Notificar al propietario del producto (solo funciona desde UI de Odoo, no desde API)"""
-        try:
+        """Notificar al propietario del producto (se ejecuta desde la cola pi.job, que reintenta si falla)"""
+        for comentario in self:
             # Notificar al propietario del producto que hay un nuevo comentario
-            propietario = self.producto_id.propietario_id
+            propietario = comentario.producto_id.propietario_id
             
             if propietario:
-                self.message_post(
-                    body=f'Nuevo comentario en tu producto "{self.producto_id.nombre_producto}" por {self.usuario_id.name}.',
-                    partner_ids=[propietario.id],
+                comentario.message_post(
+                    body=f'Nuevo comentario en tu producto "{comentario.producto_id.nombre_producto}" por {comentario.usuario_id.name}.',
+                    partner_ids=[propietario.partner_id.id],
                     message_type='notification'
                 )
                 
                 # También se puede enviar email, SMS, etc.
                 # self.env['mail.mail'].create({...})
-        except Exception:
-            # Silenciosamente ignorar errores cuando se llama desde la API sin usuario autenticado
-            pass
     
     _sql_constraints = [
         ('id_comentario_unique', 'unique(id_comentario)', 'El ID de comentario debe ser único.')
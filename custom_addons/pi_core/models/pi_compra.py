@@ -1,7 +1,7 @@
 from odoo import models, fields, api
-from odoo.exceptions import ValidationError
-import random
-from datetime import datetime
+from odoo.tools.sql import create_index
+from odoo.exceptions import UserError, ValidationError
+from collections import Counter
 
 class piCompra(models.Model):
     _name = 'pi.compra'
@@ -10,7 +10,7 @@ class piCompra(models.Model):
     _order = 'fecha desc'
     
     # Campos básicos
-    id_compra = fields.Char(string='ID Compra', required=True, copy=False, readonly=True, default=lambda self: self._generate_id_compra())
+    id_compra = fields.Char(string='ID Compra', required=True, copy=False, readonly=True, default='Nuevo')
     fecha = fields.Datetime(string='Fecha de Compra', default=fields.Datetime.now, required=True, readonly=True)
     monto = fields.Monetary(string='Monto', currency_field='currency_id', required=True)
     currency_id = fields.Many2one('res.currency', string='Moneda', default=lambda self: self.env.company.currency_id)
@@ -19,7 +19,7 @@ class piCompra(models.Model):
     # Relaciones
     comprador_id = fields.Many2one('pi.usuario', string='Comprador', required=True, ondelete='restrict')
     vendedor_id = fields.Many2one('pi.usuario', string='Vendedor', required=True, ondelete='restrict')
-    producto_id = fields.Many2one('pi.producto', string='Producto', required=True, ondelete='restrict')
+    producto_id = fields.Many2one('pi.producto', string='Producto', required=True, ondelete='restrict', index=True)
     
     # Estado de la compra
     estado = fields.Selection([
@@ -43,29 +43,54 @@ class piCompra(models.Model):
     
     def _generate_id_compra(self):
         """Genera un ID único para la compra"""
-        # Intentar obtener el siguiente número de la secuencia
-        sequence = self.env['ir.sequence'].sudo().next_by_code('pi.compra')
-        if sequence:
-            return sequence
-        else:
-            # Fallback: generar ID único con timestamp y random
-            timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-            random_num = random.randint(1000, 9999)
-            return f'CMP-{timestamp}-{random_num}'
-    
-    @api.model
-    def create(self, vals):
+        return self.env['pi.generador.id'].siguiente('pi.compra')
+    
+    @api.model_create_multi
+    def create(self, vals_list):
         # Generar ID único si no viene en vals o si es 'Nuevo'
-        if not vals.get('id_compra') or vals.get('id_compra') == 'Nuevo':
-            vals['id_compra'] = self._generate_id_compra()
+        self.env['pi.generador.id'].asignar('pi.compra', vals_list, 'id_compra')
         
-        # Establecer el monto desde el producto
-        if vals.get('producto_id'):
-            producto = self.env['pi.producto'].browse(vals['producto_id'])
-            vals['monto'] = producto.precio
-            vals['vendedor_id'] = producto.propietario_id.id
+        # Establecer el monto desde el producto (una lectura para todos los productos)
+        productos = self.env['pi.producto'].browse({vals['producto_id'] for vals in vals_list if vals.get('producto_id')})
+        datos_producto = {producto.id: (producto.precio, producto.propietario_id.id) for producto in productos}
+        for vals in vals_list:
+            if vals.get('producto_id'):
+                vals['monto'], vals['vendedor_id'] = datos_producto[vals['producto_id']]
         
-        return super(piCompra, self).create(vals)
+        compras = super(piCompra, self).create(vals_list)
+        self.env['pi.usuario']._aplicar_deltas_estadisticas({}, compras._contribucion_estadisticas())
+        return compras
+    
+    def write(self, vals):
+        antes = self._contribucion_estadisticas() if {'comprador_id', 'vendedor_id', 'active'} & vals.keys() else None
+        res = super(piCompra, self).write(vals)
+        if antes is not None:
+            self.env['pi.usuario']._aplicar_deltas_estadisticas(antes, self._contribucion_estadisticas())
+        return res
+    
+    def unlink(self):
+        antes = self._contribucion_estadisticas()
+        res = super(piCompra, self).unlink()
+        self.env['pi.usuario']._aplicar_deltas_estadisticas(antes, {})
+        return res
+    
+    def _contribucion_estadisticas(self):
+        """Aportación de estas compras a los contadores de comprador y vendedor (solo compras activas)"""
+        contribucion = {}
+        for compra in self:
+            if not compra.active:
+                continue
+            if compra.vendedor_id:
+                contribucion.setdefault(compra.vendedor_id.id, Counter())['total_productos_vendidos'] += 1
+            if compra.comprador_id:
+                contribucion.setdefault(compra.comprador_id.id, Counter())['total_productos_comprados'] += 1
+        return contribucion
+    
+    def init(self):
+        # Listado de compras/ventas: (usuario, fecha desc nulls last, id desc) según APIUtils.paginar
+        orden = ['fecha DESC NULLS LAST', 'id DESC']
+        create_index(self.env.cr, 'pi_compra_comprador_fecha_idx', self._table, ['comprador_id'] + orden)
+        create_index(self.env.cr, 'pi_compra_vendedor_fecha_idx', self._table, ['vendedor_id'] + orden)
     
     @api.depends('valoracion_comprador_id', 'valoracion_vendedor_id')
     def _compute_valoraciones_estado(self):
@@ -93,19 +118,21 @@ class piCompra(models.Model):
     def action_procesar_compra(self):
         self.ensure_one()
         if self.estado == 'pendiente':
+            # El producto se reserva al crear la compra desde la API; las demás lo reservan aquí
+            if self.producto_id.estado_venta != 'reservado' and not self.producto_id.reservar():
+                raise UserError('El producto ya no está disponible.')
             self.estado = 'procesando'
-            # Marcar producto como reservado
-            self.producto_id.estado_venta = 'reservado'
     
     def action_confirmar_compra(self):
         self.ensure_one()
         if self.estado in ['pendiente', 'procesando']:
+            # Marcar producto como vendido (con bloqueo de fila: solo una compra puede venderlo)
+            if not self.producto_id.vender():
+                raise UserError('El producto ya se ha vendido.')
             self.estado = 'confirmada'
-            # Marcar producto como vendido
-            self.producto_id.estado_venta = 'vendido'
             
-            # Enviar notificaciones para valorar
-            self._enviar_notificacion_valoracion()
+            # Enviar notificaciones para valorar (en segundo plano)
+            self.env['pi.job'].encolar(self, '_enviar_notificacion_valoracion')
     
     def action_valorar_vendedor(self):
         return {
@@ -138,22 +165,19 @@ class piCompra(models.Model):
         }
     
     def _enviar_notificacion_valoracion(self):
-        """Enviar notificaciones de valoración (solo funciona desde UI de Odoo, no desde API)"""
-        try:
+        """Enviar notificaciones de valoración (se ejecuta desde la cola pi.job, que reintenta si falla)"""
+        for compra in self:
             # Enviar notificación al comprador
-            self.message_post(
-                body=f'Compra confirmada. Por favor, valora al vendedor {self.vendedor_id.partner_id.name}.',
-                partner_ids=[self.comprador_id.partner_id.id]
+            compra.message_post(
+                body=f'Compra confirmada. Por favor, valora al vendedor {compra.vendedor_id.partner_id.name}.',
+                partner_ids=[compra.comprador_id.partner_id.id]
             )
             
             # Enviar notificación al vendedor
-            self.message_post(
-                body=f'Compra confirmada. Por favor, valora al comprador {self.comprador_id.partner_id.name}.',
-                partner_ids=[self.vendedor_id.partner_id.id]
+            compra.message_post(
+                body=f'Compra confirmada. Por favor, valora al comprador {compra.comprador_id.partner_id.name}.',
+                partner_ids=[compra.vendedor_id.partner_id.id]
             )
-        except Exception:
-            # Silenciosamente ignorar errores cuando se llama desde la API sin usuario autenticado
-            pass
     
     _sql_constraints = [
         ('id_compra_unique', 'unique(id_compra)', 'El ID de compra debe ser único.')
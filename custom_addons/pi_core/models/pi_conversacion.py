@@ -1,4 +1,5 @@
 from odoo import models, fields, api
+from odoo.tools.sql import create_index
 from odoo.exceptions import ValidationError
 
 
@@ -59,41 +60,109 @@ class PiConversacion(models.Model):
         required=True,
     )
 
+    # Resumen mantenido de forma incremental por pi.mensaje (create/write/unlink)
     last_message_date = fields.Datetime(
         string='Último mensaje',
-        compute='_compute_last_message',
-        store=True,
+        readonly=True,
+        copy=False,
     )
     last_message_preview = fields.Text(
         string='Último mensaje (vista previa)',
-        compute='_compute_last_message',
-        store=True,
+        readonly=True,
+        copy=False,
     )
 
     total_mensajes = fields.Integer(
         string='Total mensajes',
-        compute='_compute_last_message',
-        store=True,
+        readonly=True,
+        copy=False,
+        default=0,
     )
 
+    def init(self):
+        # Bandeja de conversaciones: (usuario, last_message_date desc nulls last, id desc)
+        orden = ['last_message_date DESC NULLS LAST', 'id DESC']
+        create_index(self.env.cr, 'pi_conversacion_comprador_fecha_idx', self._table, ['comprador_id'] + orden)
+        create_index(self.env.cr, 'pi_conversacion_vendedor_fecha_idx', self._table, ['vendedor_id'] + orden)
+
     @api.constrains('comprador_id', 'vendedor_id')
     def _check_usuarios_diferentes(self):
         for record in self:
             if record.comprador_id and record.vendedor_id and record.comprador_id == record.vendedor_id:
                 raise ValidationError('El comprador y el vendedor no pueden ser el mismo usuario en una conversación.')
 
-    @api.depends('mensaje_ids', 'mensaje_ids.fecha_envio', 'mensaje_ids.contenido')
-    def _compute_last_message(self):
-        for record in self:
-            if record.mensaje_ids:
-                last_msg = record.mensaje_ids.sorted('fecha_envio')[-1]
-                record.last_message_date = last_msg.fecha_envio
-                record.last_message_preview = (last_msg.contenido or '')[:200]
-                record.total_mensajes = len(record.mensaje_ids)
-            else:
-                record.last_message_date = False
-                record.last_message_preview = False
-                record.total_mensajes = 0
+    def _registrar_mensajes(self, total, fecha, contenido):
+        """Suma `total` mensajes nuevos y actualiza el último mensaje si `fecha` es más reciente
+
+        Un único UPDATE por conversación, sin releer el hilo.
+        """
+        self.ensure_one()
+        self.flush_recordset(['total_mensajes', 'last_message_date', 'last_message_preview'])
+        self.env.cr.execute("""
+            UPDATE pi_conversacion
+               SET total_mensajes = COALESCE(total_mensajes, 0) + %(total)s,
+                   last_message_preview = CASE
+                       WHEN last_message_date IS NULL OR last_message_date <= %(fecha)s
+                       THEN %(preview)s ELSE last_message_preview END,
+                   last_message_date = GREATEST(COALESCE(last_message_date, %(fecha)s), %(fecha)s)
+             WHERE id = %(id)s
+        """, {
+            'total': total,
+            'fecha': fecha,
+            'preview': (contenido or '')[:200],
+            'id': self.id,
+        })
+        self.invalidate_recordset(['total_mensajes', 'last_message_date', 'last_message_preview'])
+
+    def _descontar_mensajes(self, total, refrescar_ultimo):
+        """Resta `total` mensajes borrados; si entre ellos estaba el último, lo vuelve a leer (LIMIT 1 por índice)"""
+        self.ensure_one()
+        self.flush_recordset(['total_mensajes', 'last_message_date', 'last_message_preview'])
+        ultimo = """,
+                   (last_message_date, last_message_preview) = (
+                       SELECT m.fecha_envio, LEFT(m.contenido, 200)
+                         FROM pi_mensaje m
+                        WHERE m.conversacion_id = c.id
+                     ORDER BY m.fecha_envio DESC, m.id DESC
+                        LIMIT 1)""" if refrescar_ultimo else ''
+        self.env.cr.execute(f"""
+            UPDATE pi_conversacion c
+               SET total_mensajes = GREATEST(COALESCE(c.total_mensajes, 0) - %(total)s, 0){ultimo}
+             WHERE c.id = %(id)s
+        """, {'total': total, 'id': self.id})
+        self.invalidate_recordset(['total_mensajes', 'last_message_date', 'last_message_preview'])
+
+    def _reconstruir_resumen(self):
+        """Recalcula total_mensajes y el último mensaje desde pi_mensaje en una sola consulta"""
+        if not self.ids:
+            return
+        self.env['pi.mensaje'].flush_model(['conversacion_id', 'fecha_envio', 'contenido'])
+        self.env.cr.execute("""
+            UPDATE pi_conversacion c
+               SET total_mensajes = COALESCE(agg.total, 0),
+                   last_message_date = ult.fecha_envio,
+                   last_message_preview = LEFT(ult.contenido, 200)
+              FROM pi_conversacion c2
+         LEFT JOIN (SELECT conversacion_id, count(*) AS total
+                      FROM pi_mensaje
+                     WHERE conversacion_id IN %(ids)s
+                  GROUP BY conversacion_id) agg ON agg.conversacion_id = c2.id
+         LEFT JOIN LATERAL (SELECT m.fecha_envio, m.contenido
+                              FROM pi_mensaje m
+                             WHERE m.conversacion_id = c2.id
+                          ORDER BY m.fecha_envio DESC, m.id DESC
+                             LIMIT 1) ult ON TRUE
+             WHERE c.id = c2.id AND c.id IN %(ids)s
+        """, {'ids': tuple(self.ids)})
+        self.invalidate_recordset(['total_mensajes', 'last_message_date', 'last_message_preview'])
+
+    @api.model
+    def _reconstruir_resumenes(self, batch_size=1000):
+        """Repara el resumen de todas las conversaciones (ver data/reconstruir_resumen_conversaciones.py)"""
+        ids = self.with_context(active_test=False).search([]).ids
+        for i in range(0, len(ids), batch_size):
+            self.browse(ids[i:i + batch_size])._reconstruir_resumen()
+        return len(ids)
 
     def action_cerrar_conversacion(self):
         for record in self:
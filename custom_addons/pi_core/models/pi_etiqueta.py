@@ -21,6 +21,19 @@ class piEtiqueta(models.Model):
         for record in self:
             record.total_productos = len(record.productos_ids)
     
+    def write(self, vals):
+        res = super(piEtiqueta, self).write(vals)
+        # El nombre de la etiqueta forma parte del índice de búsqueda de sus productos
+        if 'nombre' in vals:
+            self.productos_ids._actualizar_search_vector()
+        return res
+    
+    def unlink(self):
+        productos = self.productos_ids
+        res = super(piEtiqueta, self).unlink()
+        productos.exists()._actualizar_search_vector()
+        return res
+    
     _sql_constraints = [
         ('nombre_unique', 'unique(nombre)', 'El nombre de la etiqueta debe ser único.')
     ]
\ No newline at end of file
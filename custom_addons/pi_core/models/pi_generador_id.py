@@ -0,0 +1,78 @@
+from odoo import models, api
+from collections import deque
+import threading
+
+# Bloques de números ya reservados en este worker: (db, código) -> deque de números
+_bloques = {}
+_bloques_lock = threading.Lock()
+
+
+class PiGeneradorId(models.AbstractModel):
+    _name = 'pi.generador.id'
+    _description = 'Generador de IDs del Marketplace'
+
+    # Código -> (prefijo, tabla, columna con el ID)
+    SECUENCIAS = {
+        'pi.producto': ('PRD-', 'pi_producto', 'id_producto'),
+        'pi.usuario': ('USR-', 'pi_usuario', 'id_usuario'),
+        'pi.compra': ('CMP-', 'pi_compra', 'id_compra'),
+        'pi.valoracion': ('VAL-', 'pi_valoracion', 'id_valoracion'),
+        'pi.comentario': ('COM-', 'pi_comentario', 'id_comentario'),
+        'pi.categoria': ('CAT-', 'pi_categoria', 'id_categoria'),
+    }
+    # Números reservados por cada nextval (la secuencia avanza de BLOQUE en BLOQUE)
+    BLOQUE = 100
+    PADDING = 5
+
+    @staticmethod
+    def _nombre_secuencia(codigo):
+        return f"pi_id_{codigo.replace('.', '_')}_seq"
+
+    def init(self):
+        # Una secuencia de PostgreSQL por código, que continúa tras el mayor ID numérico existente
+        cr = self.env.cr
+        for codigo, (prefijo, tabla, columna) in self.SECUENCIAS.items():
+            inicio = 1
+            cr.execute("SELECT to_regclass(%s)", (tabla,))
+            if cr.fetchone()[0]:
+                cr.execute(
+                    f"SELECT max(substring({columna} from %s)::bigint) FROM {tabla}",
+                    (f'^{prefijo}([0-9]+)$',),
+                )
+                inicio = (cr.fetchone()[0] or 0) + 1
+            cr.execute(
+                f"CREATE SEQUENCE IF NOT EXISTS {self._nombre_secuencia(codigo)} "
+                f"INCREMENT BY {self.BLOQUE} START WITH {inicio} MINVALUE 1"
+            )
+
+    @api.model
+    def siguientes(self, codigo, cantidad=1):
+        """Devuelve `cantidad` IDs formateados (p. ej. PRD-00042) para el código dado
+
+        Cada nextval reserva un bloque de BLOQUE números para este worker, así que la
+        mayoría de las llamadas no consultan la base de datos. Los números no son
+        consecutivos entre workers y pueden quedar huecos (como con ir.sequence).
+        """
+        prefijo = self.SECUENCIAS[codigo][0]
+        clave = (self.env.cr.dbname, codigo)
+        numeros = []
+        with _bloques_lock:
+            disponibles = _bloques.setdefault(clave, deque())
+            while len(numeros) < cantidad:
+                if not disponibles:
+                    self.env.cr.execute("SELECT nextval(%s)", (self._nombre_secuencia(codigo),))
+                    inicio = self.env.cr.fetchone()[0]
+                    disponibles.extend(range(inicio, inicio + self.BLOQUE))
+                numeros.append(disponibles.popleft())
+        return [f'{prefijo}{numero:0{self.PADDING}d}' for numero in numeros]
+
+    @api.model
+    def siguiente(self, codigo):
+        return self.siguientes(codigo)[0]
+
+    @api.model
+    def asignar(self, codigo, vals_list, campo):
+        """Rellena `campo` en los vals que no traen ID (vacío o 'Nuevo') con una única reserva"""
+        pendientes = [vals for vals in vals_list if not vals.get(campo) or vals.get(campo) == 'Nuevo']
+        for vals, nuevo_id in zip(pendientes, self.siguientes(codigo, len(pendientes))):
+            vals[campo] = nuevo_id
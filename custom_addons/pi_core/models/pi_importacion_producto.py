@@ -0,0 +1,210 @@
+from odoo import models, api
+import base64
+import csv
+import io
+import json
+import os
+import zipfile
+
+# Separador de listas (etiquetas_ids, imagenes) en las columnas CSV
+SEPARADOR_LISTA = '|'
+EXTENSIONES_IMAGEN = ('.jpg', '.jpeg', '.png', '.gif', '.webp')
+
+
+class PiImportacionProducto(models.AbstractModel):
+    _name = 'pi.importacion.producto'
+    _description = 'Importación masiva de productos'
+
+    # Productos creados por cada create() (cada lote va en su propio savepoint)
+    TAMANO_LOTE = 200
+
+    @api.model
+    def leer_filas(self, contenido, formato):
+        """Convierte un fichero NDJSON o CSV (bytes o str) en una lista de diccionarios
+
+        Cada fila lleva en '_fila' su número (1 = primera fila de datos). Las líneas
+        NDJSON que no son JSON válido se devuelven con '_error'.
+        """
+        if isinstance(contenido, bytes):
+            contenido = contenido.decode('utf-8-sig')
+        filas = []
+        if formato == 'ndjson':
+            numero = 0
+            for linea in contenido.splitlines():
+                if not linea.strip():
+                    continue
+                numero += 1
+                try:
+                    fila = json.loads(linea)
+                    if not isinstance(fila, dict):
+                        raise ValueError
+                except ValueError:
+                    fila = {'_error': 'Línea JSON inválida'}
+                fila['_fila'] = numero
+                filas.append(fila)
+        elif formato == 'csv':
+            try:
+                dialecto = csv.Sniffer().sniff(contenido[:4096], delimiters=',;\t')
+            except csv.Error:
+                dialecto = csv.excel
+            for numero, fila in enumerate(csv.DictReader(io.StringIO(contenido), dialect=dialecto), start=1):
+                fila = {clave.strip(): valor for clave, valor in fila.items() if clave}
+                fila['_fila'] = numero
+                filas.append(fila)
+        else:
+            raise ValueError(f'Formato no soportado: {formato} (usa ndjson o csv)')
+        return filas
+
+    @api.model
+    def leer_imagenes(self, ruta_o_zip):
+        """Devuelve {nombre de archivo: bytes} desde un zip (ruta o bytes) o un directorio"""
+        imagenes = {}
+        if isinstance(ruta_o_zip, str) and os.path.isdir(ruta_o_zip):
+            for nombre in os.listdir(ruta_o_zip):
+                if nombre.lower().endswith(EXTENSIONES_IMAGEN):
+                    with open(os.path.join(ruta_o_zip, nombre), 'rb') as fichero:
+                        imagenes[nombre] = fichero.read()
+            return imagenes
+        origen = io.BytesIO(ruta_o_zip) if isinstance(ruta_o_zip, bytes) else ruta_o_zip
+        try:
+            with zipfile.ZipFile(origen) as archivo:
+                for info in archivo.infolist():
+                    if not info.is_dir() and info.filename.lower().endswith(EXTENSIONES_IMAGEN):
+                        imagenes[os.path.basename(info.filename)] = archivo.read(info)
+        except zipfile.BadZipFile:
+            raise ValueError('El zip de imágenes no es válido')
+        return imagenes
+
+    @staticmethod
+    def _lista(valor):
+        if not valor:
+            return []
+        if isinstance(valor, (list, tuple)):
+            return list(valor)
+        return [parte.strip() for parte in str(valor).split(SEPARADOR_LISTA) if parte.strip()]
+
+    @api.model
+    def importar(self, filas, propietario, imagenes=None, solo_validar=False):
+        """Valida y crea productos de `propietario` a partir de filas ya leídas
+
+        Las categorías y etiquetas se comprueban con una consulta para todas las filas.
+        Los productos válidos se crean por lotes de TAMANO_LOTE, cada uno en un savepoint;
+        si un lote falla se reintenta fila a fila para aislar las filas erróneas.
+
+        Returns:
+            lista de resultados por fila: {'fila', 'referencia', 'estado': 'creado'|'valido'|'error', ...}
+        """
+        imagenes = imagenes or {}
+        Producto = self.env['pi.producto']
+        estados = dict(Producto._fields['estado'].selection)
+
+        # Validación en bloque: ids de categorías y etiquetas referenciadas por todas las filas
+        def enteros(valores):
+            return {int(v) for v in valores if str(v).strip().isdigit()}
+
+        categorias = enteros(fila.get('categoria_id') for fila in filas if fila.get('categoria_id'))
+        categorias = set(self.env['pi.categoria'].browse(categorias).exists().ids)
+        etiquetas = enteros(e for fila in filas for e in self._lista(fila.get('etiquetas_ids')))
+        etiquetas = set(self.env['pi.etiqueta'].browse(etiquetas).exists().ids)
+
+        resultados = []
+        pendientes = []  # (resultado, vals)
+        for fila in filas:
+            resultado = {'fila': fila.get('_fila'), 'referencia': fila.get('referencia') or None}
+            resultados.append(resultado)
+            errores = [fila['_error']] if fila.get('_error') else []
+            vals = {}
+            if not errores:
+                errores, vals = self._validar_fila(fila, propietario, imagenes, estados, categorias, etiquetas)
+            if errores:
+                resultado.update(estado='error', errores=errores)
+            elif solo_validar:
+                resultado['estado'] = 'valido'
+            else:
+                pendientes.append((resultado, vals))
+
+        # Sin mensajes de chatter ni tracking por producto: es una carga masiva
+        Producto = Producto.with_context(tracking_disable=True, mail_create_nolog=True)
+        for inicio in range(0, len(pendientes), self.TAMANO_LOTE):
+            lote = pendientes[inicio:inicio + self.TAMANO_LOTE]
+            try:
+                with self.env.cr.savepoint():
+                    productos = Producto.create([vals for __, vals in lote])
+                parejas = zip(lote, productos)
+            except Exception:
+                parejas = []
+                for resultado, vals in lote:
+                    try:
+                        with self.env.cr.savepoint():
+                            parejas.append(((resultado, vals), Producto.create(vals)))
+                    except Exception as e:
+                        resultado.update(estado='error', errores=[str(e)])
+            for (resultado, __), producto in parejas:
+                resultado.update(estado='creado', id=producto.id, id_producto=producto.id_producto)
+        return resultados
+
+    def _validar_fila(self, fila, propietario, imagenes, estados, categorias, etiquetas):
+        """Devuelve (errores, vals de create) para una fila"""
+        errores = []
+        for campo in ('nombre', 'descripcion', 'precio', 'categoria_id', 'ubicacion'):
+            if fila.get(campo) in (None, ''):
+                errores.append(f'Falta el campo {campo}')
+
+        precio = categoria_id = None
+        try:
+            precio = float(fila['precio']) if fila.get('precio') not in (None, '') else None
+            if precio is not None and precio <= 0:
+                errores.append('El precio debe ser mayor que 0')
+        except (TypeError, ValueError):
+            errores.append('Precio inválido')
+        if fila.get('categoria_id') not in (None, ''):
+            try:
+                categoria_id = int(fila['categoria_id'])
+            except (TypeError, ValueError):
+                categoria_id = None
+            if categoria_id not in categorias:
+                errores.append(f"Categoría {fila['categoria_id']} no encontrada")
+
+        estado = fila.get('estado') or 'nuevo'
+        if estado not in estados:
+            errores.append(f'Estado inválido: {estado}')
+
+        etiquetas_ids = []
+        for etiqueta in self._lista(fila.get('etiquetas_ids')):
+            try:
+                etiqueta = int(etiqueta)
+            except (TypeError, ValueError):
+                etiqueta = None
+            if etiqueta not in etiquetas:
+                errores.append(f'Etiqueta no encontrada: {etiqueta}')
+            else:
+                etiquetas_ids.append(etiqueta)
+        Producto = self.env['pi.producto']
+        if len(etiquetas_ids) > Producto.MAX_ETIQUETAS:
+            errores.append(f'No puedes asignar más de {Producto.MAX_ETIQUETAS} etiquetas a un producto')
+
+        nombres_imagen = self._lista(fila.get('imagenes'))
+        if len(nombres_imagen) > Producto.MAX_IMAGENES:
+            errores.append(f'No puedes subir más de {Producto.MAX_IMAGENES} imágenes')
+        faltan = [nombre for nombre in nombres_imagen if nombre not in imagenes]
+        if faltan:
+            errores.append(f"Imágenes no incluidas en la petición: {', '.join(faltan)}")
+
+        if errores:
+            return errores, {}
+        return [], {
+            'nombre_producto': fila['nombre'],
+            'descripcion': fila['descripcion'],
+            'precio': precio,
+            'categoria_id': categoria_id,
+            'estado': estado,
+            'estado_venta': 'disponible',
+            'ubicacion': fila['ubicacion'],
+            'propietario_id': propietario.id,
+            'etiquetas_ids': [(6, 0, etiquetas_ids)],
+            'imagenes_ids': [(0, 0, {
+                'imagen': base64.b64encode(imagenes[nombre]),
+                'nombre': nombre,
+                'sequence': (i + 1) * 10,
+            }) for i, nombre in enumerate(nombres_imagen)],
+        }
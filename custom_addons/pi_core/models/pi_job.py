@@ -0,0 +1,154 @@
+from odoo import models, fields, api
+from odoo.tools.sql import create_index
+from collections import defaultdict
+from datetime import timedelta
+import logging
+import time
+
+_logger = logging.getLogger(__name__)
+
+
+class PiJob(models.Model):
+    _name = 'pi.job'
+    _description = 'Tarea en Cola'
+    _order = 'id'
+
+    modelo = fields.Char(string='Modelo', required=True, readonly=True)
+    res_id = fields.Integer(string='ID del Registro', required=True, readonly=True)
+    metodo = fields.Char(string='Método', required=True, readonly=True)
+    estado = fields.Selection([
+        ('pendiente', 'Pendiente'),
+        ('hecho', 'Hecho'),
+        ('fallido', 'Fallido'),
+    ], string='Estado', default='pendiente', required=True, readonly=True)
+    intentos = fields.Integer(string='Intentos', default=0, readonly=True)
+    proximo_intento = fields.Datetime(string='Próximo Intento', default=fields.Datetime.now, readonly=True)
+    fecha_fin = fields.Datetime(string='Fecha de Finalización', readonly=True)
+    ultimo_error = fields.Text(string='Último Error', readonly=True)
+
+    # Reintentos con espera exponencial: 1, 2, 4, 8... minutos
+    MAX_INTENTOS = 5
+    # Tareas procesadas por cada ejecución del cron
+    LOTE = 500
+    # Días que se conservan las tareas terminadas
+    DIAS_CONSERVACION = 7
+
+    # Contadores por worker (tareas hechas, reintentadas y fallidas, y tiempo de proceso)
+    contadores = {'hechos': 0, 'reintentos': 0, 'fallidos': 0, 'segundos': 0.0}
+
+    def init(self):
+        # Solo las tareas pendientes se buscan por fecha
+        create_index(self.env.cr, 'pi_job_pendiente_idx', self._table, ['proximo_intento', 'id'], where="estado = 'pendiente'")
+
+    @api.model
+    def encolar(self, registros, metodo):
+        """Encola la llamada registros.<metodo>() para ejecutarla fuera de la petición
+
+        Se crea una tarea por registro; el cron las agrupa y llama al método una vez por
+        cada lote de registros del mismo modelo. El cron se dispara al hacer commit.
+        """
+        if not registros:
+            return self.browse()
+        jobs = self.sudo().create([{
+            'modelo': registros._name,
+            'res_id': registro_id,
+            'metodo': metodo,
+        } for registro_id in registros.ids])
+        cron = self.env.ref('pi_core.ir_cron_procesar_jobs', raise_if_not_found=False)
+        if cron:
+            cron.sudo()._trigger()
+        return jobs
+
+    @api.model
+    def _cron_procesar(self, limite=None):
+        """Ejecuta las tareas pendientes cuyo próximo intento ha vencido
+
+        Las filas se bloquean con SKIP LOCKED, así que varios workers de cron pueden
+        procesar la cola a la vez sin repetir tareas.
+        """
+        inicio = time.monotonic()
+        self.env.cr.execute("""
+            SELECT id FROM pi_job
+            WHERE estado = 'pendiente' AND proximo_intento <= now() at time zone 'UTC'
+            ORDER BY proximo_intento, id
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        """, (limite or self.LOTE,))
+        jobs = self.browse([fila[0] for fila in self.env.cr.fetchall()])
+
+        grupos = defaultdict(lambda: self.browse())
+        for job in jobs:
+            grupos[(job.modelo, job.metodo)] |= job
+
+        for (modelo, metodo), grupo in grupos.items():
+            registros = self.env[modelo].browse(grupo.mapped('res_id')).exists()
+            try:
+                with self.env.cr.savepoint():
+                    getattr(registros, metodo)()
+                grupo._marcar_hecho()
+            except Exception:
+                # Reintentar registro a registro para aislar los que fallan
+                for job in grupo:
+                    try:
+                        with self.env.cr.savepoint():
+                            getattr(self.env[modelo].browse(job.res_id).exists(), metodo)()
+                        job._marcar_hecho()
+                    except Exception as e:
+                        job._marcar_error(e)
+
+        # Limpieza de tareas terminadas antiguas
+        self.env.cr.execute(
+            "DELETE FROM pi_job WHERE estado = 'hecho' AND fecha_fin < %s",
+            (fields.Datetime.now() - timedelta(days=self.DIAS_CONSERVACION),),
+        )
+
+        duracion = time.monotonic() - inicio
+        self.contadores['segundos'] += duracion
+        if jobs:
+            _logger.info("pi.job: %s tareas procesadas en %.2fs", len(jobs), duracion)
+        # Si la cola sigue llena, volver a ejecutar el cron en cuanto termine
+        if len(jobs) == (limite or self.LOTE):
+            self.env.ref('pi_core.ir_cron_procesar_jobs')._trigger()
+
+    def _marcar_hecho(self):
+        self.write({'estado': 'hecho', 'fecha_fin': fields.Datetime.now(), 'ultimo_error': False})
+        self.contadores['hechos'] += len(self)
+
+    def _marcar_error(self, error):
+        self.ensure_one()
+        intentos = self.intentos + 1
+        if intentos >= self.MAX_INTENTOS:
+            _logger.error("pi.job %s (%s.%s) fallido tras %s intentos: %s", self.id, self.modelo, self.metodo, intentos, error)
+            self.write({'estado': 'fallido', 'intentos': intentos, 'fecha_fin': fields.Datetime.now(), 'ultimo_error': str(error)})
+            self.contadores['fallidos'] += 1
+        else:
+            self.write({
+                'intentos': intentos,
+                'proximo_intento': fields.Datetime.now() + timedelta(minutes=2 ** (intentos - 1)),
+                'ultimo_error': str(error),
+            })
+            self.contadores['reintentos'] += 1
+        # Programar el cron para cuando venza el reintento
+        if self.estado == 'pendiente':
+            self.env.ref('pi_core.ir_cron_procesar_jobs')._trigger(self.proximo_intento)
+
+    @api.model
+    def metricas(self):
+        """Tamaño de la cola por estado, antigüedad de la tarea pendiente más vieja y contadores del worker"""
+        por_estado = dict(self._read_group([], ['estado'], ['__count']))
+        self.env.cr.execute("""
+            SELECT EXTRACT(EPOCH FROM (now() at time zone 'UTC') - min(create_date))
+            FROM pi_job WHERE estado = 'pendiente'
+        """)
+        antiguedad = self.env.cr.fetchone()[0]
+        return {
+            'pendientes': por_estado.get('pendiente', 0),
+            'hechos': por_estado.get('hecho', 0),
+            'fallidos': por_estado.get('fallido', 0),
+            'antiguedad_pendiente': float(antiguedad or 0),
+            'worker': dict(self.contadores),
+        }
+
+    def action_reintentar(self):
+        self.write({'estado': 'pendiente', 'intentos': 0, 'proximo_intento': fields.Datetime.now()})
+        self.env.ref('pi_core.ir_cron_procesar_jobs')._trigger()
@@ -1,4 +1,5 @@
 from odoo import models, fields, api
+from odoo.tools.sql import create_index
 from odoo.exceptions import ValidationError
 
 
@@ -58,6 +59,44 @@ class PiMensaje(models.Model):
         required=True,
     )
 
+    def init(self):
+        # Mensajes de una conversación en orden cronológico (_order y APIUtils.paginar)
+        create_index(self.env.cr, 'pi_mensaje_conversacion_fecha_idx', self._table, ['conversacion_id', 'fecha_envio', 'id'])
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        mensajes = super(PiMensaje, self).create(vals_list)
+        # Resumen de la conversación: un UPDATE por conversación con el último mensaje del lote
+        por_conversacion = {}
+        for mensaje in mensajes:
+            por_conversacion.setdefault(mensaje.conversacion_id, []).append(mensaje)
+        for conversacion, lote in por_conversacion.items():
+            ultimo = max(lote, key=lambda m: (m.fecha_envio, m.id))
+            conversacion._registrar_mensajes(len(lote), ultimo.fecha_envio, ultimo.contenido)
+        return mensajes
+
+    def write(self, vals):
+        campos_resumen = {'conversacion_id', 'fecha_envio', 'contenido'}
+        conversaciones = self.conversacion_id if campos_resumen & vals.keys() else self.env['pi.conversacion']
+        res = super(PiMensaje, self).write(vals)
+        if conversaciones:
+            (conversaciones | self.conversacion_id)._reconstruir_resumen()
+        return res
+
+    def unlink(self):
+        # conversación -> (mensajes borrados, si alguno era el último)
+        bajas = {}
+        for mensaje in self:
+            conversacion = mensaje.conversacion_id
+            total, era_ultimo = bajas.get(conversacion, (0, False))
+            era_ultimo = era_ultimo or not conversacion.last_message_date or mensaje.fecha_envio >= conversacion.last_message_date
+            bajas[conversacion] = (total + 1, era_ultimo)
+        res = super(PiMensaje, self).unlink()
+        for conversacion, (total, era_ultimo) in bajas.items():
+            if conversacion.exists():
+                conversacion._descontar_mensajes(total, era_ultimo)
+        return res
+
     @api.depends('remitente_id', 'conversacion_id.comprador_id', 'conversacion_id.vendedor_id')
     def _compute_flags_remitente(self):
         for record in self:
@@ -1,8 +1,18 @@
 from odoo import models, fields, api
 from odoo.exceptions import ValidationError
+from odoo.tools import SQL
+from odoo.tools.sql import create_index
+from collections import Counter
 from dateutil.relativedelta import relativedelta
-import time
-import random
+
+# Configuración de PostgreSQL para la búsqueda de texto completo
+FTS_CONFIG = 'spanish'
+# Campos que alimentan la columna search_vector
+CAMPOS_BUSQUEDA = {'nombre_producto', 'descripcion', 'etiquetas_ids'}
+# Productos por UPDATE al rellenar search_vector al instalar o actualizar el módulo
+LOTE_SEARCH_VECTOR = 10000
+# Campos que afectan a las estadísticas del propietario (pi.usuario)
+CAMPOS_ESTADISTICAS = {'estado_venta', 'propietario_id'}
 
 class piProducto(models.Model):
     _name = 'pi.producto'
@@ -11,6 +21,13 @@ class piProducto(models.Model):
     _order = 'fecha_publicacion desc'
     _rec_name = 'nombre_producto'
     
+    # Espera máxima por el bloqueo de fila al vender (lock_timeout de PostgreSQL)
+    ESPERA_BLOQUEO = '2s'
+    
+    # Límites por producto (también los aplica pi.importacion.producto al validar filas)
+    MAX_ETIQUETAS = 5
+    MAX_IMAGENES = 10
+    
     # Campos básicos
     id_producto = fields.Char(string='ID Producto', required=True, copy=False, readonly=True, default='Nuevo')
     nombre_producto = fields.Char(string='Nombre del Producto', required=True, tracking=True)
@@ -37,6 +54,7 @@ class piProducto(models.Model):
     # Estado de venta
     estado_venta = fields.Selection([
         ('disponible', 'Disponible'),
+        ('reservado', 'Reservado'),
         ('vendido', 'Vendido'),
     ], string='Estado de Venta', default='disponible', required=True, tracking=True)
     
@@ -45,30 +63,136 @@ class piProducto(models.Model):
     total_imagenes = fields.Integer(string='Total Imágenes', compute='_compute_total_imagenes')
     imagen_principal = fields.Binary(string='Imagen Principal', compute='_compute_imagen_principal', store=False)
     
+    @api.model_create_multi
+    def create(self, vals_list):
+        self.env['pi.generador.id'].asignar('pi.producto', vals_list, 'id_producto')
+        productos = super(piProducto, self).create(vals_list)
+        productos._actualizar_search_vector()
+        self.env['pi.usuario']._aplicar_deltas_estadisticas({}, productos._contribucion_estadisticas())
+        return productos
+    
+    def write(self, vals):
+        antes = self._contribucion_estadisticas() if CAMPOS_ESTADISTICAS & vals.keys() else None
+        res = super(piProducto, self).write(vals)
+        if CAMPOS_BUSQUEDA & vals.keys():
+            self._actualizar_search_vector()
+        if antes is not None:
+            self.env['pi.usuario']._aplicar_deltas_estadisticas(antes, self._contribucion_estadisticas())
+        return res
+    
+    def unlink(self):
+        antes = self._contribucion_estadisticas()
+        res = super(piProducto, self).unlink()
+        self.env['pi.usuario']._aplicar_deltas_estadisticas(antes, {})
+        return res
+    
+    def _contribucion_estadisticas(self):
+        """Aportación de estos productos a los contadores de sus propietarios"""
+        contribucion = {}
+        for producto in self:
+            if producto.estado_venta == 'disponible' and producto.propietario_id:
+                contribucion.setdefault(producto.propietario_id.id, Counter())['total_productos_venta'] += 1
+        return contribucion
+    
+    def init(self):
+        # search_vector no es un campo ORM: es una columna tsvector mantenida por _actualizar_search_vector
+        self.env.cr.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        self.env.cr.execute("ALTER TABLE pi_producto ADD COLUMN IF NOT EXISTS search_vector tsvector")
+        create_index(self.env.cr, 'pi_producto_search_vector_idx', self._table, ['search_vector'], method='gin')
+        # Índices de trigramas para los ILIKE del listado y la búsqueda tolerante a erratas
+        create_index(self.env.cr, 'pi_producto_nombre_trgm_idx', self._table, ['nombre_producto gin_trgm_ops'], method='gin')
+        create_index(self.env.cr, 'pi_producto_ubicacion_trgm_idx', self._table, ['ubicacion gin_trgm_ops'], method='gin')
+        
+        # Índices del listado (orden de APIUtils.paginar: fecha_publicacion desc nulls last, id desc).
+        # Los parciales cubren el caso habitual estado_venta = 'disponible'
+        orden = ['fecha_publicacion DESC NULLS LAST', 'id DESC']
+        disponible = "estado_venta = 'disponible'"
+        create_index(self.env.cr, 'pi_producto_disponible_fecha_idx', self._table, orden, where=disponible)
+        create_index(self.env.cr, 'pi_producto_disponible_categoria_idx', self._table, ['categoria_id'] + orden, where=disponible)
+        create_index(self.env.cr, 'pi_producto_disponible_propietario_idx', self._table, ['propietario_id'] + orden, where=disponible)
+        create_index(self.env.cr, 'pi_producto_disponible_precio_idx', self._table, ['precio'], where=disponible)
+        create_index(self.env.cr, 'pi_producto_estado_venta_fecha_idx', self._table, ['estado_venta'] + orden)
+        create_index(self.env.cr, 'pi_producto_propietario_idx', self._table, ['propietario_id'])
+        
+        # Rellenar los productos sin search_vector con un UPDATE por lote, avanzando por id
+        ultimo_id = 0
+        while True:
+            self.env.cr.execute(SQL("%s RETURNING p.id", self._sql_search_vector(SQL(
+                "rp.id IN (SELECT id FROM pi_producto WHERE search_vector IS NULL AND id > %s ORDER BY id LIMIT %s)",
+                ultimo_id, LOTE_SEARCH_VECTOR,
+            ))))
+            actualizados = self.env.cr.fetchall()
+            if not actualizados:
+                break
+            ultimo_id = max(fila[0] for fila in actualizados)
+    
+    def _actualizar_search_vector(self):
+        """Recalcula search_vector: nombre (peso A), etiquetas (B) y descripción (C)"""
+        if not self.ids:
+            return
+        self.flush_recordset(['nombre_producto', 'descripcion', 'etiquetas_ids'])
+        self.env['pi.etiqueta'].flush_model(['nombre'])
+        self.env.cr.execute(self._sql_search_vector(SQL("rp.id IN %s", tuple(self.ids))))
+    
+    def _sql_search_vector(self, filtro):
+        """UPDATE que recalcula search_vector de los productos que cumplen `filtro` (SQL sobre rp)"""
+        relacion = self._fields['etiquetas_ids']
+        return SQL("""
+            UPDATE pi_producto p
+               SET search_vector =
+                   setweight(to_tsvector(%(config)s, coalesce(p.nombre_producto, '')), 'A') ||
+                   setweight(to_tsvector(%(config)s, coalesce(e.nombres, '')), 'B') ||
+                   setweight(to_tsvector(%(config)s, coalesce(p.descripcion, '')), 'C')
+              FROM (
+                    SELECT rp.id, string_agg(et.nombre, ' ') AS nombres
+                      FROM pi_producto rp
+                 LEFT JOIN %(rel)s r ON r.%(col1)s = rp.id
+                 LEFT JOIN pi_etiqueta et ON et.id = r.%(col2)s
+                     WHERE %(filtro)s
+                  GROUP BY rp.id
+                   ) e
+             WHERE p.id = e.id
+        """,
+            config=FTS_CONFIG,
+            rel=SQL.identifier(relacion.relation),
+            col1=SQL.identifier(relacion.column1),
+            col2=SQL.identifier(relacion.column2),
+            filtro=filtro,
+        )
+    
     @api.model
-    def create(self, vals):
-        if vals.get('id_producto', 'Nuevo') == 'Nuevo':
-            # Intentar obtener ID de la secuencia
-            sequence_id = self.env['ir.sequence'].next_by_code('pi.producto')
-            if sequence_id:
-                vals['id_producto'] = sequence_id
-            else:
-                # Si la secuencia falla, generar un ID único usando timestamp
-                timestamp = int(time.time() * 1000) % 100000000
-                random_suffix = random.randint(1000, 9999)
-                base_id = f'PRD-{timestamp:08d}-{random_suffix}'
-                
-                # Verificar que el ID generado sea único
-                max_attempts = 10
-                attempt = 0
-                while self.search_count([('id_producto', '=', base_id)]) > 0 and attempt < max_attempts:
-                    timestamp = int(time.time() * 1000) % 100000000
-                    random_suffix = random.randint(1000, 9999)
-                    base_id = f'PRD-{timestamp:08d}-{random_suffix}'
-                    attempt += 1
-                
-                vals['id_producto'] = base_id
-        return super(piProducto, self).create(vals)
+    def buscar_texto(self, texto, domain=None, offset=0, limit=None):
+        """Búsqueda de texto completo ordenada por relevancia
+        
+        Combina el tsvector (ts_rank) con la similitud de trigramas sobre el nombre, de modo
+        que también encuentra prefijos y nombres con erratas.
+        
+        Returns:
+            (productos, total) con los productos de la página solicitada
+        """
+        query = self._search(domain or [])
+        subconsulta = query.subselect()
+        prefijo = texto.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        # Consulta con parámetros posicionales: el operador de trigramas '%' no admite SQL() con nombres
+        condicion = f"""p.id IN ({subconsulta.code})
+               AND (p.search_vector @@ websearch_to_tsquery(%s, %s)
+                    OR p.nombre_producto %% %s
+                    OR p.nombre_producto ILIKE %s)"""
+        params = [*subconsulta.params, FTS_CONFIG, texto, texto, prefijo]
+        
+        self.env.cr.execute(f"""
+            SELECT p.id
+              FROM pi_producto p
+             WHERE {condicion}
+          ORDER BY ts_rank(p.search_vector, websearch_to_tsquery(%s, %s))
+                   + similarity(p.nombre_producto, %s) DESC,
+                   p.fecha_publicacion DESC NULLS LAST, p.id DESC
+             LIMIT %s OFFSET %s
+        """, params + [FTS_CONFIG, texto, texto, limit, offset or 0])
+        productos = self.browse([row[0] for row in self.env.cr.fetchall()])
+        
+        self.env.cr.execute(f"SELECT count(*) FROM pi_producto p WHERE {condicion}", params)
+        return productos, self.env.cr.fetchone()[0]
     
     @api.depends('comentarios_ids')
     def _compute_total_comentarios(self):
@@ -102,16 +226,16 @@ class piProducto(models.Model):
     @api.constrains('etiquetas_ids')
     def _check_etiquetas_limit(self):
         for record in self:
-            if len(record.etiquetas_ids) > 5:
-                raise ValidationError('No puedes asignar más de 5 etiquetas a un producto.')
+            if len(record.etiquetas_ids) > self.MAX_ETIQUETAS:
+                raise ValidationError(f'No puedes asignar más de {self.MAX_ETIQUETAS} etiquetas a un producto.')
     
     @api.constrains('imagenes_ids')
     def _check_imagenes_limit(self):
         for record in self:
             # Nota: Se permite crear productos sin imágenes (imagen es opcional)
-            # Verificar que no haya más de 10 imágenes en total
-            if len(record.imagenes_ids) > 10:
-                raise ValidationError('No puedes subir más de 10 imágenes en total.')
+            # Verificar que no haya más de MAX_IMAGENES imágenes en total
+            if len(record.imagenes_ids) > self.MAX_IMAGENES:
+                raise ValidationError(f'No puedes subir más de {self.MAX_IMAGENES} imágenes en total.')
     
     @api.constrains('precio')
     def _check_precio(self):
@@ -191,6 +315,54 @@ class piProducto(models.Model):
             'target': 'current',
         }
     
+    def _bloquear_para_venta(self, estados, esperar=True):
+        """Bloquea la fila del producto si está en uno de `estados`
+        
+        Con esperar=True espera como mucho ESPERA_BLOQUEO a que otra transacción suelte la
+        fila (p. ej. una edición del propietario) y devuelve False solo si el producto ya no
+        está en esos estados; si la fila sigue bloqueada se lanza el error de concurrencia de
+        PostgreSQL para que Odoo reintente la petición. Con esperar=False no espera
+        (SKIP LOCKED): una fila bloqueada por otra transacción también devuelve False.
+        Si la cambió una transacción ya confirmada se lanza el error de serialización.
+        """
+        self.ensure_one()
+        self.flush_recordset(['estado_venta'])
+        cr = self.env.cr
+        if not esperar:
+            cr.execute(
+                "SELECT id FROM pi_producto WHERE id = %s AND estado_venta IN %s FOR NO KEY UPDATE SKIP LOCKED",
+                (self.id, tuple(estados)),
+            )
+            return bool(cr.fetchone())
+        cr.execute("SELECT current_setting('lock_timeout')")
+        espera_anterior = cr.fetchone()[0]
+        cr.execute("SELECT set_config('lock_timeout', %s, true)", (self.ESPERA_BLOQUEO,))
+        cr.execute(
+            "SELECT id FROM pi_producto WHERE id = %s AND estado_venta IN %s FOR NO KEY UPDATE",
+            (self.id, tuple(estados)),
+        )
+        bloqueado = bool(cr.fetchone())
+        cr.execute("SELECT set_config('lock_timeout', %s, true)", (espera_anterior,))
+        return bloqueado
+    
+    def reservar(self):
+        """Reserva el producto de forma atómica; False si ya no está disponible
+        
+        No espera: si otra compra está reservando el producto a la vez, devuelve False
+        en el primer intento.
+        """
+        if not self._bloquear_para_venta(['disponible'], esperar=False):
+            return False
+        self.write({'estado_venta': 'reservado'})
+        return True
+    
+    def vender(self):
+        """Marca como vendido un producto disponible o reservado; False si ya se ha vendido"""
+        if not self._bloquear_para_venta(['disponible', 'reservado']):
+            return False
+        self.write({'estado_venta': 'vendido'})
+        return True
+    
     def action_marcar_vendido(self):
         self.estado_venta = 'vendido'
     
@@ -1,4 +1,6 @@
 from odoo import models, fields, api
+from odoo.tools.sql import create_index
+import hashlib
 
 class piProductoImagen(models.Model):
     _name = 'pi.producto.imagen'
@@ -10,12 +12,36 @@ class piProductoImagen(models.Model):
     nombre = fields.Char(string='Nombre de Archivo')
     sequence = fields.Integer(string='Secuencia', default=10)
     
-    @api.model
-    def create(self, vals):
+    # Variantes redimensionadas, generadas al guardar la imagen (las sirve /api/v1/imagenes)
+    imagen_1024 = fields.Image(string='Imagen 1024px', related='imagen', max_width=1024, max_height=1024, store=True)
+    imagen_512 = fields.Image(string='Imagen 512px', related='imagen', max_width=512, max_height=512, store=True)
+    imagen_128 = fields.Image(string='Imagen 128px', related='imagen', max_width=128, max_height=128, store=True)
+    imagen_hash = fields.Char(string='Hash de la Imagen', compute='_compute_imagen_hash', store=True)
+    
+    @api.model_create_multi
+    def create(self, vals_list):
         # Si no se especifica sequence, asignar el siguiente número disponible
-        if 'sequence' not in vals or not vals.get('sequence'):
-            if vals.get('producto_id'):
-                producto = self.env['pi.producto'].browse(vals['producto_id'])
-                max_sequence = max([img.sequence for img in producto.imagenes_ids] or [0])
-                vals['sequence'] = max_sequence + 10
-        return super(piProductoImagen, self).create(vals)
\ No newline at end of file
+        # (máximo actual por producto en una sola consulta, y +10 por cada imagen del lote)
+        sin_sequence = [vals for vals in vals_list if not vals.get('sequence') and vals.get('producto_id')]
+        if sin_sequence:
+            max_sequence = dict(self._read_group(
+                [('producto_id', 'in', list({vals['producto_id'] for vals in sin_sequence}))],
+                ['producto_id'], ['sequence:max'],
+            ))
+            max_sequence = {producto.id: maximo or 0 for producto, maximo in max_sequence.items()}
+            for vals in sin_sequence:
+                max_sequence[vals['producto_id']] = max_sequence.get(vals['producto_id'], 0) + 10
+                vals['sequence'] = max_sequence[vals['producto_id']]
+        return super(piProductoImagen, self).create(vals_list)
+    
+    def init(self):
+        # Imágenes de un producto por orden de aparición (productos_to_dicts, detalle)
+        create_index(self.env.cr, 'pi_producto_imagen_producto_seq_idx', self._table, ['producto_id', 'sequence', 'id'])
+    
+    @api.depends('imagen')
+    def _compute_imagen_hash(self):
+        for record in self:
+            data = record.imagen
+            if isinstance(data, str):
+                data = data.encode()
+            record.imagen_hash = hashlib.sha1(data).hexdigest()[:16] if data else False
@@ -79,12 +79,12 @@ class PiReporte(models.Model):
             else:
                 record.display_name = "Nuevo Reporte"
     
-    @api.model
-    def create(self, vals):
-        record = super(PiReporte, self).create(vals)
+    @api.model_create_multi
+    def create(self, vals_list):
+        record = super(PiReporte, self).create(vals_list)
         
-        # Notificar a TODOS los empleados del grupo
-        record._enviar_notificacion_empleados()
+        # Notificar a TODOS los empleados del grupo (en segundo plano)
+        self.env['pi.job'].encolar(record, '_enviar_notificacion_empleados')
         
         return record
     
@@ -149,24 +149,23 @@ class PiReporte(models.Model):
             self.usuario_reportado_id.active = False
     
     def _enviar_notificacion_empleados(self):
-        """Enviar notificación a empleados (solo funciona desde UI de Odoo, no desde API)"""
-        try:
-            # Notificar al usuario admin
-            admin_user = self.env.ref('base.user_admin', raise_if_not_found=False)
-            if admin_user and admin_user.partner_id:
-                tipo_label = dict(self._fields['tipo_reporte'].selection).get(self.tipo_reporte, 'Reporte')
-                self.message_post(
-                    body=f'NUEVO REPORTE<br/>'
-                         f'<b>Tipo:</b> {tipo_label}<br/>'
-                         f'<b>Referencia:</b> {self.referencia}<br/>'
-                         f'<b>Motivo:</b> {self.motivo[:100] if self.motivo else ""}...',
-                    partner_ids=[admin_user.partner_id.id],
-                    message_type='notification',
-                    subtype_xmlid='mail.mt_comment',
-                )
-        except Exception:
-            # Silenciosamente ignorar errores cuando se llama desde la API sin usuario autenticado
-            pass
+        """Enviar notificación a empleados (se ejecuta desde la cola pi.job, que reintenta si falla)"""
+        # Notificar al usuario admin (se busca una sola vez para todo el lote)
+        admin_user = self.env.ref('base.user_admin', raise_if_not_found=False)
+        if not admin_user or not admin_user.partner_id:
+            return
+        tipos = dict(self._fields['tipo_reporte'].selection)
+        for reporte in self:
+            tipo_label = tipos.get(reporte.tipo_reporte, 'Reporte')
+            reporte.message_post(
+                body=f'NUEVO REPORTE<br/>'
+                     f'<b>Tipo:</b> {tipo_label}<br/>'
+                     f'<b>Referencia:</b> {reporte.referencia}<br/>'
+                     f'<b>Motivo:</b> {reporte.motivo[:100] if reporte.motivo else ""}...',
+                partner_ids=[admin_user.partner_id.id],
+                message_type='notification',
+                subtype_xmlid='mail.mt_comment',
+            )
 
 
 # Wizard para resolver reportes
@@ -1,7 +1,37 @@
 from odoo import models, fields, api
+from odoo.exceptions import UserError
+from collections import Counter, defaultdict
+import logging
+import os
+import threading
 import time
-import random
-import hashlib
+
+import passlib.context
+
+_logger = logging.getLogger(__name__)
+
+# Rondas de PBKDF2-SHA512 si no se define el parámetro pi_core.password_rounds (las mismas que Odoo)
+RONDAS_PASSWORD = 600_000
+# Cálculos de hash simultáneos por proceso (uno por núcleo) y segundos de espera antes de rechazar
+MAX_HASH_SIMULTANEOS = os.cpu_count() or 1
+ESPERA_HASH = 5
+
+_contextos_hash = {}
+_semaforo_hash = threading.BoundedSemaphore(MAX_HASH_SIMULTANEOS)
+
+
+class HashOcupado(UserError):
+    """No hay turno para calcular un hash de contraseña en ESPERA_HASH segundos"""
+
+
+# Contadores mantenidos de forma incremental por pi.producto, pi.compra y pi.valoracion
+CONTADORES_ESTADISTICAS = (
+    'total_productos_venta',
+    'total_productos_vendidos',
+    'total_productos_comprados',
+    'total_valoraciones',
+    'suma_valoraciones',
+)
 
 class PiUsuario(models.Model):
     _name = 'pi.usuario'
@@ -14,6 +44,9 @@ class PiUsuario(models.Model):
     
     # Campos básicos específicos del marketplace
     id_usuario = fields.Char(string='ID Usuario', required=True, copy=False, readonly=True, default='Nuevo')
+    # Clave única para el login (res.partner.email no tiene índice y lo comparten todos los partners)
+    email_normalizado = fields.Char(string='Email Normalizado', compute='_compute_email_normalizado',
+                                    store=True, readonly=True, copy=False)
     password = fields.Char(string='Contraseña')
     antiguedad = fields.Integer(string='Antigüedad (días)', compute='_compute_antiguedad', store=True)
     fecha_registro = fields.Date(string='Fecha de Registro', default=fields.Date.today, required=True)
@@ -44,60 +77,129 @@ class PiUsuario(models.Model):
         string='Mensajes enviados',
     )
     
-    # Campos computados para estadísticas
-    valoracion_promedio = fields.Float(string='Valoración Promedio', compute='_compute_valoracion_promedio', store=True)
-    total_valoraciones = fields.Integer(string='Total Valoraciones', compute='_compute_valoracion_promedio', store=True)
-    total_productos_venta = fields.Integer(string='Productos en Venta', compute='_compute_estadisticas', store=True)
-    total_productos_vendidos = fields.Integer(string='Productos Vendidos', compute='_compute_estadisticas', store=True)
-    total_productos_comprados = fields.Integer(string='Productos Comprados', compute='_compute_estadisticas', store=True)
+    # Estadísticas: contadores incrementales (ver _aplicar_deltas_estadisticas)
+    valoracion_promedio = fields.Float(string='Valoración Promedio', readonly=True, copy=False)
+    total_valoraciones = fields.Integer(string='Total Valoraciones', readonly=True, copy=False, default=0)
+    suma_valoraciones = fields.Integer(string='Suma de Valoraciones', readonly=True, copy=False, default=0)
+    total_productos_venta = fields.Integer(string='Productos en Venta', readonly=True, copy=False, default=0)
+    total_productos_vendidos = fields.Integer(string='Productos Vendidos', readonly=True, copy=False, default=0)
+    total_productos_comprados = fields.Integer(string='Productos Comprados', readonly=True, copy=False, default=0)
     
-    @api.model
-    def create(self, vals):
-        # Si no se proporciona un partner_id, crear uno automáticamente
-        if not vals.get('partner_id'):
-            partner_vals = {
+    # Contadores por worker de los cálculos de hash de contraseñas (ver _calcular_hash)
+    contadores_hash = {'calculados': 0, 'actualizados': 0, 'rechazados': 0, 'segundos': 0.0}
+    _contadores_hash_lock = threading.Lock()
+    
+    @api.model_create_multi
+    def create(self, vals_list):
+        # Si no se proporciona un partner_id, crear uno automáticamente (todos en un solo create)
+        sin_partner = [vals for vals in vals_list if not vals.get('partner_id')]
+        if sin_partner:
+            partners = self.env['res.partner'].create([{
                 'name': vals.get('name', 'Nuevo Usuario'),
                 'email': vals.get('email', False),
                 'phone': vals.get('phone', False),
                 'is_company': False,
-            }
-            partner = self.env['res.partner'].create(partner_vals)
-            vals['partner_id'] = partner.id
+            } for vals in sin_partner])
+            for vals, partner in zip(sin_partner, partners):
+                vals['partner_id'] = partner.id
         
         # Generar ID de usuario único - siempre que sea 'Nuevo' o vacío
-        if vals.get('id_usuario', 'Nuevo') == 'Nuevo':
-            # Intentar obtener ID de la secuencia
-            sequence_id = self.env['ir.sequence'].next_by_code('pi.usuario')
-            if sequence_id:
-                vals['id_usuario'] = sequence_id
-            else:
-                # Si la secuencia falla, generar un ID único usando timestamp
-                timestamp = int(time.time() * 1000) % 100000000
-                random_suffix = random.randint(1000, 9999)
-                base_id = f'USR-{timestamp:08d}-{random_suffix}'
-                
-                # Verificar que el ID generado sea único, si no, generar uno nuevo
-                max_attempts = 10
-                attempt = 0
-                while self.search_count([('id_usuario', '=', base_id)]) > 0 and attempt < max_attempts:
-                    timestamp = int(time.time() * 1000) % 100000000
-                    random_suffix = random.randint(1000, 9999)
-                    base_id = f'USR-{timestamp:08d}-{random_suffix}'
-                    attempt += 1
-                
-                vals['id_usuario'] = base_id
+        self.env['pi.generador.id'].asignar('pi.usuario', vals_list, 'id_usuario')
         
         # Hashing de contraseña (si se proporciona)
-        if vals.get('password'):
-           vals['password'] = hashlib.sha256(vals['password'].encode()).hexdigest()
+        for vals in vals_list:
+            if vals.get('password'):
+                vals['password'] = self._hash_password(vals['password'])
                 
-        return super(PiUsuario, self).create(vals)
+        return super(PiUsuario, self).create(vals_list)
     
     def write(self, vals):
         if vals.get('password'):
-            vals['password'] = hashlib.sha256(vals['password'].encode()).hexdigest()
+            vals['password'] = self._hash_password(vals['password'])
         return super(PiUsuario, self).write(vals)
     
+    @api.model
+    def _crypt_context(self):
+        """Contexto de passlib con las rondas configuradas (uno por valor, se reutiliza)
+        
+        Los hashes SHA-256 hexadecimales de versiones anteriores y los PBKDF2 con menos
+        rondas de las configuradas se aceptan y se sustituyen en el siguiente login.
+        """
+        rondas = int(self.env['ir.config_parameter'].sudo().get_param('pi_core.password_rounds', RONDAS_PASSWORD))
+        if rondas not in _contextos_hash:
+            _contextos_hash[rondas] = passlib.context.CryptContext(
+                ['pbkdf2_sha512', 'hex_sha256'],
+                deprecated=['hex_sha256'],
+                pbkdf2_sha512__rounds=rondas,
+                pbkdf2_sha512__min_rounds=rondas,
+            )
+        return _contextos_hash[rondas]
+    
+    @api.model
+    def _calcular_hash(self, funcion, *args):
+        """Ejecuta un cálculo de hash sin superar MAX_HASH_SIMULTANEOS en el proceso
+        
+        Una ráfaga de logins espera su turno en lugar de ocupar todos los hilos del
+        servidor; si la espera supera ESPERA_HASH segundos se rechaza con HashOcupado.
+        """
+        if not _semaforo_hash.acquire(timeout=ESPERA_HASH):
+            self._contar_hash(rechazados=1)
+            raise HashOcupado('Demasiados inicios de sesión simultáneos, inténtalo de nuevo en unos segundos.')
+        inicio = time.monotonic()
+        try:
+            return funcion(*args)
+        finally:
+            _semaforo_hash.release()
+            self._contar_hash(calculados=1, segundos=time.monotonic() - inicio)
+    
+    def _contar_hash(self, **incrementos):
+        with self._contadores_hash_lock:
+            for clave, valor in incrementos.items():
+                self.contadores_hash[clave] += valor
+    
+    @api.model
+    def metricas_hash(self):
+        """Copia de contadores_hash para /api/v1/_metrics"""
+        with self._contadores_hash_lock:
+            return dict(self.contadores_hash)
+    
+    @api.model
+    def _hash_password(self, password):
+        return self._calcular_hash(self._crypt_context().hash, password)
+    
+    def verificar_password(self, password):
+        """Comprueba la contraseña en tiempo constante y actualiza el hash si es de un esquema antiguo
+        
+        Con un recordset vacío (email desconocido) se calcula igualmente un hash, para no
+        revelar por el tiempo de respuesta si el email está registrado.
+        """
+        contexto = self._crypt_context()
+        if not self or not self.password:
+            self._calcular_hash(contexto.dummy_verify)
+            return False
+        self.ensure_one()
+        try:
+            valido, nuevo_hash = self._calcular_hash(contexto.verify_and_update, password, self.password)
+        except ValueError:
+            # Lo almacenado no es un hash reconocido
+            return False
+        if valido and nuevo_hash:
+            # Directamente en SQL: write() volvería a aplicar el hash
+            self.env.cr.execute("UPDATE pi_usuario SET password = %s WHERE id = %s", (nuevo_hash, self.id))
+            self.invalidate_recordset(['password'])
+            self._contar_hash(actualizados=1)
+        return valido
+    
+    @api.model
+    def normalizar_email(self, email):
+        """Forma en la que se guarda y se busca el email: sin espacios y en minúsculas"""
+        return (email or '').strip().lower() or False
+    
+    @api.depends('partner_id.email')
+    def _compute_email_normalizado(self):
+        for record in self:
+            record.email_normalizado = self.normalizar_email(record.email)
+    
     @api.depends('fecha_registro')
     def _compute_antiguedad(self):
         for record in self:
@@ -107,25 +209,75 @@ class PiUsuario(models.Model):
             else:
                 record.antiguedad = 0
     
-    @api.depends('valoraciones_recibidas.valoracion_numerica')
-    def _compute_valoracion_promedio(self):
-        for record in self:
-            valoraciones = record.valoraciones_recibidas
-            if valoraciones:
-                # Usar valoracion_numerica en lugar de valoracion (que es string)
-                total = sum(v.valoracion_numerica for v in valoraciones)
-                record.valoracion_promedio = total / len(valoraciones) if len(valoraciones) > 0 else 0.0
-                record.total_valoraciones = len(valoraciones)
-            else:
-                record.valoracion_promedio = 0.0
-                record.total_valoraciones = 0
+    @api.model
+    def _aplicar_deltas_estadisticas(self, antes, despues):
+        """Suma (despues - antes) a los contadores de cada usuario con un UPDATE atómico
+        
+        antes/despues: {id de pi.usuario: Counter({contador: valor})}, tal como los
+        devuelve _contribucion_estadisticas() de pi.producto, pi.compra y pi.valoracion.
+        """
+        deltas = defaultdict(Counter)
+        for usuario_id, contribucion in despues.items():
+            deltas[usuario_id].update(contribucion)
+        for usuario_id, contribucion in antes.items():
+            deltas[usuario_id].subtract(contribucion)
+        
+        afectados = []
+        for usuario_id, delta in deltas.items():
+            delta = {campo: valor for campo, valor in delta.items() if valor and campo in CONTADORES_ESTADISTICAS}
+            if not usuario_id or not delta:
+                continue
+            asignaciones = [f"{campo} = COALESCE({campo}, 0) + %s" for campo in delta]
+            params = list(delta.values())
+            if 'total_valoraciones' in delta or 'suma_valoraciones' in delta:
+                # En un UPDATE las expresiones ven los valores previos: se aplica el delta también aquí
+                asignaciones.append(
+                    "valoracion_promedio = COALESCE((COALESCE(suma_valoraciones, 0) + %s)::float"
+                    " / NULLIF(COALESCE(total_valoraciones, 0) + %s, 0), 0)"
+                )
+                params += [delta.get('suma_valoraciones', 0), delta.get('total_valoraciones', 0)]
+            self.env.cr.execute(
+                f"UPDATE pi_usuario SET {', '.join(asignaciones)} WHERE id = %s",
+                params + [usuario_id],
+            )
+            afectados.append(usuario_id)
+        
+        if afectados:
+            self.browse(afectados).invalidate_recordset(list(CONTADORES_ESTADISTICAS) + ['valoracion_promedio'])
     
-    @api.depends('productos_venta', 'productos_vendidos', 'productos_comprados')
-    def _compute_estadisticas(self):
-        for record in self:
-            record.total_productos_venta = len(record.productos_venta)
-            record.total_productos_vendidos = len(record.productos_vendidos)
-            record.total_productos_comprados = len(record.productos_comprados)
+    @api.model
+    def _cron_verificar_estadisticas(self):
+        """Comprobación nocturna: recalcula los contadores con un _read_group por modelo y corrige las desviaciones"""
+        reales = defaultdict(Counter)
+        for propietario, total in self.env['pi.producto']._read_group(
+                [('estado_venta', '=', 'disponible')], ['propietario_id'], ['__count']):
+            reales[propietario.id]['total_productos_venta'] += total
+        for vendedor, comprador, total in self.env['pi.compra']._read_group(
+                [], ['vendedor_id', 'comprador_id'], ['__count']):
+            reales[vendedor.id]['total_productos_vendidos'] += total
+            reales[comprador.id]['total_productos_comprados'] += total
+        for valorado, total, suma in self.env['pi.valoracion']._read_group(
+                [], ['usuario_valorado_id'], ['__count', 'valoracion_numerica:sum']):
+            reales[valorado.id]['total_valoraciones'] += total
+            reales[valorado.id]['suma_valoraciones'] += suma or 0
+        
+        corregidos = 0
+        usuarios = self.with_context(active_test=False).search_read([], list(CONTADORES_ESTADISTICAS))
+        for datos in usuarios:
+            esperado = reales.get(datos['id'], Counter())
+            vals = {
+                campo: esperado[campo] for campo in CONTADORES_ESTADISTICAS
+                if (datos[campo] or 0) != esperado[campo]
+            }
+            if vals:
+                total = esperado['total_valoraciones']
+                vals['valoracion_promedio'] = esperado['suma_valoraciones'] / total if total else 0.0
+                self.browse(datos['id']).write(vals)
+                corregidos += 1
+        
+        if corregidos:
+            _logger.warning("Estadísticas de %s usuarios corregidas por desviación de los contadores", corregidos)
+        return corregidos
     
     def action_reportar_usuario(self):
         return {
@@ -154,28 +306,11 @@ class PiUsuario(models.Model):
     def _fix_existing_nuevo_ids(self):
         """Método para corregir usuarios existentes con ID 'Nuevo'"""
         usuarios_con_nuevo = self.search([('id_usuario', '=', 'Nuevo')])
-        for usuario in usuarios_con_nuevo:
-            # Generar un nuevo ID único
-            sequence_id = self.env['ir.sequence'].next_by_code('pi.usuario')
-            if sequence_id:
-                usuario.id_usuario = sequence_id
-            else:
-                # Si la secuencia falla, generar un ID único usando timestamp
-                timestamp = int(time.time() * 1000) % 100000000
-                random_suffix = random.randint(1000, 9999)
-                base_id = f'USR-{timestamp:08d}-{random_suffix}'
-                
-                # Verificar que el ID generado sea único
-                max_attempts = 10
-                attempt = 0
-                while self.search_count([('id_usuario', '=', base_id), ('id', '!=', usuario.id)]) > 0 and attempt < max_attempts:
-                    timestamp = int(time.time() * 1000) % 100000000
-                    random_suffix = random.randint(1000, 9999)
-                    base_id = f'USR-{timestamp:08d}-{random_suffix}'
-                    attempt += 1
-                
-                usuario.id_usuario = base_id
+        codigos = self.env['pi.generador.id'].siguientes('pi.usuario', len(usuarios_con_nuevo))
+        for usuario, codigo in zip(usuarios_con_nuevo, codigos):
+            usuario.id_usuario = codigo
     
     _sql_constraints = [
-        ('id_usuario_unique', 'unique(id_usuario)', 'El ID de usuario debe ser único.')
+        ('id_usuario_unique', 'unique(id_usuario)', 'El ID de usuario debe ser único.'),
+        ('email_normalizado_unique', 'unique(email_normalizado)', 'Ya existe un usuario con ese email.'),
     ]
\ No newline at end of file
@@ -1,6 +1,6 @@
 from odoo import models, fields, api
 from odoo.exceptions import ValidationError
-import uuid
+from collections import Counter
 
 class piValoracion(models.Model):
     _name = 'pi.valoracion'
@@ -23,7 +23,7 @@ class piValoracion(models.Model):
     fecha = fields.Datetime(string='Fecha', default=fields.Datetime.now, required=True, readonly=True)
     
     # Relaciones
-    usuario_valorado_id = fields.Many2one('pi.usuario', string='Usuario Valorado', required=True, ondelete='cascade')
+    usuario_valorado_id = fields.Many2one('pi.usuario', string='Usuario Valorado', required=True, ondelete='cascade', index=True)
     usuario_valorador_id = fields.Many2one('pi.usuario', string='Usuario Valorador', required=True, ondelete='cascade')
     compra_id = fields.Many2one('pi.compra', string='Compra Relacionada', required=True, ondelete='cascade')
     producto_id = fields.Many2one('pi.producto', string='Producto', related='compra_id.producto_id', store=True, readonly=True)
@@ -34,27 +34,45 @@ class piValoracion(models.Model):
         ('vendedor', 'Valoración a Vendedor')
     ], string='Tipo de Valoración', required=True)
     
-    @api.model
-    def create(self, vals):
-        if vals.get('id_valoracion', 'Nuevo') == 'Nuevo':
-            # Intentar usar la secuencia, si no existe usar UUID único
-            seq = self.env['ir.sequence'].next_by_code('pi.valoracion')
-            if seq:
-                vals['id_valoracion'] = seq
-            else:
-                # Fallback con UUID para garantizar unicidad
-                vals['id_valoracion'] = 'VAL-' + str(uuid.uuid4())[:8].upper()
+    @api.model_create_multi
+    def create(self, vals_list):
+        self.env['pi.generador.id'].asignar('pi.valoracion', vals_list, 'id_valoracion')
         
-        result = super(piValoracion, self).create(vals)
+        result = super(piValoracion, self).create(vals_list)
+        self.env['pi.usuario']._aplicar_deltas_estadisticas({}, result._contribucion_estadisticas())
         
         # Actualizar la referencia de valoración en la compra
-        if result.tipo_valoracion == 'vendedor':
-            result.compra_id.write({'valoracion_comprador_id': result.id})
-        elif result.tipo_valoracion == 'comprador':
-            result.compra_id.write({'valoracion_vendedor_id': result.id})
+        for valoracion in result:
+            if valoracion.tipo_valoracion == 'vendedor':
+                valoracion.compra_id.write({'valoracion_comprador_id': valoracion.id})
+            elif valoracion.tipo_valoracion == 'comprador':
+                valoracion.compra_id.write({'valoracion_vendedor_id': valoracion.id})
         
         return result
     
+    def write(self, vals):
+        antes = self._contribucion_estadisticas() if {'usuario_valorado_id', 'valoracion'} & vals.keys() else None
+        res = super(piValoracion, self).write(vals)
+        if antes is not None:
+            self.env['pi.usuario']._aplicar_deltas_estadisticas(antes, self._contribucion_estadisticas())
+        return res
+    
+    def unlink(self):
+        antes = self._contribucion_estadisticas()
+        res = super(piValoracion, self).unlink()
+        self.env['pi.usuario']._aplicar_deltas_estadisticas(antes, {})
+        return res
+    
+    def _contribucion_estadisticas(self):
+        """Aportación de estas valoraciones al total y a la suma del usuario valorado"""
+        contribucion = {}
+        for valoracion in self:
+            if valoracion.usuario_valorado_id:
+                contador = contribucion.setdefault(valoracion.usuario_valorado_id.id, Counter())
+                contador['total_valoraciones'] += 1
+                contador['suma_valoraciones'] += int(valoracion.valoracion) if valoracion.valoracion else 0
+        return contribucion
+    
     @api.depends('valoracion')
     def _compute_valoracion_numerica(self):
         for record in self:
@@ -0,0 +1,119 @@
+# Operaciones comunes de test_presupuestos_modelos.py y de benchmarks/modelos.py: create y
+# write de cada modelo pi.* con n registros, medidos en consultas SQL y milisegundos.
+
+import json
+import os
+import time
+
+# Presupuestos medidos con benchmarks/modelos.py (PI_BENCH_ACTUALIZAR=1)
+RUTA_PRESUPUESTOS = os.path.join(os.path.dirname(__file__), 'presupuestos_modelos.json')
+
+# PNG de 1x1 en base64 (el campo Binary espera base64)
+IMAGEN = b'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=='
+
+
+def cargar_presupuestos(ruta=RUTA_PRESUPUESTOS):
+    with open(ruta) as fichero:
+        return json.load(fichero)
+
+
+def medir(env, funcion):
+    """Ejecuta funcion() y devuelve (resultado, consultas, milisegundos) incluyendo el flush"""
+    env.flush_all()
+    env.invalidate_all()
+    consultas = env.cr.sql_log_count
+    inicio = time.perf_counter()
+    resultado = funcion()
+    env.flush_all()
+    return resultado, env.cr.sql_log_count - consultas, (time.perf_counter() - inicio) * 1000
+
+
+def operaciones(env, n, prefijo):
+    """Secuencia de (modelo, operación, función) para n registros; cada create prepara los datos de los siguientes"""
+    datos = {}
+    categoria = env['pi.categoria'].create({'nombre': f'{prefijo} categoría'})
+    vendedor, comprador = env['pi.usuario'].create([
+        {'name': f'{prefijo} vendedor', 'email': f'{prefijo}_vendedor@bench.local'},
+        {'name': f'{prefijo} comprador', 'email': f'{prefijo}_comprador@bench.local'},
+    ])
+    etiquetas = env['pi.etiqueta'].create([{'nombre': f'{prefijo} base {i}'} for i in range(5)])
+
+    def guardar(clave, funcion):
+        def ejecutar():
+            datos[clave] = funcion()
+            return datos[clave]
+        return ejecutar
+
+    yield 'pi.categoria', 'create', guardar('categorias', lambda: env['pi.categoria'].create([
+        {'nombre': f'{prefijo} categoría {i}'} for i in range(n)]))
+    yield 'pi.categoria', 'write', lambda: datos['categorias'].write({'descripcion': 'Actualizada'})
+
+    yield 'pi.etiqueta', 'create', guardar('etiquetas', lambda: env['pi.etiqueta'].create([
+        {'nombre': f'{prefijo} etiqueta {i}'} for i in range(n)]))
+    yield 'pi.etiqueta', 'write', lambda: datos['etiquetas'].write({'color': '#000000'})
+
+    # Sin contraseña: el coste del KDF se mide aparte con benchmarks/kdf.py
+    yield 'pi.usuario', 'create', guardar('usuarios', lambda: env['pi.usuario'].create([
+        {'name': f'{prefijo} usuario {i}', 'email': f'{prefijo}_{i}@bench.local'} for i in range(n)]))
+    yield 'pi.usuario', 'write', lambda: datos['usuarios'].write({'phone': '600000000'})
+
+    # Con etiquetas e imagen para que se comprueben los límites de ambas relaciones
+    yield 'pi.producto', 'create', guardar('productos', lambda: env['pi.producto'].create([{
+        'nombre_producto': f'{prefijo} producto {i}',
+        'descripcion': 'Producto de prueba',
+        'precio': 10 + i % 100,
+        'categoria_id': categoria.id,
+        'ubicacion': 'Madrid',
+        'propietario_id': vendedor.id,
+        'etiquetas_ids': [(6, 0, etiquetas[:3].ids)],
+        'imagenes_ids': [(0, 0, {'imagen': IMAGEN, 'nombre': f'{prefijo}_{i}.png'})],
+    } for i in range(n)]))
+    yield 'pi.producto', 'write', lambda: datos['productos'].write({'precio': 99})
+    yield 'pi.producto', 'write_etiquetas', lambda: datos['productos'].write({'etiquetas_ids': [(6, 0, etiquetas.ids)]})
+
+    yield 'pi.producto.imagen', 'create', guardar('imagenes', lambda: env['pi.producto.imagen'].create([
+        {'producto_id': producto.id, 'imagen': IMAGEN, 'nombre': f'{prefijo}_extra_{producto.id}.png'}
+        for producto in datos['productos']]))
+    yield 'pi.producto.imagen', 'write', lambda: datos['imagenes'].write({'sequence': 5})
+
+    yield 'pi.conversacion', 'create', guardar('conversaciones', lambda: env['pi.conversacion'].create([{
+        'name': f'{prefijo} conversación {producto.id}',
+        'comprador_id': comprador.id,
+        'vendedor_id': vendedor.id,
+        'producto_id': producto.id,
+    } for producto in datos['productos']]))
+    yield 'pi.conversacion', 'write', lambda: datos['conversaciones'].write({'name': 'Asunto actualizado'})
+
+    yield 'pi.mensaje', 'create', guardar('mensajes', lambda: env['pi.mensaje'].create([{
+        'conversacion_id': conversacion.id,
+        'remitente_id': comprador.id,
+        'contenido': 'Hola, ¿sigue disponible?',
+    } for conversacion in datos['conversaciones']]))
+    yield 'pi.mensaje', 'write', lambda: datos['mensajes'].write({'leido': True})
+
+    yield 'pi.comentario', 'create', guardar('comentarios', lambda: env['pi.comentario'].create([
+        {'producto_id': producto.id, 'usuario_id': comprador.id, 'texto': 'Buen producto'}
+        for producto in datos['productos']]))
+    yield 'pi.comentario', 'write', lambda: datos['comentarios'].write({'texto': 'Comentario editado'})
+
+    yield 'pi.reporte', 'create', guardar('reportes', lambda: env['pi.reporte'].create([{
+        'tipo_reporte': 'producto',
+        'motivo': 'Contenido inapropiado',
+        'reportado_por_id': comprador.id,
+        'producto_reportado_id': producto.id,
+    } for producto in datos['productos']]))
+    yield 'pi.reporte', 'write', lambda: datos['reportes'].write({'estado': 'en_revision'})
+
+    yield 'pi.compra', 'create', guardar('compras', lambda: env['pi.compra'].create([
+        {'comprador_id': comprador.id, 'producto_id': producto.id} for producto in datos['productos']]))
+    yield 'pi.compra', 'write', lambda: datos['compras'].write({'estado': 'confirmada'})
+
+    # Cada valoración recalcula el estado de su compra y las estadísticas del usuario valorado
+    yield 'pi.valoracion', 'create', guardar('valoraciones', lambda: env['pi.valoracion'].create([{
+        'compra_id': compra.id,
+        'tipo_valoracion': 'vendedor',
+        'valoracion': '5',
+        'usuario_valorado_id': vendedor.id,
+        'usuario_valorador_id': comprador.id,
+    } for compra in datos['compras']]))
+    yield 'pi.valoracion', 'write', lambda: datos['valoraciones'].write({'valoracion': '4'})
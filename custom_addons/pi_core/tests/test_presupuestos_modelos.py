@@ -0,0 +1,46 @@
+import os
+
+from odoo.tests import TransactionCase, tagged
+
+from .bench_modelos import cargar_presupuestos, medir, operaciones
+
+
+@tagged('post_install', '-at_install', '-standard', 'pi_bench')
+class TestPresupuestosModelos(TransactionCase):
+    """Create y write de cada modelo pi.* frente a los presupuestos de presupuestos_modelos.json
+
+    Fuera de los tests estándar por su duración; se lanza con:
+        odoo-bin -d <base_datos> -i pi_core --test-tags pi_bench --stop-after-init
+    Con PI_BENCH_SOLO_CONSULTAS=1 solo se comprueban las consultas, no los tiempos.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestPresupuestosModelos, cls).setUpClass()
+        cls.presupuestos = cargar_presupuestos()
+        cls.solo_consultas = os.environ.get('PI_BENCH_SOLO_CONSULTAS') == '1'
+
+    def _comprobar_presupuestos(self, n):
+        self.assertTrue(
+            self.presupuestos.get('_medido_en'),
+            'presupuestos_modelos.json no tiene presupuestos medidos: se generan con '
+            'PI_BENCH_ACTUALIZAR=1 y benchmarks/modelos.py (ver benchmarks/README.md)',
+        )
+        for modelo, operacion, funcion in operaciones(self.env, n, f'testbench{n}'):
+            clave = f'{modelo} {operacion}'
+            __, consultas, ms = medir(self.env, funcion)
+            limite = self.presupuestos.get(clave, {}).get(str(n))
+            with self.subTest(operacion=clave, registros=n):
+                self.assertTrue(limite, f'{clave} ({n}) no tiene presupuesto')
+                self.assertLessEqual(consultas, limite['consultas'], f'{clave} ({n}): consultas')
+                if not self.solo_consultas:
+                    self.assertLessEqual(ms, limite['ms'], f'{clave} ({n}): milisegundos')
+
+    def test_1_registro(self):
+        self._comprobar_presupuestos(1)
+
+    def test_100_registros(self):
+        self._comprobar_presupuestos(100)
+
+    def test_10000_registros(self):
+        self._comprobar_presupuestos(10000)